@@ -4,6 +4,6 @@ from .models import Rating
 
 @admin.register(Rating)
 class RatingAdmin(admin.ModelAdmin):
-    list_display = ('title', 'movie_id', 'rating', 'created_at')
+    list_display = ('title', 'movie_id', 'rating', 'user', 'session_key', 'created_at')
     list_filter = ('rating', 'created_at')
     search_fields = ('title',)
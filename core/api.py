@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+
+from .catalogue import get_catalogue
+from .ingestion import get_ingestion
+from .posters import posters_pour_films_async
+from .profils import profil_de
+from .views import _filtre_genres, _page_catalogue, _recommandations_du_profil
+from sadia_site.src.contenu import masque_filtre
+from sadia_site.src.metriques import span
+from sadia_site.src.service import get_recommender
+
+
+# --------------------------------------------
+# API JSON asynchrone (servie par sadia_site/asgi.py)
+# --------------------------------------------
+#
+# Les vues ne bloquent pas la boucle d'événements : l'ORM passe par
+# ``sync_to_async``, les posters par un client HTTP asynchrone borné dans le
+# temps, et le calcul des recommandations (numpy) par un pool de threads
+# dédié. Un seul worker ASGI sert ainsi de nombreux clients pendant que TMDB
+# répond lentement.
+
+_pool = None
+_verrou_pool = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _verrou_pool:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=settings.API_THREADS, thread_name_prefix='api-calcul')
+    return _pool
+
+
+async def _dans_le_pool(fonction, *args):
+    """Exécute ``fonction`` dans le pool de calcul, avec le contexte courant (spans de la requête)."""
+    contexte = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_pool(), functools.partial(contexte.run, fonction, *args)
+    )
+
+
+def _reponse(donnees, status=200):
+    response = JsonResponse(donnees, status=status)
+    # Données qui suivent chaque nouvelle note : revalidées à chaque fois, jamais en cache partagé
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def _genres_invalides(request):
+    """Réponse 400 si ``?genres=`` nomme un genre inconnu (les pages HTML, elles, ignorent le filtre)."""
+    try:
+        masque_filtre(request.GET.get('genres', ''))
+    except ValueError as e:
+        return _reponse({'error': str(e)}, status=400)
+    return None
+
+
+def _page(request):
+    # Le visiteur relit ses propres votes, même encore en tampon
+    get_ingestion().vider_profil(profil_de(request))
+    with span('catalogue'):
+        catalogue = get_catalogue()
+    return _page_catalogue(request, catalogue)
+
+
+def _notes_du_visiteur(request):
+    profil = profil_de(request)
+    get_ingestion().vider_profil(profil)
+    return profil, (profil.notes() if profil else None)
+
+
+def _recommandations(profil, notes, genres):
+    modele = get_recommender().modele
+    if modele is None:
+        return None
+    with span('recommandation'):
+        return _recommandations_du_profil(modele, profil, notes, genres)
+
+
+async def _avec_posters(films):
+    with span('posters'):
+        posters = await posters_pour_films_async(films)
+    return [dict(f, poster_url=posters.get(f['movieId'])) for f in films]
+
+
+async def films(request):
+    """JSON d'une page du catalogue (mêmes paramètres que l'accueil : page_size, offset, apres, genres)."""
+    erreur = _genres_invalides(request)
+    if erreur is not None:
+        return erreur
+    page_films, total, end, page_size = await sync_to_async(_page)(request)
+    return _reponse({
+        'films': await _avec_posters(page_films),
+        'page_size': page_size,
+        'total_films': total,
+        'has_more': end < total,
+        'next_offset': end,
+        'next_cursor': page_films[-1]['movieId'] if page_films else None,
+    })
+
+
+async def recommandations(request):
+    """JSON des films recommandés d'après les notes du visiteur (filtre ``?genres=``)."""
+    erreur = _genres_invalides(request)
+    if erreur is not None:
+        return erreur
+    # Profil et notes lus par l'ORM (index du profil), le calcul part dans le pool
+    profil, notes = await sync_to_async(_notes_du_visiteur)(request)
+    films_recommandes = await _dans_le_pool(_recommandations, profil, notes, _filtre_genres(request))
+    if films_recommandes is None:
+        return _reponse({'error': 'Modèle indisponible'}, status=503)
+    films_recommandes = [{'movieId': int(f['movieId']), 'title': f['title'], 'genres': f.get('genres')}
+                         for f in films_recommandes]
+    return _reponse({'recommendations': await _avec_posters(films_recommandes)})
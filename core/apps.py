@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import configurer_sqlite
+        connection_created.connect(configurer_sqlite)
+
+        # Préchauffage optionnel : charge le modèle avant la première requête
+        if getattr(settings, 'RECO_PRECHAUFFAGE', False):
+            from sadia_site.src.service import get_recommender
+            get_recommender().prechauffer()
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.db.models import Subquery
+
+from .catalogue import get_catalogue
+from .models import Rating
+
+
+# --------------------------------------------
+# Validateurs HTTP (ETag / Last-Modified) pour django.views.decorators.http.condition
+# --------------------------------------------
+#
+# Tant qu'aucune note n'est écrite et que le catalogue (ou le modèle) ne change
+# pas, une page déjà reçue par le navigateur est revalidée en 304 sans agrégat
+# ni rendu de gabarit.
+
+def derniere_note(request):
+    """(pk de la dernière note insérée, date de la dernière note écrite), lus une fois par requête.
+
+    Une note remplacée garde son pk mais change de date : les deux sont lus en
+    une requête, chacun par son index (clé primaire, ``created_at``).
+    """
+    if not hasattr(request, '_derniere_note'):
+        derniere_date = Rating.objects.order_by('-created_at').values('created_at')[:1]
+        request._derniere_note = (Rating.objects.order_by('-pk').annotate(date=Subquery(derniere_date))
+                                  .values_list('pk', 'date').first() or (0, None))
+    return request._derniere_note
+
+
+def derniere_note_profil(request, profil):
+    """(pk, created_at) de la dernière note écrite par ``profil`` (lu par son index), une fois par requête."""
+    if not hasattr(request, '_derniere_note_profil'):
+        request._derniere_note_profil = (
+            profil and Rating.objects.filter(**profil.filtre()).order_by('-created_at')
+            .values_list('pk', 'created_at').first()
+        ) or (0, None)
+    return request._derniere_note_profil
+
+
+def _empreinte(*parties):
+    return hashlib.blake2b('|'.join(map(str, parties)).encode(), digest_size=16).hexdigest()
+
+
+def _parametres(request):
+    return sorted(request.GET.items())
+
+
+def etag_accueil(request):
+    """Dernière note, version du catalogue, paramètres de pagination et jeton CSRF (inclus dans les formulaires)."""
+    catalogue = get_catalogue()
+    return _empreinte('accueil', *derniere_note(request), catalogue.chemin, catalogue.mtime,
+                      _parametres(request), request.COOKIES.get('csrftoken', ''))
+
+
+def modification_accueil(request):
+    """Date de la dernière note ou de la dernière modification de movies.csv."""
+    dates = [derniere_note(request)[1]]
+    mtime = get_catalogue().mtime
+    if mtime is not None:
+        dates.append(datetime.fromtimestamp(mtime / 1e9, tz=timezone.utc))
+    dates = [d for d in dates if d is not None]
+    return max(dates) if dates else None
+
+
+def etag_modele(modele, *parties):
+    """ETag d'une réponse calculée par le modèle : version et révision, plus ``parties``."""
+    if modele is None:
+        return None
+    return _empreinte('modele', modele.version, modele.revision, *parties)
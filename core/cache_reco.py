@@ -0,0 +1,72 @@
+import hashlib
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from sadia_site.src.metriques import compter_cache
+
+PREFIXE = 'reco'
+
+
+def _cle_generation(portee):
+    return f'{PREFIXE}:generation:{portee}'
+
+
+def generation(portee):
+    """Compteur d'invalidation de la portée (un profil de notation, voir ``Profil.portee``)."""
+    valeur = cache.get(_cle_generation(portee))
+    if valeur is None:
+        cache.add(_cle_generation(portee), 0, timeout=None)
+        valeur = cache.get(_cle_generation(portee), 0)
+    return valeur
+
+
+def invalider(portee):
+    """À appeler quand une note est écrite : les listes en cache de la portée deviennent obsolètes."""
+    try:
+        cache.incr(_cle_generation(portee))
+    except ValueError:
+        cache.set(_cle_generation(portee), 1, timeout=None)
+
+
+def empreinte(notes):
+    """Empreinte stable d'un ensemble de notes (movie_id, note), indépendante de l'ordre."""
+    notes = np.asarray(notes, dtype=np.int64).reshape(-1, 2)
+    notes = notes[np.lexsort((notes[:, 1], notes[:, 0]))]
+    return hashlib.blake2b(notes.tobytes(), digest_size=16).hexdigest()
+
+
+def recommandations_en_cache(portee, notes, modele, calculer, variante=''):
+    """Retourne la liste en cache ou la calcule une seule fois.
+
+    La clé combine la version (et la révision) du modèle, la génération de la
+    portée, l'empreinte des notes et ``variante`` (filtre de genres). Après une invalidation, un seul appelant
+    prend le verrou (``cache.add``) et recalcule ; les autres attendent son
+    résultat un court instant avant de recalculer eux-mêmes en dernier recours.
+    """
+    cle = (f'{PREFIXE}:{modele.version}.{modele.revision}:{portee}:'
+           f'{generation(portee)}:{empreinte(notes)}:{variante}')
+    resultat = cache.get(cle)
+    compter_cache('recommandations', resultat is not None)
+    if resultat is not None:
+        return resultat
+
+    verrou = cle + ':verrou'
+    attente = settings.RECO_CACHE_ATTENTE
+    if cache.add(verrou, 1, timeout=max(1, int(attente * 10))):
+        try:
+            resultat = calculer()
+            cache.set(cle, resultat, timeout=settings.RECO_CACHE_TTL)
+        finally:
+            cache.delete(verrou)
+        return resultat
+
+    echeance = time.monotonic() + attente
+    while time.monotonic() < echeance:
+        time.sleep(0.01)
+        resultat = cache.get(cle)
+        if resultat is not None:
+            return resultat
+    return calculer()
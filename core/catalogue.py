@@ -0,0 +1,126 @@
+import csv
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from sadia_site.src.contenu import avec_genres, masques_genres
+from sadia_site.src.metriques import compter_cache, span
+
+
+# Films de secours si movies.csv est absent
+FILMS_PAR_DEFAUT = [
+    (1, 'The Shawshank Redemption', ''),
+    (2, 'The Godfather', ''),
+    (3, 'The Dark Knight', ''),
+]
+
+
+class Catalogue:
+    """Catalogue movies.csv chargé une fois, stocké en tableaux parallèles.
+
+    ``movie_ids`` est un tableau int32, ``titres`` et ``genres`` des listes de
+    chaînes alignées dessus ; ``positions`` donne la position d'un movieId et
+    ``masques`` les genres de chaque film en bits (uint32, voir ``GENRES``).
+    Une page ne construit des dictionnaires que pour les films affichés.
+    """
+
+    __slots__ = ('chemin', 'mtime', 'movie_ids', 'titres', 'genres', 'positions', 'masques')
+
+    def __init__(self, chemin, mtime, movie_ids, titres, genres):
+        self.chemin = chemin
+        self.mtime = mtime
+        self.movie_ids = movie_ids
+        self.titres = titres
+        self.genres = genres
+        self.positions = {int(movie_id): i for i, movie_id in enumerate(movie_ids)}
+        self.masques = masques_genres(genres)
+
+    @classmethod
+    def charger(cls, chemin):
+        chemin = Path(chemin)
+        if not chemin.exists():
+            ids, titres, genres = zip(*FILMS_PAR_DEFAUT)
+            return cls(chemin, None, np.array(ids, dtype=np.int32), list(titres), list(genres))
+
+        mtime = os.stat(chemin).st_mtime_ns
+        ids, titres, genres = [], [], []
+        with chemin.open(encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    movie_id = int(row.get('movieId'))
+                except (TypeError, ValueError):
+                    continue
+                ids.append(movie_id)
+                titres.append(row.get('title') or 'Untitled')
+                genres.append(row.get('genres') or '')
+        return cls(chemin, mtime, np.array(ids, dtype=np.int32), titres, genres)
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def film(self, position):
+        return {
+            'movieId': int(self.movie_ids[position]),
+            'title': self.titres[position],
+            'genres': self.genres[position],
+        }
+
+    def film_par_id(self, movie_id):
+        position = self.positions.get(movie_id)
+        return None if position is None else self.film(position)
+
+    def selection(self, filtre=0):
+        """Positions des films ayant tous les genres du masque ``filtre`` (None : tout le catalogue)."""
+        if not filtre:
+            return None
+        return np.flatnonzero(avec_genres(self.masques, filtre))
+
+    def position_apres(self, movie_id, selection=None):
+        """Rang qui suit ``movie_id`` (curseur de pagination) dans le catalogue ou ``selection``, 0 si inconnu."""
+        position = self.positions.get(movie_id)
+        if position is None:
+            return 0
+        if selection is None:
+            return position + 1
+        return int(np.searchsorted(selection, position, side='right'))
+
+    def page(self, debut, taille, selection=None):
+        """Films de rang ``[debut, debut + taille)`` ; seuls ceux-là sont matérialisés."""
+        debut = max(0, debut)
+        if selection is not None:
+            return [self.film(int(i)) for i in selection[debut:debut + taille]]
+        fin = min(debut + taille, len(self))
+        return [self.film(i) for i in range(debut, fin)]
+
+
+_catalogue = None
+_verrou = threading.Lock()
+
+
+def chemin_films():
+    return Path(settings.BASE_DIR) / 'data' / 'ml-latest-small' / 'movies.csv'
+
+
+def get_catalogue():
+    """Catalogue du processus, rechargé si la date de modification de movies.csv change."""
+    global _catalogue
+    chemin = chemin_films()
+    try:
+        mtime = os.stat(chemin).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+
+    catalogue = _catalogue
+    a_jour = catalogue is not None and catalogue.chemin == chemin and catalogue.mtime == mtime
+    compter_cache('catalogue', a_jour)
+    if not a_jour:
+        with _verrou:
+            catalogue = _catalogue
+            if catalogue is None or catalogue.chemin != chemin or catalogue.mtime != mtime:
+                with span('catalogue.chargement'):
+                    catalogue = Catalogue.charger(chemin)
+                _catalogue = catalogue
+    return catalogue
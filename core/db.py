@@ -0,0 +1,15 @@
+# --------------------------------------------
+# Réglages des connexions SQLite
+# --------------------------------------------
+#
+# En mode WAL, les lectures ne bloquent plus l'écriture (et inversement) : les
+# pages restent servies pendant qu'un lot de notes est validé. synchronous=NORMAL
+# ne synchronise le disque qu'aux points de contrôle, ce qui suffit en WAL.
+
+def configurer_sqlite(sender, connection, **kwargs):
+    """Récepteur de ``connection_created`` : active le journal WAL sur chaque nouvelle connexion."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as curseur:
+        curseur.execute('PRAGMA journal_mode=WAL')
+        curseur.execute('PRAGMA synchronous=NORMAL')
@@ -0,0 +1,177 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .cache_reco import invalider
+from .models import Rating
+from .profils import Profil
+from .stats import ajouter_notes
+from sadia_site.src.metriques import REGISTRE, span
+from sadia_site.src.mise_a_jour import NOTE_MINIMALE
+from sadia_site.src.service import get_recommender
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------
+# Écriture différée des notes
+# --------------------------------------------
+
+def _verrouiller_notes():
+    """Prend le verrou d'écriture de ``core_rating`` dans la transaction courante.
+
+    Sous SQLite, ``BEGIN`` est différé : la première écriture prend le verrou,
+    même si elle ne touche aucune ligne. Sous PostgreSQL, ce mode de verrou
+    exclut les autres écrivains sans bloquer les lectures.
+    """
+    table = connection.ops.quote_name(Rating._meta.db_table)
+    with connection.cursor() as curseur:
+        if connection.vendor == 'sqlite':
+            curseur.execute(f'UPDATE {table} SET id = id WHERE id < 0')
+        elif connection.vendor == 'postgresql':
+            curseur.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+
+
+class IngestionNotes:
+    """Tampon des notes reçues, écrites en base par lots (``bulk_create``).
+
+    Sous SQLite, chaque transaction validée coûte une synchronisation disque et
+    prend le verrou d'écriture : une rafale de votes est regroupée en une seule
+    transaction toutes les ``NOTES_INTERVALLE`` secondes (ou dès que
+    ``NOTES_TAILLE_MAX`` notes attendent). Avec un intervalle nul, chaque note
+    est écrite immédiatement, dans la requête.
+
+    La date de la note est celle du vote, pas celle de l'écriture. Les notes
+    encore en tampon sont écrites à l'arrêt du processus.
+    """
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._reveil = threading.Event()
+        self._notes = []
+        self._thread = None
+        atexit.register(self.vider)
+
+    def __len__(self):
+        return len(self._notes)
+
+    def ajouter(self, movie_id, title, rating, profil):
+        """Met en tampon la note de ``profil`` (voir ``core.profils``) sur le film."""
+        note = Rating(movie_id=movie_id, title=title, rating=rating, created_at=timezone.now(), **profil.champs())
+        with self._verrou:
+            self._notes.append(note)
+            plein = len(self._notes) >= settings.NOTES_TAILLE_MAX
+        if settings.NOTES_INTERVALLE <= 0:
+            self.vider()
+            return
+        self._demarrer()
+        if plein:
+            self._reveil.set()
+
+    def vider_profil(self, profil):
+        """Écrit le tampon s'il contient une note de ``profil`` ; retourne le nombre de notes écrites.
+
+        Appelé avant de servir une page au visiteur (redirection après un vote) :
+        il relit toujours ses propres notes, même si le lot n'est pas encore
+        parti. Les notes des autres profils partent dans le même lot.
+        """
+        if profil is None:
+            return 0
+        with self._verrou:
+            en_attente = any(Profil.de_note(note) == profil for note in self._notes)
+        return self.vider() if en_attente else 0
+
+    def vider(self):
+        """Écrit toutes les notes en attente ; retourne le nombre de notes écrites.
+
+        Une note sur un film déjà noté par le profil remplace l'ancienne (upsert
+        sur l'index unique du profil) ; les statistiques ne reçoivent alors que
+        l'écart. En cas d'échec, les notes sont remises en tête du tampon pour la
+        prochaine tentative.
+        """
+        with self._verrou:
+            notes, self._notes = self._notes, []
+        if not notes:
+            return 0
+
+        # Dans un même lot, seule la dernière note d'un profil sur un film compte
+        dernieres = {(Profil.de_note(note), note.movie_id): note for note in notes}
+        profils = {profil for profil, _ in dernieres}
+        try:
+            with span('notes.ecriture'), transaction.atomic():
+                # Verrou d'écriture avant la lecture : un autre lot (autre worker ou autre
+                # requête) ne peut pas lire les mêmes anciennes notes et compter deux fois
+                # une première note dans les statistiques
+                _verrouiller_notes()
+                # Notes déjà enregistrées des seuls profils du lot, lues par leur index
+                anciennes = {profil: dict(Rating.objects.filter(**profil.filtre()).values_list('movie_id', 'rating'))
+                             for profil in profils}
+                for champ in ('user', 'session_key'):
+                    lot = [note for note in dernieres.values() if (note.user_id is not None) == (champ == 'user')]
+                    if lot:
+                        Rating.objects.bulk_create(lot, batch_size=500, update_conflicts=True,
+                                                   unique_fields=[champ, 'movie_id'],
+                                                   update_fields=['title', 'rating', 'created_at'])
+                ecarts = []
+                for (profil, movie_id), note in dernieres.items():
+                    ancienne = anciennes[profil].get(movie_id)
+                    ecarts.append((movie_id, note.rating, 1) if ancienne is None
+                                  else (movie_id, note.rating - ancienne, 0))
+                ajouter_notes(ecarts)
+        except Exception:
+            with self._verrou:
+                self._notes[:0] = notes
+            raise
+        REGISTRE.incrementer('bobetteflix_notes_ecrites_total', len(dernieres), aide="Notes écrites en base")
+        for profil in profils:
+            invalider(profil.portee)
+
+        # Propager au graphe (par lots en arrière-plan) : un film qui devient aimé
+        # co-occurre avec les films que le profil aimait déjà
+        mises_a_jour = get_recommender().mises_a_jour
+        films_aimes = {profil: {movie_id for movie_id, valeur in notes_profil.items() if valeur >= NOTE_MINIMALE}
+                       for profil, notes_profil in anciennes.items()}
+        for (profil, movie_id), note in dernieres.items():
+            if note.rating >= NOTE_MINIMALE and movie_id not in films_aimes[profil]:
+                mises_a_jour.ajouter(movie_id, note.rating, sorted(films_aimes[profil]))
+                films_aimes[profil].add(movie_id)
+        return len(dernieres)
+
+    def _demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._verrou:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name='notes-ingestion', daemon=True)
+                self._thread.start()
+
+    def _boucle(self):
+        while True:
+            self._reveil.wait(settings.NOTES_INTERVALLE)
+            self._reveil.clear()
+            try:
+                self.vider()
+            except Exception:
+                REGISTRE.incrementer('bobetteflix_notes_erreurs_total', 1, "Échecs d'écriture des lots de notes")
+                logger.exception("Erreur lors de l'écriture des notes")
+            finally:
+                # Le thread garde sa propre connexion : la refermer au-delà de CONN_MAX_AGE
+                close_old_connections()
+
+
+_ingestion = None
+_verrou_ingestion = threading.Lock()
+
+
+def get_ingestion():
+    """Retourne le tampon de notes unique du processus."""
+    global _ingestion
+    if _ingestion is None:
+        with _verrou_ingestion:
+            if _ingestion is None:
+                _ingestion = IngestionNotes()
+    return _ingestion
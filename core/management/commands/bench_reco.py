@@ -0,0 +1,183 @@
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+
+from core.models import Rating
+from sadia_site.src import service as service_reco
+from sadia_site.src.modele import ModeleRecommandation
+from sadia_site.src.recommendation import ChargementDonnees, ConstructionGraphe, RecommandationMarcheAleatoire
+from sadia_site.src.service import ServiceRecommandation
+from sadia_site.src.synthetique import generer_movielens
+
+ECHELLES = {'100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+# Les vues sont mesurées sur un cache en mémoire : le cache partagé du site n'est jamais vidé
+CACHE_BANC = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-reco'}}
+
+
+def _version_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Mesure:
+    """Chronomètre une étape et relève le pic mémoire Python (tracemalloc) et le RSS maximal."""
+
+    def __init__(self, etape, echelle):
+        self.resultat = {'etape': etape, 'echelle': echelle}
+
+    def __enter__(self):
+        tracemalloc.start()
+        self._debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self._debut
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.resultat.update(
+            secondes=round(duree, 6),
+            pic_tracemalloc_mo=round(pic / 2**20, 2),
+            rss_max_mo=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        )
+        return False
+
+
+class Command(BaseCommand):
+    help = ("Mesure le pipeline de recommandation sur des jeux MovieLens synthétiques "
+            "et écrit les résultats en JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--echelles', default='100k,1m',
+                            help=f"Tailles à mesurer parmi {', '.join(ECHELLES)} (séparées par des virgules)")
+        parser.add_argument('--top-k', type=int, default=None, help="Élagage top-K du graphe")
+        parser.add_argument('--repetitions', type=int, default=5, help="Appels par vue mesurée")
+        parser.add_argument('--sortie', default='bench_reco.json', help="Fichier JSON de résultats")
+
+    def handle(self, *args, **options):
+        echelles = [e.strip() for e in options['echelles'].split(',') if e.strip()]
+        inconnues = [e for e in echelles if e not in ECHELLES]
+        if inconnues:
+            raise CommandError(f"Échelles inconnues : {', '.join(inconnues)}")
+
+        resultats = []
+        for echelle in echelles:
+            with tempfile.TemporaryDirectory() as racine:
+                resultats.extend(self._mesurer_echelle(Path(racine), echelle, options))
+
+        rapport = {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'commit': _version_git(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'resultats': resultats,
+        }
+        Path(options['sortie']).write_text(json.dumps(rapport, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['sortie']}"))
+
+    def _mesurer_echelle(self, racine, echelle, options):
+        dossier = racine / 'data' / 'ml-latest-small'
+        nb = generer_movielens(dossier, ECHELLES[echelle])
+        self.stdout.write(f"[{echelle}] {nb} évaluations générées")
+        resultats = []
+
+        def noter(mesure):
+            resultats.append(mesure.resultat)
+            r = mesure.resultat
+            self.stdout.write(f"[{echelle}] {r['etape']:<32} {r['secondes']:>9.3f}s "
+                              f"pic {r['pic_tracemalloc_mo']:>8.1f} Mo")
+
+        with override_settings(BASE_DIR=racine, TMDB_API_KEY=None):
+            chargement = ChargementDonnees()
+            with Mesure('charger_movielens', echelle) as mesure:
+                chargement.charger_movielens()
+            noter(mesure)
+
+            brutes = ChargementDonnees()
+            brutes.evaluations = pd.read_csv(dossier / 'ratings.csv')
+            with Mesure('_nettoyer_donnees', echelle) as mesure:
+                brutes._nettoyer_donnees()
+            noter(mesure)
+            del brutes
+
+            graphe = ConstructionGraphe(chargement.evaluations, top_k=options['top_k'])
+            with Mesure('construire_matrice_transition', echelle) as mesure:
+                graphe.construire_matrice_transition()
+            noter(mesure)
+            mesure.resultat['nnz'] = int(graphe.matrice_transition.nnz)
+
+            marche = RecommandationMarcheAleatoire(graphe.matrice_transition)
+            graines = np.argsort(np.diff(graphe.matrice_transition.indptr))[-10:]
+            with Mesure('marche_aleatoire_naive', echelle) as mesure:
+                marche.marche_aleatoire_naive(graines, iterations_max=50)
+            noter(mesure)
+
+            modele = ModeleRecommandation.depuis_graphe(chargement, graphe)
+            resultats.extend(self._mesurer_vues(echelle, modele, options['repetitions']))
+        return resultats
+
+    def _mesurer_vues(self, echelle, modele, repetitions):
+        precedent = service_reco._service
+        service_reco._service = ServiceRecommandation(chargeur=lambda: modele)
+        client = Client()
+        resultats = []
+        try:
+            # Notes du visiteur mesuré, annulées à la fin : la base n'est pas modifiée.
+            # Cache propre au banc, vidé entre les répétitions mesurées « sans cache »
+            with transaction.atomic(), override_settings(NOTES_INTERVALLE=0, CACHES=CACHE_BANC):
+                self._noter_films_populaires(client, modele)
+                for url in ('/', '/recommendations/'):
+                    resultats.append(self._mesurer_vue(client, url, echelle, repetitions, avec_cache=False))
+                    resultats.append(self._mesurer_vue(client, url, echelle, repetitions, avec_cache=True))
+                transaction.set_rollback(True)
+        finally:
+            service_reco._service = precedent
+        return resultats
+
+    @staticmethod
+    def _noter_films_populaires(client, modele, nb=10):
+        """Note les ``nb`` films les plus connectés du graphe : /recommendations/ a des graines à marcher."""
+        degres = np.diff(modele.matrice_transition.indptr)
+        for movie_id in modele.ids_films[np.argsort(degres)[-nb:]].tolist():
+            client.post('/rate/', {'movie_id': movie_id, 'rating': 5})
+        # Sans graines, la vue répondrait une liste vide sans rien calculer
+        if Rating.objects.filter(session_key=client.session.session_key).count() != nb:
+            raise CommandError("Les notes du visiteur mesuré n'ont pas été enregistrées")
+
+    def _mesurer_vue(self, client, url, echelle, repetitions, avec_cache):
+        """Médiane des ``repetitions`` appels ; sans cache, chaque appel recalcule les recommandations."""
+        durees = []
+        cache.clear()
+        for _ in range(repetitions):
+            if not avec_cache:
+                cache.clear()
+            debut = time.perf_counter()
+            reponse = client.get(url)
+            durees.append(time.perf_counter() - debut)
+            if reponse.status_code != 200:
+                raise CommandError(f"{url} a répondu {reponse.status_code}")
+        resultat = {
+            'etape': f"vue {url} ({'cache' if avec_cache else 'sans cache'})", 'echelle': echelle,
+            'secondes': round(statistics.median(durees), 6),
+            'premier_appel': round(durees[0], 6),
+            'max': round(max(durees), 6),
+        }
+        self.stdout.write(f"[{echelle}] {resultat['etape']:<32} {resultat['secondes']:>9.3f}s (médiane)")
+        return resultat
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profils import evaluations_des_profils
+from sadia_site.src.modele import BACKENDS, ModeleRecommandation, dossier_modele_par_defaut
+from sadia_site.src.voisins import MESURES
+
+
+class Command(BaseCommand):
+    help = "Construit le modèle de recommandation et l'enregistre comme artefact versionné (.npy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--donnees', default='data/ml-latest-small',
+                            help="Dossier MovieLens (absolu ou relatif à BASE_DIR)")
+        parser.add_argument('--sortie', default=None,
+                            help="Dossier racine des artefacts (défaut : RECO_MODELE_DIR)")
+        parser.add_argument('--backend', choices=BACKENDS, default=None,
+                            help="Moteur de recommandation (défaut : RECO_BACKEND)")
+        parser.add_argument('--top-k', type=int, default=None,
+                            help="Nombre maximal de voisins conservés par film")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Nombre de processus pour construire les co-occurrences")
+        parser.add_argument('--demi-vie', type=float, default=None,
+                            help="Demi-vie (jours) du poids des notes dans les co-occurrences (défaut : RECO_DEMI_VIE_JOURS)")
+        parser.add_argument('--fenetre', type=float, default=None,
+                            help="Ne garder que les notes des N derniers jours (défaut : RECO_FENETRE_JOURS)")
+        parser.add_argument('--sans-notes-site', action='store_true',
+                            help="Ne pas ajouter au graphe les notes des profils enregistrées en base")
+        parser.add_argument('--voisins-k', type=int, default=20,
+                            help="Taille de l'index des films similaires (0 pour ne pas le construire)")
+        parser.add_argument('--similarite', choices=MESURES, default='cosinus',
+                            help="Mesure de similarité de l'index des films similaires")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        # Les notes du site, appliquées en ligne aux workers depuis la dernière construction, rejoignent le graphe
+        evaluations_site = None if options['sans_notes_site'] else evaluations_des_profils()
+        modele = ModeleRecommandation.construire(options['donnees'], top_k=options['top_k'],
+                                                 nb_processus=options['workers'], backend=options['backend'],
+                                                 demi_vie_jours=options['demi_vie'], fenetre_jours=options['fenetre'],
+                                                 evaluations_site=evaluations_site)
+        if modele is None:
+            raise CommandError("Impossible de charger les données MovieLens")
+        if options['voisins_k'] > 0:
+            modele.construire_voisins(options['voisins_k'], options['similarite'])
+
+        destination = modele.sauvegarder(options['sortie'] or dossier_modele_par_defaut())
+        duree = time.perf_counter() - debut
+        if modele.backend == 'als':
+            taille = f"{modele.recommandeur.nb_facteurs} facteurs"
+        else:
+            taille = f"{modele.matrice_transition.nnz} transitions"
+        self.stdout.write(self.style.SUCCESS(
+            f"Modèle {modele.version} ({modele.backend}) enregistré dans {destination} "
+            f"({modele.nb_films} films, {taille}, "
+            f"{0 if evaluations_site is None else len(evaluations_site)} notes du site, {duree:.1f}s)"
+        ))
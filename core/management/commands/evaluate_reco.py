@@ -0,0 +1,46 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from sadia_site.src.evaluation import EvaluationHorsLigne
+from sadia_site.src.modele import BACKENDS
+
+
+class Command(BaseCommand):
+    help = ("Évalue le modèle hors ligne (découpage temporel de ratings.csv) : "
+            "precision@K, recall@K, NDCG@K, MAP, couverture et latence par utilisateur.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--donnees', default='data/ml-latest-small',
+                            help="Dossier MovieLens (absolu ou relatif à BASE_DIR)")
+        parser.add_argument('--test', type=float, default=0.2, help="Part la plus récente des notes gardée pour le test")
+        parser.add_argument('--k', type=int, default=10)
+        parser.add_argument('--alpha', type=float, default=0.15, help="Probabilité de retour aux graines")
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--backend', choices=BACKENDS, default='marche')
+        parser.add_argument('--facteurs', type=int, default=64, help="Rang des facteurs ALS")
+        parser.add_argument('--top-k', type=int, default=None, help="Élagage top-K du graphe")
+        parser.add_argument('--lot', type=int, default=256, help="Utilisateurs évalués ensemble")
+        parser.add_argument('--workers', type=int, default=1, help="Processus de calcul")
+        parser.add_argument('--sortie', default='evaluation_reco.json', help="Fichier JSON de résultats")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        evaluation = EvaluationHorsLigne(
+            options['donnees'], proportion_test=options['test'], k=options['k'], alpha=options['alpha'],
+            iterations=options['iterations'], top_k=options['top_k'], taille_lot=options['lot'],
+            nb_processus=options['workers'], backend=options['backend'],
+            options_als={'nb_facteurs': options['facteurs']} if options['backend'] == 'als' else None,
+        )
+        resultats = evaluation.executer()
+        resultats['duree_totale_s'] = round(time.perf_counter() - debut, 4)
+
+        Path(options['sortie']).write_text(json.dumps(resultats, indent=2))
+        k = options['k']
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultats['nb_utilisateurs_test']} utilisateurs : precision@{k}={resultats[f'precision@{k}']:.4f} "
+            f"recall@{k}={resultats[f'recall@{k}']:.4f} ndcg@{k}={resultats[f'ndcg@{k}']:.4f} "
+            f"map={resultats['map']:.4f} couverture={resultats['couverture']:.3f} -> {options['sortie']}"
+        ))
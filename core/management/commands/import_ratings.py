@@ -0,0 +1,120 @@
+import csv
+import json
+import math
+import time
+from datetime import datetime, timezone as tz
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.catalogue import get_catalogue
+from core.models import Rating
+from core.stats import ajouter_notes
+
+# Noms de colonnes acceptés (MovieLens ou export de core_rating)
+COLONNES = {
+    'movie_id': ('movieId', 'movie_id'),
+    'rating': ('rating',),
+    'title': ('title',),
+    'created_at': ('timestamp', 'created_at'),
+}
+
+
+def _champ(ligne, nom):
+    for alias in COLONNES[nom]:
+        valeur = ligne.get(alias)
+        if valeur not in (None, ''):
+            return valeur
+    return None
+
+
+def _date(valeur):
+    """Horodatage Unix (MovieLens) ou date ISO 8601 ; maintenant à défaut."""
+    if valeur is None:
+        return timezone.now()
+    try:
+        return datetime.fromtimestamp(float(valeur), tz=tz.utc)
+    except (TypeError, ValueError):
+        date = parse_datetime(str(valeur))
+        if date is None:
+            raise ValueError(f'date invalide : {valeur}')
+        return date if timezone.is_aware(date) else timezone.make_aware(date, tz.utc)
+
+
+def _note(valeur):
+    """Note entière 1..5 : demi-étoiles MovieLens (0.5 à 5) arrondies au supérieur.
+
+    Une valeur hors de ces bornes (0, 9, NaN, infini) est rejetée, pas ramenée à 1..5.
+    """
+    note = float(valeur)
+    if not 0.5 <= note <= 5:
+        raise ValueError(f'note invalide : {valeur}')
+    return math.floor(note + 0.5)
+
+
+def _lignes(chemin, format):
+    with open(chemin, newline='', encoding='utf-8') as fichier:
+        if format == 'csv':
+            yield from csv.DictReader(fichier)
+        else:
+            for ligne in fichier:
+                if not ligne.strip():
+                    continue
+                try:
+                    donnees = json.loads(ligne)
+                except ValueError:
+                    donnees = {}  # ligne illisible : comptée comme ignorée
+                yield donnees if isinstance(donnees, dict) else {}
+
+
+class Command(BaseCommand):
+    help = "Importe des notes depuis un fichier CSV ou JSONL, par lots (une transaction et un bulk_create par lot)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('chemin', help="Fichier de notes (ratings.csv MovieLens, ou JSON par ligne)")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default=None,
+                            help="Format du fichier (défaut : d'après l'extension)")
+        parser.add_argument('--lot', type=int, default=5000, help="Nombre de notes par transaction")
+
+    def handle(self, *args, **options):
+        chemin = Path(options['chemin'])
+        if not chemin.exists():
+            raise CommandError(f"Fichier introuvable : {chemin}")
+        format = options['format'] or ('jsonl' if chemin.suffix in ('.jsonl', '.json', '.ndjson') else 'csv')
+        catalogue = get_catalogue()
+
+        debut = time.perf_counter()
+        importees = ignorees = 0
+        lignes = _lignes(chemin, format)
+        while True:
+            lot = list(islice(lignes, options['lot']))
+            if not lot:
+                break
+            notes = []
+            for ligne in lot:
+                try:
+                    movie_id = int(_champ(ligne, 'movie_id'))
+                    valeur = _note(_champ(ligne, 'rating'))
+                    film = catalogue.film_par_id(movie_id)
+                    title = _champ(ligne, 'title') or (film['title'] if film else '')
+                    notes.append(Rating(movie_id=movie_id, title=str(title)[:200], rating=valeur,
+                                        created_at=_date(_champ(ligne, 'created_at'))))
+                except (TypeError, ValueError, OverflowError, OSError):
+                    # OverflowError, OSError : identifiant ou horodatage hors des bornes de la plateforme
+                    ignorees += 1
+
+            # Notes sans profil : elles comptent dans les statistiques, pas dans les graines d'un profil
+            with transaction.atomic():
+                Rating.objects.bulk_create(notes, batch_size=1000)
+                ajouter_notes((note.movie_id, note.rating) for note in notes)
+            importees += len(notes)
+            self.stdout.write(f"{importees} notes importées")
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"{importees} notes importées, {ignorees} lignes ignorées ({duree:.1f}s)"
+        ))
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sadia_site.src.recommendation import ConstructionGraphe, top_k_colonnes
+from sadia_site.src.service import get_recommender
+
+
+# Export hors ligne, à part de l'artefact publié (que le site ouvre en mmap) :
+#
+#   <sortie>/<version du modèle>/manifeste.json
+#   <sortie>/<version du modèle>/utilisateurs.npy  (ligne -> userId)
+#   <sortie>/<version du modèle>/films.npy         (utilisateurs × k movieId, -1 pour une case vide)
+#   <sortie>/<version du modèle>/scores.npy        (utilisateurs × k, 0 pour une case vide)
+#
+# Le site ne le lit pas : il calcule les recommandations de chaque profil à la
+# demande. L'export sert aux traitements par lots (analyses, envois) qui
+# veulent le top-K de tous les utilisateurs sans charger le modèle.
+
+def dossier_precalculs_par_defaut():
+    return Path(getattr(settings, 'RECO_PRECALCULS_DIR', Path(settings.BASE_DIR) / 'data' / 'precalculs'))
+
+
+class Command(BaseCommand):
+    help = "Précalcule le top-K de chaque utilisateur MovieLens en lots (PageRank personnalisé ou ALS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=20, help="Nombre de films par utilisateur")
+        parser.add_argument('--alpha', type=float, default=0.15, help="Probabilité de retour aux graines")
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--lot', type=int, default=1024, help="Nombre d'utilisateurs traités ensemble")
+        parser.add_argument('--sortie', default=None,
+                            help="Dossier racine de l'export (défaut : RECO_PRECALCULS_DIR)")
+
+    def handle(self, *args, **options):
+        modele = get_recommender().modele
+        if modele is None:
+            raise CommandError("Modèle de recommandation indisponible")
+        racine = Path(options['sortie'] or dossier_precalculs_par_defaut())
+        destination = racine / modele.version
+        if modele.dossier is not None and destination.resolve() == Path(modele.dossier).resolve():
+            raise CommandError("La sortie ne peut pas être le dossier de l'artefact publié")
+
+        debut = time.perf_counter()
+        incidence = ConstructionGraphe(modele.evaluations).matrice_incidence()
+        recommandeur = modele.recommandeur
+        nb_utilisateurs, k, lot = incidence.shape[0], options['k'], options['lot']
+
+        films = np.full((nb_utilisateurs, k), -1, dtype=np.int32)
+        scores = np.zeros((nb_utilisateurs, k), dtype=np.float32)
+        for depart in range(0, nb_utilisateurs, lot):
+            fin = min(depart + lot, nb_utilisateurs)
+            graines = incidence[depart:fin].T
+            resultat = recommandeur.scores_par_lots(graines, alpha=options['alpha'],
+                                                    iterations_max=options['iterations'])
+            meilleurs, valeurs = top_k_colonnes(resultat, k, exclure=graines)
+            # Moins de k candidats : les cases restantes (films déjà notés, -inf) restent vides,
+            # comme dans EvaluationHorsLigne
+            valides = np.isfinite(valeurs) & (valeurs > 0)
+            largeur = meilleurs.shape[0]
+            films[depart:fin, :largeur] = np.where(valides, modele.ids_films[meilleurs], -1).T
+            scores[depart:fin, :largeur] = np.where(valides, valeurs, 0).T
+
+        # Ligne de la matrice d'incidence (id_utilisateur) -> userId
+        utilisateurs = np.full(nb_utilisateurs, -1, dtype=np.int32)
+        utilisateurs[np.asarray(modele.colonnes['id_utilisateur'])] = modele.colonnes['userId']
+        manifeste = {
+            'modele': modele.version, 'backend': modele.backend, 'k': k, 'alpha': options['alpha'],
+            'iterations': options['iterations'], 'nb_utilisateurs': int(nb_utilisateurs),
+            'cree_le': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'fichiers': ['utilisateurs.npy', 'films.npy', 'scores.npy'],
+        }
+
+        # Écriture dans un dossier temporaire puis renommage : jamais d'export à moitié écrit
+        racine.mkdir(parents=True, exist_ok=True)
+        temporaire = Path(tempfile.mkdtemp(prefix=f'.{modele.version}-', dir=racine))
+        try:
+            np.save(temporaire / 'utilisateurs.npy', utilisateurs)
+            np.save(temporaire / 'films.npy', films)
+            np.save(temporaire / 'scores.npy', scores)
+            (temporaire / 'manifeste.json').write_text(json.dumps(manifeste, indent=2))
+            if destination.exists():
+                shutil.rmtree(destination)
+            os.replace(temporaire, destination)
+        except Exception:
+            shutil.rmtree(temporaire, ignore_errors=True)
+            raise
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"Top-{k} calculé pour {nb_utilisateurs} utilisateurs en {duree:.1f}s -> {destination}"
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.posters import _liens_tmdb, posters_pour_films
+
+
+class Command(BaseCommand):
+    help = "Remplit le cache des posters pour tout le catalogue (tmdbId de links.csv)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=200, help="Nombre de films traités par lot")
+
+    def handle(self, *args, **options):
+        if not settings.TMDB_API_KEY:
+            raise CommandError("TMDB_API_KEY n'est pas défini")
+
+        movie_ids = sorted(_liens_tmdb())
+        lot = options['lot']
+        debut = time.perf_counter()
+        trouves = 0
+        for depart in range(0, len(movie_ids), lot):
+            films = [{'movieId': movie_id} for movie_id in movie_ids[depart:depart + lot]]
+            posters = posters_pour_films(films)
+            trouves += sum(1 for url in posters.values() if url)
+            self.stdout.write(f"{min(depart + lot, len(movie_ids))}/{len(movie_ids)} films")
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"{trouves} posters en cache sur {len(movie_ids)} films ({duree:.1f}s)"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import reconstruire_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques de notes par film (table core_ratingstats) depuis core_rating."
+
+    def handle(self, *args, **options):
+        nombre = reconstruire_stats()
+        self.stdout.write(self.style.SUCCESS(f"Statistiques recalculées pour {nombre} films"))
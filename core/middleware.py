@@ -0,0 +1,69 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from sadia_site.src.metriques import REGISTRE, debuter_requete, server_timing, terminer_requete
+
+
+class MetriquesMiddleware:
+    """Mesure chaque requête : latence par vue, requêtes SQL, statut HTTP.
+
+    Les spans ouverts pendant la requête (``sadia_site.src.metriques.span``)
+    sont renvoyés dans l'en-tête ``Server-Timing`` si ``METRIQUES_SERVER_TIMING``
+    est activé. Sous ASGI, le middleware reste asynchrone pour ne pas
+    ramener les vues asynchrones (``core.api``) dans un thread ; les requêtes
+    SQL, exécutées dans les threads de ``sync_to_async``, n'y sont pas comptées.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        nb_requetes_sql = 0
+
+        def compter(execute, sql, params, many, context):
+            nonlocal nb_requetes_sql
+            nb_requetes_sql += 1
+            return execute(sql, params, many, context)
+
+        jeton, spans = debuter_requete()
+        debut = time.perf_counter()
+        try:
+            with connection.execute_wrapper(compter):
+                response = self.get_response(request)
+        finally:
+            terminer_requete(jeton)
+        return self._mesurer(request, response, time.perf_counter() - debut, spans, nb_requetes_sql)
+
+    async def __acall__(self, request):
+        jeton, spans = debuter_requete()
+        debut = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            terminer_requete(jeton)
+        return self._mesurer(request, response, time.perf_counter() - debut, spans, None)
+
+    def _mesurer(self, request, response, duree, spans, nb_requetes_sql):
+        correspondance = getattr(request, 'resolver_match', None)
+        vue = correspondance.url_name if correspondance and correspondance.url_name else 'inconnue'
+        REGISTRE.observer('bobetteflix_requete_seconds', duree, "Latence des requêtes HTTP par vue",
+                          vue=vue, methode=request.method)
+        REGISTRE.incrementer('bobetteflix_requetes_total', 1, "Requêtes HTTP par vue et statut",
+                             vue=vue, statut=response.status_code)
+        if nb_requetes_sql is not None:
+            REGISTRE.incrementer('bobetteflix_requetes_sql_total', nb_requetes_sql,
+                                 "Requêtes SQL exécutées, par vue", vue=vue)
+
+        if settings.METRIQUES_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(spans, duree, nb_requetes_sql)
+        return response
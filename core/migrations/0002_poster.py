@@ -0,0 +1,22 @@
+# Generated by Django 4.2.25 on 2026-10-17 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Poster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_id', models.IntegerField(unique=True)),
+                ('poster_url', models.URLField(blank=True, max_length=300, null=True)),
+                ('expire_le', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
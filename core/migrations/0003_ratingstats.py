@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-17 15:58
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def remplir_stats(apps, schema_editor):
+    Rating = apps.get_model('core', 'Rating')
+    RatingStats = apps.get_model('core', 'RatingStats')
+    agregats = Rating.objects.values('movie_id').annotate(somme=Sum('rating'), nombre=Count('id')).order_by()
+    RatingStats.objects.bulk_create(
+        [RatingStats(movie_id=a['movie_id'], somme=a['somme'], nombre=a['nombre']) for a in agregats],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_poster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movie_id', models.IntegerField(unique=True)),
+                ('somme', models.BigIntegerField(default=0)),
+                ('nombre', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(remplir_stats, migrations.RunPython.noop),
+    ]
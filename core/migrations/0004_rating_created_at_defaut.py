@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-17 16:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_ratingstats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rating',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
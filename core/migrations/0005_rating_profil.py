@@ -0,0 +1,41 @@
+# Generated by Django 4.2.25 on 2026-10-17 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0004_rating_created_at_defaut'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rating',
+            name='session_key',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='ratings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('user', 'movie_id'), name='rating_unique_utilisateur_film'),
+        ),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('session_key', 'movie_id'), name='rating_unique_session_film'),
+        ),
+    ]
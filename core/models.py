@@ -1,10 +1,55 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class Rating(models.Model):
+    """Note d'un profil sur un film : utilisateur connecté, sinon clé de session anonyme.
+
+    Un profil n'a qu'une note par film (index uniques (user, movie_id) et
+    (session_key, movie_id)) : noter à nouveau remplace la note. Les notes
+    importées ou antérieures aux profils n'ont ni utilisateur ni session.
+    """
+    # Pas d'index propre : l'index unique (user, movie_id) sert aussi aux recherches par utilisateur
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='ratings', db_index=False)
+    session_key = models.CharField(max_length=40, null=True, blank=True)
     movie_id = models.IntegerField(db_index=True)
     title = models.CharField(max_length=200, blank=True)
     rating = models.IntegerField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Valeur par défaut plutôt qu'auto_now_add : un import conserve la date d'origine.
+    # Remise à l'heure quand le profil note à nouveau le film.
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            # NULL n'entre pas en conflit : les notes anonymes et sans profil n'y sont pas soumises
+            models.UniqueConstraint(fields=['user', 'movie_id'], name='rating_unique_utilisateur_film'),
+            models.UniqueConstraint(fields=['session_key', 'movie_id'], name='rating_unique_session_film'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.movie_id}) = {self.rating}"
+
+
+class RatingStats(models.Model):
+    """Somme et nombre de notes par film, tenus à jour à chaque vote."""
+    movie_id = models.IntegerField(unique=True)
+    somme = models.BigIntegerField(default=0)
+    nombre = models.IntegerField(default=0)
+
+    @property
+    def moyenne(self):
+        return round(self.somme / self.nombre, 2) if self.nombre else None
+
+    def __str__(self):
+        return f"{self.movie_id}: {self.moyenne} ({self.nombre})"
+
+
+class Poster(models.Model):
+    """URL de poster TMDB mise en cache par film (None = pas de poster, cache négatif)."""
+    movie_id = models.IntegerField(unique=True)
+    poster_url = models.URLField(max_length=300, null=True, blank=True)
+    expire_le = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.movie_id} -> {self.poster_url or '∅'}"
@@ -0,0 +1,231 @@
+import asyncio
+import csv
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import Poster
+from sadia_site.src.metriques import REGISTRE, compter_cache, span
+
+logger = logging.getLogger(__name__)
+
+TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
+
+_session = None
+_ERREUR = object()  # échec réseau : rien n'est mis en cache
+
+
+def _clean_title(title):
+    """Supprime l’année entre parenthèses à la fin du titre (sans regex)."""
+    if not title:
+        return title
+
+    pos = title.rfind('(')
+    if pos != -1 and title.endswith(')'):
+        inside = title[pos+1:-1]
+        # Vérifie si c’est bien une année (ex: '1999')
+        if len(inside) == 4 and inside.isdigit():
+            return title[:pos].strip()
+    return title.strip()
+
+
+def _extract_year(title):
+    """Retourne l’année si elle est présente à la fin du titre."""
+    if not title:
+        return None
+    pos = title.rfind('(')
+    if pos != -1 and title.endswith(')'):
+        inside = title[pos+1:-1]
+        if len(inside) == 4 and inside.isdigit():
+            return int(inside)
+    return None
+
+
+def _get_session():
+    """Session HTTP partagée : les connexions vers TMDB sont réutilisées entre les appels."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adaptateur = HTTPAdapter(pool_connections=4, pool_maxsize=settings.TMDB_WORKERS)
+        session.mount('http://', adaptateur)
+        session.mount('https://', adaptateur)
+        _session = session
+    return _session
+
+
+@lru_cache(maxsize=1)
+def _liens_tmdb():
+    """movieId -> tmdbId d'après links.csv (vide si le fichier est absent)."""
+    links_path = Path(settings.BASE_DIR) / 'data' / 'ml-latest-small' / 'links.csv'
+    liens = {}
+    if links_path.exists():
+        with links_path.open(encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    liens[int(row['movieId'])] = int(row['tmdbId'])
+                except (TypeError, ValueError):
+                    continue
+    return liens
+
+
+def _requete_tmdb(chemin, params):
+    params = dict(params, api_key=settings.TMDB_API_KEY)
+    with span('tmdb'):
+        response = _get_session().get(settings.TMDB_API_URL + chemin, params=params,
+                                      timeout=settings.TMDB_TIMEOUT)
+    REGISTRE.incrementer('bobetteflix_tmdb_appels_total', 1, "Appels à l'API TMDB par statut HTTP",
+                         statut=response.status_code)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+def _requete_poster(movie_id, title):
+    """(chemin, paramètres, par_id) de la requête TMDB d'un film : par tmdbId si connu, sinon par titre."""
+    tmdb_id = _liens_tmdb().get(movie_id)
+    if tmdb_id is not None:
+        return f"/movie/{tmdb_id}", {"language": "fr-FR"}, True
+    params = {"query": _clean_title(title), "language": "fr-FR"}
+    year = _extract_year(title)
+    if year:
+        params["year"] = year
+    return "/search/movie", params, False
+
+
+def _url_poster(data, par_id):
+    """URL du poster d'une réponse TMDB (fiche du film ou résultats de recherche), sinon None."""
+    data = data or {}
+    if par_id:
+        poster_path = data.get("poster_path")
+    else:
+        results = data.get("results") or []
+        poster_path = results[0].get("poster_path") if results else None
+    return TMDB_IMAGE_BASE + poster_path if poster_path else None
+
+
+def _chercher_poster(movie_id, title):
+    """Interroge TMDB (par tmdbId si connu, sinon par titre) et retourne l’URL du poster ou None."""
+    chemin, params, par_id = _requete_poster(movie_id, title)
+    return _url_poster(_requete_tmdb(chemin, params), par_id)
+
+
+def _chercher_ou_none(film):
+    try:
+        return _chercher_poster(film['movieId'], film.get('title', ''))
+    except Exception as e:
+        REGISTRE.incrementer('bobetteflix_tmdb_erreurs_total', 1, "Échecs réseau des appels TMDB")
+        logger.warning("Erreur TMDB pour %s : %s", film.get('title'), e)
+        return _ERREUR
+
+
+def _posters_valides(films):
+    """(maintenant, posters en cache, films manquants ou expirés) pour une liste de films."""
+    maintenant = timezone.now()
+    ids = [f['movieId'] for f in films]
+    posters = dict(
+        Poster.objects.filter(movie_id__in=ids, expire_le__gt=maintenant)
+        .values_list('movie_id', 'poster_url')
+    )
+    manquants = list({f['movieId']: f for f in films if f['movieId'] not in posters}.values())
+    compter_cache('posters', True, len(posters))
+    compter_cache('posters', False, len(manquants))
+    return maintenant, posters, manquants
+
+
+def _enregistrer_posters(maintenant, posters, manquants, urls):
+    """Complète ``posters`` avec les ``urls`` trouvées et les écrit en une fois (sauf les échecs réseau)."""
+    ttl = timedelta(seconds=settings.POSTER_TTL)
+    ttl_negatif = timedelta(seconds=settings.POSTER_TTL_NEGATIF)
+    entrees = []
+    for film, url in zip(manquants, urls):
+        if url is _ERREUR:
+            posters[film['movieId']] = None
+            continue
+        posters[film['movieId']] = url
+        entrees.append(Poster(movie_id=film['movieId'], poster_url=url,
+                              expire_le=maintenant + (ttl if url else ttl_negatif)))
+    Poster.objects.bulk_create(entrees, update_conflicts=True, unique_fields=['movie_id'],
+                               update_fields=['poster_url', 'expire_le'])
+    return posters
+
+
+def posters_pour_films(films):
+    """Retourne {movieId: poster_url} pour une liste de films.
+
+    Les entrées encore valides sont lues en une requête dans la table ``Poster`` ;
+    les manquantes ou expirées sont demandées à TMDB en parallèle, puis écrites
+    en une seule fois. Un film sans poster est mis en cache négatif, avec une
+    durée de vie plus courte.
+    """
+    films = [f for f in films if f.get('movieId') is not None]
+    if not films:
+        return {}
+
+    maintenant, posters, manquants = _posters_valides(films)
+    if not manquants or not settings.TMDB_API_KEY:
+        return posters
+
+    with ThreadPoolExecutor(max_workers=settings.TMDB_WORKERS) as pool:
+        urls = list(pool.map(_chercher_ou_none, manquants))
+    return _enregistrer_posters(maintenant, posters, manquants, urls)
+
+
+# --------------------------------------------
+# Version asynchrone (API JSON servie par ASGI)
+# --------------------------------------------
+
+async def _chercher_poster_async(client, limite, film):
+    chemin, params, par_id = _requete_poster(film['movieId'], film.get('title', ''))
+    try:
+        async with limite:
+            with span('tmdb'):
+                response = await client.get(settings.TMDB_API_URL + chemin,
+                                            params=dict(params, api_key=settings.TMDB_API_KEY))
+        REGISTRE.incrementer('bobetteflix_tmdb_appels_total', 1, "Appels à l'API TMDB par statut HTTP",
+                             statut=response.status_code)
+        return _url_poster(response.json() if response.status_code == 200 else None, par_id)
+    except Exception as e:
+        REGISTRE.incrementer('bobetteflix_tmdb_erreurs_total', 1, "Échecs réseau des appels TMDB")
+        logger.warning("Erreur TMDB pour %s : %s", film.get('title'), e)
+        return _ERREUR
+
+
+async def posters_pour_films_async(films, delai=None):
+    """Comme ``posters_pour_films``, sans bloquer la boucle d'événements.
+
+    Les appels TMDB partent en même temps (au plus ``TMDB_WORKERS`` à la fois)
+    avec un client HTTP asynchrone ; ceux qui n'ont pas répondu après ``delai``
+    secondes (défaut : ``TMDB_DELAI_TOTAL``) sont abandonnés : leur film reste
+    sans poster pour cette réponse et n'est pas mis en cache. Les accès à la
+    table ``Poster`` passent par ``sync_to_async``.
+    """
+    films = [f for f in films if f.get('movieId') is not None]
+    if not films:
+        return {}
+
+    maintenant, posters, manquants = await sync_to_async(_posters_valides)(films)
+    if not manquants or not settings.TMDB_API_KEY:
+        return posters
+
+    delai = settings.TMDB_DELAI_TOTAL if delai is None else delai
+    limite = asyncio.Semaphore(settings.TMDB_WORKERS)
+    async with httpx.AsyncClient(timeout=settings.TMDB_TIMEOUT) as client:
+        taches = [asyncio.create_task(_chercher_poster_async(client, limite, film)) for film in manquants]
+        _, en_retard = await asyncio.wait(taches, timeout=delai)
+        for tache in en_retard:
+            tache.cancel()
+        if en_retard:
+            REGISTRE.incrementer('bobetteflix_tmdb_abandons_total', len(en_retard),
+                                 "Appels TMDB abandonnés faute de réponse dans le délai")
+            await asyncio.gather(*en_retard, return_exceptions=True)
+    urls = [_ERREUR if tache in en_retard else tache.result() for tache in taches]
+    return await sync_to_async(_enregistrer_posters)(maintenant, posters, manquants, urls)
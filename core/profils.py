@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .models import Rating
+from sadia_site.src.mise_a_jour import NOTE_MINIMALE
+
+
+# --------------------------------------------
+# Profils de notation
+# --------------------------------------------
+
+class Profil(namedtuple('Profil', ['user_id', 'session_key'])):
+    """Auteur des notes : utilisateur connecté (``user_id``), sinon session anonyme (``session_key``).
+
+    Les notes d'un profil se lisent par l'index unique (user, movie_id) ou
+    (session_key, movie_id) : le coût dépend de son seul historique, pas du
+    volume de notes du site.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def de_note(cls, note):
+        return cls(note.user_id, None) if note.user_id is not None else cls(None, note.session_key)
+
+    @property
+    def portee(self):
+        """Portée du cache des recommandations (``cache_reco``) propre au profil."""
+        return f'u{self.user_id}' if self.user_id is not None else f's{self.session_key}'
+
+    def filtre(self):
+        return {'user_id': self.user_id} if self.user_id is not None else {'session_key': self.session_key}
+
+    def champs(self):
+        """Champs d'une nouvelle ``Rating`` du profil."""
+        return {'user_id': self.user_id, 'session_key': None if self.user_id is not None else self.session_key}
+
+    def notes(self):
+        """Tableau (movie_id, note) des notes du profil : les graines de ses recommandations."""
+        notes = Rating.objects.filter(**self.filtre()).values_list('movie_id', 'rating')
+        return np.array(list(notes), dtype=np.int64).reshape(-1, 2)
+
+
+def profil_de(request, creer=False):
+    """Profil de la requête, ou None pour un visiteur sans session.
+
+    Avec ``creer``, une session est ouverte pour le visiteur anonyme (ou
+    rouverte si son cookie a expiré) : ses notes lui restent attachées tant
+    que le cookie de session vit.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return Profil(user.pk, None)
+    session = request.session
+    if creer and (session.session_key is None or not session.exists(session.session_key)):
+        session.create()  # marque la session modifiée : le cookie part avec la réponse
+    return Profil(None, session.session_key) if session.session_key else None
+
+
+def evaluations_des_profils(seuil=NOTE_MINIMALE):
+    """Notes >= ``seuil`` des profils, au format de ratings.csv (un ``userId`` dense par profil).
+
+    Les notes sans profil (imports) sont écartées : sans utilisateur, elles
+    ne forment aucune co-occurrence.
+    """
+    lignes = list(Rating.objects.filter(rating__gte=seuil)
+                  .exclude(user__isnull=True, session_key__isnull=True)
+                  .values_list('user_id', 'session_key', 'movie_id', 'rating', 'created_at')
+                  .iterator(chunk_size=10_000))
+    if not lignes:
+        return pd.DataFrame({'userId': pd.Series(dtype=np.int32), 'movieId': pd.Series(dtype=np.int32),
+                             'rating': pd.Series(dtype=np.float32), 'timestamp': pd.Series(dtype=np.uint32)})
+    user_ids, session_keys, movie_ids, notes, dates = zip(*lignes)
+    profils = [Profil(u, k).portee for u, k in zip(user_ids, session_keys)]
+    return pd.DataFrame({
+        'userId': pd.factorize(pd.Series(profils))[0].astype(np.int32),
+        'movieId': np.asarray(movie_ids, dtype=np.int32),
+        'rating': np.asarray(notes, dtype=np.float32),
+        'timestamp': np.asarray([d.timestamp() for d in dates], dtype=np.uint32),
+    })
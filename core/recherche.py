@@ -0,0 +1,183 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+from .catalogue import get_catalogue
+from .posters import _clean_title, _extract_year
+from sadia_site.src.metriques import span
+
+# Plafond de candidats lus par préfixe (une requête d'une lettre en couvre des milliers)
+MAX_CANDIDATS_PREFIXE = 500
+# Similarité de Dice minimale (trigrammes) pour une correspondance approchée
+SEUIL_FLOU = 0.35
+# Score minimal pour qu'un titre saisi soit rattaché à un film
+SEUIL_RESOLUTION = 0.6
+
+_NON_ALPHANUMERIQUE = re.compile(r'[^0-9a-z]+')
+# MovieLens range l'article à la fin : « Matrix, The », « Auberge espagnole, L' »
+_ARTICLE_FINAL = re.compile(
+    r"^(.*), (the|a|an|le|la|les|l'|un|une|der|die|das|el|los|las|il|lo)$", re.IGNORECASE)
+_ANNEE_FINALE = re.compile(r'^(.+?)\s+((?:18|19|20)\d\d)$')
+
+
+def normaliser(texte):
+    """Minuscules, sans accents ni ponctuation, espaces simples."""
+    texte = unicodedata.normalize('NFKD', texte)
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' '.join(_NON_ALPHANUMERIQUE.sub(' ', texte).split())
+
+
+def variantes(titre):
+    """Titres normalisés d'un film : titre principal, puis titre alternatif entre parenthèses."""
+    titre = _clean_title(titre) or ''
+    noms = [titre]
+    position = titre.find(' (')
+    if position != -1 and titre.endswith(')'):
+        noms = [titre[:position], titre[position + 2:-1]]
+
+    resultat = []
+    for nom in noms:
+        correspondance = _ARTICLE_FINAL.match(nom.strip())
+        if correspondance:
+            nom = f'{correspondance.group(2)} {correspondance.group(1)}'
+        nom = normaliser(nom)
+        if nom and nom not in resultat:
+            resultat.append(nom)
+    return resultat
+
+
+def trigrammes(texte):
+    """Trigrammes de chaque mot, complétés par des espaces (comme pg_trgm)."""
+    resultat = set()
+    for mot in texte.split():
+        mot = f'  {mot} '
+        resultat.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return resultat
+
+
+class IndexTitres:
+    """Index de recherche des titres du catalogue, construit une fois en mémoire.
+
+    Chaque film contribue une ou plusieurs entrées (titre principal, titre
+    alternatif). Deux structures sont interrogées :
+      - les suffixes de chaque entrée commençant à un début de mot, triés :
+        une recherche par préfixe est une dichotomie ;
+      - les listes inversées de trigrammes : la similarité de Dice de toutes les
+        entrées se calcule d'un seul ``np.bincount``.
+    """
+
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+        self.annees = np.array([_extract_year(t) or 0 for t in catalogue.titres], dtype=np.int16)
+
+        self.entrees = []
+        positions = []
+        for position, titre in enumerate(catalogue.titres):
+            for variante in variantes(titre):
+                self.entrees.append(variante)
+                positions.append(position)
+        self.positions = np.array(positions, dtype=np.int32)
+
+        suffixes = []
+        postings = {}
+        nb_trigrammes = np.zeros(len(self.entrees), dtype=np.int32)
+        for i, entree in enumerate(self.entrees):
+            debut = 0
+            for mot in entree.split(' '):
+                suffixes.append((entree[debut:], i))
+                debut += len(mot) + 1
+            grammes = trigrammes(entree)
+            nb_trigrammes[i] = len(grammes)
+            for gramme in grammes:
+                postings.setdefault(gramme, []).append(i)
+        suffixes.sort()
+        self.suffixes = [s for s, _ in suffixes]
+        self.suffixes_entrees = np.array([i for _, i in suffixes], dtype=np.int32)
+        self.nb_trigrammes = nb_trigrammes
+        self.trigrammes = {g: np.array(liste, dtype=np.int32) for g, liste in postings.items()}
+
+    @staticmethod
+    def analyser(requete):
+        """(texte normalisé, année ou None) : « Heat (1995) » comme « heat 1995 »."""
+        annee = _extract_year(requete.strip())
+        texte = _clean_title(requete) or ''
+        if annee is None:
+            correspondance = _ANNEE_FINALE.match(texte.strip())
+            if correspondance:
+                texte, annee = correspondance.group(1), int(correspondance.group(2))
+        return normaliser(texte), annee
+
+    def rechercher(self, requete, limite=10):
+        """Meilleurs films pour ``requete`` : liste de (position dans le catalogue, score).
+
+        Les correspondances par préfixe passent devant (titre exact, puis début de
+        titre, puis début d'un mot, les titres courts d'abord) ; les correspondances
+        approchées par trigrammes complètent la liste. L'année, si elle est donnée,
+        départage.
+        """
+        texte, annee = self.analyser(requete)
+        if not texte:
+            return []
+
+        scores = {}
+
+        def retenir(entree, score):
+            position = int(self.positions[entree])
+            if annee is not None and self.annees[position] == annee:
+                score += 1.0
+            if score > scores.get(position, -1.0):
+                scores[position] = score
+
+        debut = bisect_left(self.suffixes, texte)
+        fin = min(bisect_left(self.suffixes, texte + '\uffff'), debut + MAX_CANDIDATS_PREFIXE)
+        for suffixe, entree in zip(self.suffixes[debut:fin], self.suffixes_entrees[debut:fin].tolist()):
+            titre = self.entrees[entree]
+            score = 2.0 + (1.0 if titre == texte else 0.0) + (0.5 if suffixe == titre else 0.0)
+            retenir(entree, score - len(titre) / 1000)
+
+        if len(scores) < limite:
+            grammes = trigrammes(texte)
+            listes = [self.trigrammes[g] for g in grammes if g in self.trigrammes]
+            if listes:
+                communs = np.bincount(np.concatenate(listes), minlength=len(self.entrees))
+                candidats = np.flatnonzero(communs)
+                dice = 2 * communs[candidats] / (len(grammes) + self.nb_trigrammes[candidats])
+                garder = dice >= SEUIL_FLOU
+                candidats, dice = candidats[garder], dice[garder]
+                if len(candidats) > limite * 4:
+                    meilleurs = np.argpartition(-dice, limite * 4)[:limite * 4]
+                    candidats, dice = candidats[meilleurs], dice[meilleurs]
+                for entree, score in zip(candidats.tolist(), dice.tolist()):
+                    retenir(entree, score)
+
+        classement = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return classement[:limite]
+
+    def resoudre(self, titre):
+        """movieId du film désigné par un titre saisi librement, ou None si trop incertain."""
+        resultats = self.rechercher(titre, limite=1)
+        if not resultats or resultats[0][1] < SEUIL_RESOLUTION:
+            return None
+        return int(self.catalogue.movie_ids[resultats[0][0]])
+
+
+_index = None
+_verrou = threading.Lock()
+
+
+def get_index_titres():
+    """Index du catalogue courant ; reconstruit quand le catalogue est rechargé."""
+    global _index
+    catalogue = get_catalogue()
+    index = _index
+    if index is None or index.catalogue is not catalogue:
+        with _verrou:
+            index = _index
+            if index is None or index.catalogue is not catalogue:
+                with span('recherche.index'):
+                    index = IndexTitres(catalogue)
+                _index = index
+    return index
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Rating, RatingStats
+
+
+def ajouter_notes(notes):
+    """Ajoute un lot de notes (movie_id, valeur) : une seule requête d'upsert pour tous les films.
+
+    Un élément (movie_id, valeur, nombre) ajoute ``nombre`` notes de total
+    ``valeur`` : (movie_id, nouvelle - ancienne, 0) remplace une note.
+    INSERT ... ON CONFLICT DO UPDATE (SQLite >= 3.24, PostgreSQL) incrémente les
+    lignes existantes de façon atomique, sans les relire.
+    """
+    totaux = defaultdict(lambda: [0, 0])
+    for movie_id, valeur, *nombre in notes:
+        totaux[movie_id][0] += valeur
+        totaux[movie_id][1] += nombre[0] if nombre else 1
+    if not totaux:
+        return 0
+
+    table = connection.ops.quote_name(RatingStats._meta.db_table)
+    with connection.cursor() as curseur:
+        curseur.executemany(
+            f'INSERT INTO {table} (movie_id, somme, nombre) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (movie_id) DO UPDATE SET somme = {table}.somme + excluded.somme, '
+            f'nombre = {table}.nombre + excluded.nombre',
+            [(movie_id, somme, nombre) for movie_id, (somme, nombre) in totaux.items()],
+        )
+    return len(totaux)
+
+
+def stats_pour(movie_ids):
+    """{movie_id: {'avg', 'count'}} pour les seuls films demandés."""
+    return {
+        s.movie_id: {'avg': s.moyenne, 'count': s.nombre}
+        for s in RatingStats.objects.filter(movie_id__in=list(movie_ids), nombre__gt=0)
+    }
+
+
+@transaction.atomic
+def reconstruire_stats(taille_lot=1000):
+    """Recalcule toute la table depuis core_rating (rattrapage ou réparation)."""
+    RatingStats.objects.all().delete()
+    agregats = Rating.objects.values('movie_id').annotate(somme=Sum('rating'), nombre=Count('id')).order_by()
+    RatingStats.objects.bulk_create(
+        (RatingStats(movie_id=a['movie_id'], somme=a['somme'], nombre=a['nombre']) for a in agregats),
+        batch_size=taille_lot,
+    )
+    return RatingStats.objects.count()
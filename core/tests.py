@@ -1,3 +1,1149 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest.mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.cache_reco import empreinte, invalider, recommandations_en_cache
+from core.catalogue import Catalogue, get_catalogue
+import core.ingestion
+from core.ingestion import IngestionNotes, get_ingestion
+from core.models import Poster, Rating, RatingStats
+from core.stats import ajouter_notes, reconstruire_stats, stats_pour
+from core.posters import posters_pour_films
+from core.profils import Profil, evaluations_des_profils
+from core.recherche import IndexTitres, variantes
+
+from sadia_site.src.modele import ModeleRecommandation
+from sadia_site.src.recommendation import ChargementDonnees, ConstructionGraphe, MetriquesEvaluation, RecommandationMarcheAleatoire, top_k_colonnes
+from sadia_site.src.contenu import CaracteristiquesContenu, GENRES, masque_filtre
+from sadia_site.src.factorisation import FactorisationALS, resoudre_cg
+from sadia_site.src.evaluation import EvaluationHorsLigne, decouper_par_date
+from sadia_site.src.metriques import REGISTRE, Registre, span
+from sadia_site.src.mise_a_jour import MiseAJourIncrementale
+from sadia_site.src.service import ServiceRecommandation
+from sadia_site.src.synthetique import generer_movielens
+from sadia_site.src.voisins import IndexVoisins
+
+
+def _evaluations_test():
+    """Petit jeu d'évaluations déjà nettoyé (notes >= 4)."""
+    couples = [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (2, 1), (2, 2), (2, 3), (3, 4)]
+    evaluations = pd.DataFrame(couples, columns=['id_utilisateur', 'id_film'])
+    evaluations['userId'] = evaluations['id_utilisateur'] + 1
+    evaluations['movieId'] = evaluations['id_film'] * 10 + 1
+    evaluations['rating'] = 4.0
+    return evaluations
+
+
+def _modele_test():
+    """Modèle en mémoire construit sur ``_evaluations_test`` (movieId = 10·id_film + 1)."""
+    evaluations = _evaluations_test()
+    graphe = ConstructionGraphe(evaluations)
+    matrice = graphe.construire_matrice_transition()
+    colonnes = {nom: evaluations[nom].to_numpy() for nom in evaluations.columns}
+    ids_films = np.array([1, 11, 21, 31, 41], dtype=np.int32)
+    return ModeleRecommandation(colonnes, ids_films, matrice, 'v1', sommes_lignes=graphe.sommes_lignes)
+
+
+class ConstructionGrapheTests(TestCase):
+    def test_creuse_identique_a_dense(self):
+        evaluations = _evaluations_test()
+        creuse = ConstructionGraphe(evaluations).construire_matrice_transition()
+        dense = ConstructionGraphe(evaluations, creuse=False).construire_matrice_transition()
+
+        self.assertEqual(creuse.shape, (5, 5))
+        # Film 4 n'a aucune co-occurrence : ligne vide en creux, uniforme en dense
+        self.assertEqual(creuse[4].nnz, 0)
+        np.testing.assert_allclose(dense[4], np.full(5, 0.2))
+        np.testing.assert_allclose(creuse.toarray()[:4], dense[:4], atol=1e-6)
+
+        scores_creux = RecommandationMarcheAleatoire(creuse).marche_aleatoire_naive([0], 20)
+        scores_denses = RecommandationMarcheAleatoire(dense).marche_aleatoire_naive([0], 20)
+        np.testing.assert_allclose(scores_creux, scores_denses, atol=1e-6)
+
+    def test_construction_multiprocessus(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_movielens(dossier, 5000, graine=2)
+            chargement = ChargementDonnees(cache=False)
+            chargement.charger_movielens(dossier)
+
+        sequentielle = ConstructionGraphe(chargement.evaluations).construire_cooccurrences()
+        parallele = ConstructionGraphe(chargement.evaluations, nb_processus=2).construire_cooccurrences()
+        self.assertEqual(abs(sequentielle - parallele).max(), 0)
+
+    def test_top_k_elague_chaque_ligne(self):
+        graphe = ConstructionGraphe(_evaluations_test(), top_k=1)
+        cooccurrences = graphe.construire_cooccurrences()
+        self.assertLessEqual(np.diff(cooccurrences.indptr).max(), 1)
+        # Film 1 co-occurre deux fois avec 0 et 2, une fois avec 3 : on garde un voisin à 2
+        self.assertEqual(cooccurrences[1].data.tolist(), [2.0])
+
+        transition = graphe.construire_matrice_transition()
+        sommes = np.asarray(transition.sum(axis=1)).ravel()
+        np.testing.assert_allclose(sommes[:4], 1.0, rtol=1e-6)
+
+
+class MarcheParLotsTests(TestCase):
+    def setUp(self):
+        matrice = ConstructionGraphe(_evaluations_test()).construire_matrice_transition()
+        self.marche = RecommandationMarcheAleatoire(matrice)
+
+    def test_lots_identiques_aux_marches_individuelles(self):
+        graines = np.zeros((5, 3))
+        graines[[0, 2], 0] = 1
+        graines[3, 1] = 1  # la troisième colonne reste vide
+
+        scores = self.marche.marche_aleatoire_par_lots(graines, alpha=0.0, iterations_max=15, tolerance=0)
+        np.testing.assert_allclose(scores[:, 0], self.marche.marche_aleatoire_naive([0, 2], 15), atol=1e-6)
+        np.testing.assert_allclose(scores[:, 1], self.marche.marche_aleatoire_naive([3], 15), atol=1e-6)
+        np.testing.assert_array_equal(scores[:, 2], 0)
+
+    def test_redemarrage_et_top_k(self):
+        graines = np.zeros((5, 1))
+        graines[0, 0] = 1
+        scores = self.marche.marche_aleatoire_par_lots(graines, alpha=0.5)
+        self.assertAlmostEqual(float(scores.sum()), 1.0, places=5)
+
+        indices, valeurs = top_k_colonnes(scores, 2, exclure=graines > 0)
+        self.assertNotIn(0, indices[:, 0])
+        self.assertTrue(np.all(np.diff(valeurs[:, 0]) <= 0))
+        self.assertEqual(indices[0, 0], int(np.argmax(np.where(graines[:, 0] > 0, -1, scores[:, 0]))))
+
+
+class ArtefactModeleTests(TestCase):
+    def test_sauvegarde_puis_chargement_mmap(self):
+        evaluations = _evaluations_test()
+        matrice = ConstructionGraphe(evaluations).construire_matrice_transition()
+        colonnes = {nom: evaluations[nom].to_numpy() for nom in evaluations.columns}
+        ids_films = np.array([1, 11, 21, 31, 41], dtype=np.int32)
+        modele = ModeleRecommandation(colonnes, ids_films, matrice, 'v1')
+
+        with tempfile.TemporaryDirectory() as racine:
+            modele.sauvegarder(racine)
+            charge = ModeleRecommandation.charger(racine)
+
+            self.assertEqual(charge.version, 'v1')
+            self.assertIsInstance(charge.ids_films, np.memmap)
+            np.testing.assert_array_equal(charge.ids_films, ids_films)
+            np.testing.assert_allclose(charge.matrice_transition.toarray(), matrice.toarray())
+            self.assertEqual(charge.evaluations['movieId'].tolist(), evaluations['movieId'].tolist())
+
+    def test_precalcul_hors_de_l_artefact(self):
+        modele = _modele_test()
+        service = ServiceRecommandation(chargeur=lambda: modele)
+        with tempfile.TemporaryDirectory() as racine, \
+                unittest.mock.patch('core.management.commands.precompute_reco.get_recommender', return_value=service):
+            artefact = modele.sauvegarder(Path(racine) / 'modele')
+            fichiers_artefact = sorted(os.listdir(artefact))
+            with self.assertRaises(CommandError):
+                call_command('precompute_reco', sortie=str(Path(racine) / 'modele'), stdout=open(os.devnull, 'w'))
+
+            call_command('precompute_reco', k=3, sortie=str(Path(racine) / 'precalculs'),
+                         stdout=open(os.devnull, 'w'))
+            self.assertEqual(sorted(os.listdir(artefact)), fichiers_artefact)
+            export = Path(racine) / 'precalculs' / 'v1'
+            manifeste = json.loads((export / 'manifeste.json').read_text())
+            utilisateurs = np.load(export / 'utilisateurs.npy')
+            films = np.load(export / 'films.npy')
+
+        self.assertEqual(manifeste['modele'], 'v1')
+        self.assertEqual(utilisateurs.tolist(), [1, 2, 3, 4])
+        # Jamais un film déjà aimé ; moins de k candidats : cases à -1
+        self.assertFalse(set(films[0].tolist()) & {1, 11, 21})
+        self.assertIn(-1, films[0].tolist())
+        # Film 41 sans voisin : la marche de l'utilisateur 4 se répartit sur tout le catalogue
+        self.assertNotIn(41, films[3].tolist())
+        self.assertNotIn(-1, films[3].tolist())
+
+
+class ServiceRecommandationTests(TestCase):
+    def test_chargement_paresseux_unique(self):
+        appels = []
+        service = ServiceRecommandation(chargeur=lambda: appels.append(1) or object())
+        self.assertFalse(service.is_ready)
+
+        threads = [threading.Thread(target=lambda: service.modele) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(service.is_ready)
+        self.assertEqual(len(appels), 1)
+
+    def test_reload_remplace_le_modele(self):
+        service = ServiceRecommandation(chargeur=object)
+        premier = service.modele
+        self.assertTrue(service.reload())
+        self.assertIsNot(service.modele, premier)
+
+
+class RecommandationDepuisNotesTests(TestCase):
+    def setUp(self):
+        self.modele = _modele_test()
+
+    def test_index_movie_id(self):
+        np.testing.assert_array_equal(self.modele.ids_internes([21, 1, 5, 999, -3]), [2, 0, -1, -1, -1])
+
+    def test_exclut_les_films_notes_et_pondere_par_la_note(self):
+        movie_ids, scores = self.modele.recommander([1, 21, 999], [5, 4, 4], n=3)
+        self.assertNotIn(1, movie_ids)
+        self.assertNotIn(21, movie_ids)
+        # Film 11 co-occurre avec 1 et 21, film 31 seulement avec 21
+        self.assertEqual(movie_ids.tolist(), [11, 31])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_note_basse_sans_effet_sur_les_voisins(self):
+        # 31 ne co-occurre qu'avec 21, mal noté : il n'est pas recommandé, 21 reste exclu
+        movie_ids, _ = self.modele.recommander([1, 21], [5, 1], n=3)
+        self.assertEqual(movie_ids.tolist(), [11])
+        self.assertEqual(len(self.modele.recommander([21], [2], n=3)[0]), 0)
+
+    def test_aucune_graine_connue(self):
+        movie_ids, scores = self.modele.recommander([999], [5])
+        self.assertEqual(len(movie_ids), 0)
+
+
+class _TmdbFactice(BaseHTTPRequestHandler):
+    """Remplace l'API TMDB : /movie/<tmdbId> renvoie un poster sauf pour l'id 0, après ``delai`` secondes."""
+    appels = []
+    delai = 0
+
+    def do_GET(self):
+        self.appels.append(self.path)
+        time.sleep(self.delai)
+        tmdb_id = self.path.split('?')[0].rsplit('/', 1)[-1]
+        corps = {'poster_path': None if tmdb_id == '0' else f'/{tmdb_id}.jpg'}
+        contenu = json.dumps(corps).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(contenu)))
+            self.end_headers()
+            self.wfile.write(contenu)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client parti avant la réponse (délai dépassé) : attendu, pas une erreur
+
+    def log_message(self, *args):
+        pass
+
+
+class ServeurTmdbMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.serveur = ThreadingHTTPServer(('127.0.0.1', 0), _TmdbFactice)
+        threading.Thread(target=cls.serveur.serve_forever, daemon=True).start()
+        cls.url_tmdb = f'http://127.0.0.1:{cls.serveur.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.serveur.shutdown()
+        cls.serveur.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        _TmdbFactice.appels.clear()
+        _TmdbFactice.delai = 0
+
+
+class PostersTests(ServeurTmdbMixin, TestCase):
+    def test_cache_persistant_et_negatif(self):
+        films = [{'movieId': 1, 'title': 'Toy Story (1995)'}, {'movieId': 2, 'title': 'Jumanji (1995)'}]
+        with override_settings(TMDB_API_KEY='cle', TMDB_API_URL=self.url_tmdb):
+            posters = posters_pour_films(films)
+            self.assertTrue(posters[1].endswith('/862.jpg'))  # tmdbId de links.csv
+            self.assertEqual(len(_TmdbFactice.appels), 2)
+
+            # Deuxième passage : tout vient de la table, aucun appel HTTP
+            self.assertEqual(posters_pour_films(films), posters)
+            self.assertEqual(len(_TmdbFactice.appels), 2)
+            self.assertEqual(Poster.objects.count(), 2)
+
+    def test_sans_poster_expire_plus_tot(self):
+        with override_settings(TMDB_API_KEY='cle', TMDB_API_URL=self.url_tmdb, POSTER_TTL_NEGATIF=0), \
+                unittest.mock.patch('core.posters._liens_tmdb', return_value={5: 0}):
+            self.assertIsNone(posters_pour_films([{'movieId': 5, 'title': 'X'}])[5])
+            posters_pour_films([{'movieId': 5, 'title': 'X'}])
+            self.assertEqual(len(_TmdbFactice.appels), 2)
+
+
+class CatalogueTests(TestCase):
+    def _ecrire(self, chemin, lignes):
+        with open(chemin, 'w', encoding='utf-8') as f:
+            f.write('movieId,title,genres\n')
+            for ligne in lignes:
+                f.write(ligne + '\n')
+
+    def test_page_et_curseur(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'movies.csv')
+            self._ecrire(chemin, [f'{i},Film {i} (2000),Drama' for i in (5, 7, 9, 12)])
+            catalogue = Catalogue.charger(chemin)
+
+        self.assertEqual(len(catalogue), 4)
+        self.assertEqual([f['movieId'] for f in catalogue.page(1, 2)], [7, 9])
+        self.assertEqual(catalogue.page(3, 10), [catalogue.film_par_id(12)])
+        self.assertEqual(catalogue.position_apres(9), 3)
+        self.assertIsNone(catalogue.film_par_id(6))
+
+    def test_filtre_genres(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'movies.csv')
+            self._ecrire(chemin, ['5,A,Comedy', '7,B,Drama', '9,C,Comedy|Romance', '12,D,Comedy|Drama'])
+            catalogue = Catalogue.charger(chemin)
+
+        self.assertIsNone(catalogue.selection(0))
+        comedies = catalogue.selection(masque_filtre('comedy'))
+        self.assertEqual([f['movieId'] for f in catalogue.page(1, 5, comedies)], [9, 12])
+        self.assertEqual(catalogue.position_apres(7, comedies), 1)  # 7 n'est pas une comédie : on reprend après
+        self.assertEqual(len(catalogue.selection(masque_filtre('Comedy,Drama'))), 1)
+        with self.assertRaises(ValueError):
+            masque_filtre('Comedie')
+
+    def test_rechargement_si_fichier_modifie(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'movies.csv')
+            self._ecrire(chemin, ['1,Un,Drama'])
+            with unittest.mock.patch('core.catalogue.chemin_films', return_value=Path(chemin)):
+                premier = get_catalogue()
+                self.assertIs(get_catalogue(), premier)
+
+                self._ecrire(chemin, ['1,Un,Drama', '2,Deux,Comedy'])
+                os.utime(chemin, ns=(0, premier.mtime + 1_000_000))
+                self.assertEqual(len(get_catalogue()), 2)
+
+    def test_home_pagine(self):
+        reponse = self.client.get('/', {'offset': 3, 'page_size': 2})
+        self.assertEqual(reponse.status_code, 200)
+        films = reponse.context['films']
+        self.assertEqual(len(films), 2)
+        self.assertEqual(films[0]['movieId'], get_catalogue().page(3, 1)[0]['movieId'])
+
+        suite = self.client.get('/', {'apres': films[-1]['movieId'], 'page_size': 2})
+        self.assertEqual(suite.context['films'][0]['movieId'], get_catalogue().page(5, 1)[0]['movieId'])
+
+        westerns = self.client.get('/', {'genres': 'Western', 'page_size': 3}).context['films']
+        self.assertTrue(all('Western' in f['genres'] for f in westerns))
+
+        # Taille de page bornée : une requête ne matérialise jamais tout le catalogue
+        bornee = self.client.get('/', {'page_size': 10_000}).context
+        self.assertEqual(bornee['page_size'], 100)
+        self.assertLessEqual(len(bornee['films']), 100)
+
+
+@override_settings(NOTES_INTERVALLE=0)
+class RatingStatsTests(TestCase):
+    def test_rate_met_a_jour_les_stats(self):
+        # Le même visiteur note trois fois : chaque note remplace la précédente
+        for note in (5, 4, 2):
+            self.client.post('/rate/', {'movie_id': 1, 'title': 'Toy Story (1995)', 'rating': note})
+        self.assertEqual(Rating.objects.count(), 1)
+        autre = self.client_class()
+        autre.post('/rate/', {'movie_id': 1, 'title': 'Toy Story (1995)', 'rating': 5})
+
+        stats = RatingStats.objects.get(movie_id=1)
+        self.assertEqual((stats.somme, stats.nombre, stats.moyenne), (7, 2, 3.5))
+        self.assertEqual(stats_pour([1, 2]), {1: {'avg': 3.5, 'count': 2}})
+
+        reponse = self.client.get('/', {'page_size': 1})
+        self.assertEqual(reponse.context['films'][0]['avg'], 3.5)
+
+    def test_ajouter_notes_agrege_par_film(self):
+        self.assertEqual(ajouter_notes([(3, 4), (3, 2), (9, 5)]), 2)
+        ajouter_notes([(3, 5)])
+        self.assertEqual(stats_pour([3, 9]), {3: {'avg': 3.67, 'count': 3}, 9: {'avg': 5.0, 'count': 1}})
+        # Note remplacée : seul l'écart est ajouté
+        ajouter_notes([(9, -3, 0)])
+        self.assertEqual(stats_pour([9]), {9: {'avg': 2.0, 'count': 1}})
+
+    def test_reconstruction(self):
+        Rating.objects.bulk_create([Rating(movie_id=7, rating=3), Rating(movie_id=7, rating=5), Rating(movie_id=8, rating=1)])
+        RatingStats.objects.create(movie_id=99, somme=1, nombre=1)
+
+        self.assertEqual(reconstruire_stats(), 2)
+        self.assertEqual(stats_pour([7, 8, 99]), {7: {'avg': 4.0, 'count': 2}, 8: {'avg': 1.0, 'count': 1}})
+
+
+class IngestionNotesTests(TestCase):
+    @override_settings(NOTES_INTERVALLE=3600, NOTES_TAILLE_MAX=100)
+    def test_notes_ecrites_par_lot(self):
+        ingestion = IngestionNotes()
+        service = unittest.mock.Mock()
+        alice = Profil(User.objects.create(username='alice').pk, None)
+        anonyme = Profil(None, 'cle-de-session')
+        with unittest.mock.patch('core.ingestion.get_recommender', return_value=service), \
+                unittest.mock.patch.object(ingestion, '_demarrer'):
+            Rating.objects.create(movie_id=1, rating=5, **alice.champs())
+            ingestion.ajouter(2, 'B', 4, alice)
+            ingestion.ajouter(3, 'C', 2, alice)
+            ingestion.ajouter(2, 'B', 5, anonyme)
+            ingestion.ajouter(3, 'C', 5, alice)  # remplace la note 2 du même lot
+            self.assertEqual((len(ingestion), Rating.objects.count()), (4, 1))
+
+            self.assertEqual(ingestion.vider(), 3)
+            self.assertEqual(stats_pour([2, 3]), {2: {'avg': 4.5, 'count': 2}, 3: {'avg': 5.0, 'count': 1}})
+            # Chaque film devenu aimé part avec les films que son profil aimait avant lui, lot compris
+            self.assertEqual(service.mises_a_jour.ajouter.call_args_list,
+                             [unittest.mock.call(2, 4, [1]), unittest.mock.call(3, 5, [1, 2]),
+                              unittest.mock.call(2, 5, [])])
+            self.assertEqual(ingestion.vider(), 0)
+
+            # Nouvelle note sur un film déjà noté : upsert, pas de nouvelle ligne ni de co-occurrence
+            service.reset_mock()
+            ingestion.ajouter(2, 'B', 1, alice)
+            ingestion.vider()
+        self.assertEqual(Rating.objects.count(), 4)
+        self.assertEqual(Rating.objects.get(user_id=alice.user_id, movie_id=2).rating, 1)
+        self.assertEqual(stats_pour([2]), {2: {'avg': 3.0, 'count': 2}})
+        service.mises_a_jour.ajouter.assert_not_called()
+        self.assertEqual(sorted(alice.notes().tolist()), [[1, 5], [2, 1], [3, 5]])
+        self.assertEqual(anonyme.notes().tolist(), [[2, 5]])
+
+    @override_settings(NOTES_INTERVALLE=3600)
+    def test_anciennes_notes_lues_sous_le_verrou(self):
+        ingestion = IngestionNotes()
+        anonyme = Profil(None, 'cle-de-session')
+        verrou = core.ingestion._verrouiller_notes
+
+        def autre_lot():
+            # Un autre worker a écrit la même première note juste avant ce lot
+            Rating.objects.create(movie_id=1, rating=4, **anonyme.champs())
+            ajouter_notes([(1, 4)])
+            verrou()
+
+        with unittest.mock.patch('core.ingestion.get_recommender'), \
+                unittest.mock.patch.object(ingestion, '_demarrer'), \
+                unittest.mock.patch('core.ingestion._verrouiller_notes', side_effect=autre_lot):
+            ingestion.ajouter(1, 'A', 5, anonyme)
+            ingestion.vider()
+        # La note de ce lot remplace celle de l'autre : le film n'a toujours qu'un vote
+        self.assertEqual(stats_pour([1]), {1: {'avg': 5.0, 'count': 1}})
+
+    def test_import_csv_et_jsonl(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            csv = Path(dossier) / 'ratings.csv'
+            csv.write_text('userId,movieId,rating,timestamp\n1,1,4.5,964982703\n1,2,0.5,964981247\n'
+                           '2,x,3.0,964982224\n')
+            jsonl = Path(dossier) / 'notes.jsonl'
+            jsonl.write_text('{"movie_id": 2, "rating": 3, "title": "Autre"}\npas du json\n'
+                             '{"movie_id": 2, "rating": Infinity}\n{"movie_id": 2, "rating": 9}\n'
+                             '{"movie_id": 2, "rating": 0}\n{"movie_id": 2, "rating": NaN}\n')
+            call_command('import_ratings', str(csv), lot=2, stdout=open(os.devnull, 'w'))
+            sortie = io.StringIO()
+            call_command('import_ratings', str(jsonl), lot=2, stdout=sortie)
+        # Ligne illisible et notes hors bornes (infinie, 9, 0, NaN) : ignorées, pas ramenées à 1..5
+        self.assertIn('1 notes importées, 5 lignes ignorées', sortie.getvalue())
+
+        notes = list(Rating.objects.order_by('pk').values_list('movie_id', 'rating', 'title'))
+        self.assertEqual(notes, [(1, 5, get_catalogue().film_par_id(1)['title']),
+                                 (2, 1, get_catalogue().film_par_id(2)['title']), (2, 3, 'Autre')])
+        self.assertEqual(Rating.objects.get(rating=5).created_at.timestamp(), 964982703)
+        self.assertEqual(stats_pour([1, 2]), {1: {'avg': 5.0, 'count': 1}, 2: {'avg': 2.0, 'count': 2}})
+
+
+class MiseAJourIncrementaleTests(TestCase):
+    def _modele(self, evaluations):
+        graphe = ConstructionGraphe(evaluations)
+        matrice = graphe.construire_matrice_transition()
+        colonnes = {nom: evaluations[nom].to_numpy() for nom in evaluations.columns}
+        ids_films = np.sort(evaluations['movieId'].unique()).astype(np.int32)
+        return ModeleRecommandation(colonnes, ids_films, matrice, 'v1', sommes_lignes=graphe.sommes_lignes)
+
+    def test_identique_a_une_reconstruction(self):
+        evaluations = _evaluations_test()
+        modele = self._modele(evaluations)
+        service = ServiceRecommandation(chargeur=lambda: modele)
+        mises_a_jour = MiseAJourIncrementale(service, intervalle=3600)
+
+        # Avant chargement du modèle, rien n'est appliqué
+        mises_a_jour.ajouter(41, 5, [1, 31])
+        self.assertEqual(mises_a_jour.vider(), 0)
+        service.prechauffer()
+        mises_a_jour.ajouter(21, 3, [1])  # note trop basse : ignorée
+        self.assertEqual(mises_a_jour.vider(), 2)
+        self.assertEqual(modele.revision, 1)
+
+        # Même graphe qu'en ajoutant un utilisateur qui aime 1, 31 et 41
+        nouvelles = pd.DataFrame({'id_utilisateur': [4, 4, 4], 'id_film': [0, 3, 4]})
+        nouvelles['userId'] = 5
+        nouvelles['movieId'] = nouvelles['id_film'] * 10 + 1
+        nouvelles['rating'] = 5.0
+        attendu = self._modele(pd.concat([evaluations, nouvelles], ignore_index=True))
+        # La paire (1, 31) existait déjà dans la liste de l'utilisateur : elle n'est pas recomptée
+        attendu_comptes = attendu.matrice_transition.multiply(attendu.sommes_lignes[:, None]).toarray()
+        attendu_comptes[0, 3] -= 1
+        attendu_comptes[3, 0] -= 1
+        effective = modele.transition_effective()
+        obtenu_comptes = effective.multiply(modele.sommes_lignes[:, None]).toarray()
+        np.testing.assert_allclose(obtenu_comptes, attendu_comptes, atol=1e-5)
+        np.testing.assert_allclose(np.asarray(effective.sum(axis=1)).ravel(), 1.0, rtol=1e-5)
+
+    def test_file_bornee_sans_modele_charge(self):
+        service = ServiceRecommandation(chargeur=lambda: self.fail("le modèle ne doit pas être chargé"))
+        mises_a_jour = MiseAJourIncrementale(service, intervalle=3600, taille_max=3)
+        with unittest.mock.patch.object(mises_a_jour, '_demarrer'):
+            mises_a_jour.ajouter(41, 5, [1, 11, 21])
+            mises_a_jour.ajouter(31, 5, [1, 11])
+        # Au plus taille_max paires, et le thread n'est pas réveillé pour rien
+        self.assertEqual(len(mises_a_jour), 3)
+        self.assertFalse(mises_a_jour._reveil.is_set())
+        self.assertEqual(mises_a_jour.vider(), 0)
+
+    def test_surcouche_sans_copie_de_la_matrice(self):
+        modele = self._modele(_evaluations_test())
+        base = modele.matrice_transition
+        modele.appliquer_cooccurrences([0, 4, 3, 4], [4, 0, 4, 3])
+        modele.appliquer_cooccurrences([0, 4], [4, 0])
+        # La matrice de base (mmap dans un worker) reste celle de l'artefact
+        self.assertIs(modele.matrice_transition, base)
+        self.assertEqual(modele.surcouche.deltas[0, 4], 2)
+
+        # La marche avec surcouche donne les mêmes scores que sur la matrice effective
+        effective = RecommandationMarcheAleatoire(modele.transition_effective())
+        np.testing.assert_allclose(modele.recommandeur.scores([0, 4], [1.0, 0.5]),
+                                   effective.scores([0, 4], [1.0, 0.5]), atol=1e-6)
+        graines = np.eye(5, 2, dtype=np.float32)
+        np.testing.assert_allclose(modele.recommandeur.marche_aleatoire_par_lots(graines),
+                                   effective.marche_aleatoire_par_lots(graines), atol=1e-5)
+
+        # L'artefact enregistre la matrice effective
+        with tempfile.TemporaryDirectory() as racine:
+            modele.sauvegarder(racine)
+            charge = ModeleRecommandation.charger(racine)
+            np.testing.assert_allclose(charge.matrice_transition.toarray(),
+                                       effective.matrice_transition.toarray(), atol=1e-6)
+
+    def test_construction_integre_les_notes_des_profils(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_movielens(dossier, 2000, graine=4)
+            base = ModeleRecommandation.construire(dossier)
+            a, b, c = (int(m) for m in base.ids_films[:3])
+            Rating.objects.create(movie_id=a, rating=5, session_key='s1')
+            Rating.objects.create(movie_id=b, rating=4, session_key='s1')
+            Rating.objects.create(movie_id=c, rating=3, session_key='s1')  # note trop basse
+            Rating.objects.create(movie_id=c, rating=5)  # sans profil
+            evaluations = evaluations_des_profils()
+            self.assertEqual(sorted(evaluations['movieId'].tolist()), [a, b])
+            modele = ModeleRecommandation.construire(dossier, evaluations_site=evaluations)
+
+        # Le profil ajoute la seule co-occurrence (a, b), comme l'aurait fait la surcouche en ligne
+        attendu = base.sommes_lignes.copy()
+        attendu[[0, 1]] += 1
+        np.testing.assert_allclose(modele.sommes_lignes, attendu)
+
+
+class PonderationTemporelleTests(TestCase):
+    def _evaluations(self):
+        evaluations = _evaluations_test()
+        # Notes de l'utilisateur 0 vieilles de 10 jours, les autres du jour de référence
+        evaluations['timestamp'] = np.where(evaluations['id_utilisateur'] == 0, 0, 10 * 86400).astype(np.uint32)
+        return evaluations
+
+    def test_demi_vie_et_fenetre(self):
+        evaluations = self._evaluations()
+        comptes = ConstructionGraphe(evaluations).construire_cooccurrences().toarray()
+        decroissants = ConstructionGraphe(evaluations, demi_vie_jours=10).construire_cooccurrences().toarray()
+        # (0, 1) : une fois par l'utilisateur 0 (âge 10 j, poids 1/2) et une fois par l'utilisateur 1 (poids 1)
+        self.assertEqual(comptes[0, 1], 2)
+        self.assertAlmostEqual(decroissants[0, 1], 1.5, places=5)
+        self.assertAlmostEqual(decroissants[0, 2], 0.5, places=5)
+        self.assertEqual(decroissants[2, 3], 1)
+
+        fenetre = ConstructionGraphe(evaluations, fenetre_jours=5).construire_cooccurrences().toarray()
+        self.assertEqual(fenetre[0, 1], 1)
+        self.assertEqual(fenetre[0, 2], 0)
+
+        parallele = ConstructionGraphe(evaluations, demi_vie_jours=10, nb_processus=2).construire_cooccurrences()
+        np.testing.assert_allclose(parallele.toarray(), decroissants, atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            ConstructionGraphe(_evaluations_test(), demi_vie_jours=10)
+
+    def test_rafraichir_met_les_sommes_a_l_echelle(self):
+        evaluations = self._evaluations()
+        graphe = ConstructionGraphe(evaluations, demi_vie_jours=10)
+        matrice = graphe.construire_matrice_transition()
+        colonnes = {nom: evaluations[nom].to_numpy() for nom in evaluations.columns}
+        ids_films = np.array([1, 11, 21, 31, 41], dtype=np.int32)
+        modele = ModeleRecommandation(colonnes, ids_films, matrice, 'v1', sommes_lignes=graphe.sommes_lignes,
+                                      meta={'demi_vie_jours': 10, 'reference': graphe.reference})
+        sommes = np.array(graphe.sommes_lignes)
+
+        self.assertEqual(modele.rafraichir(graphe.reference - 86400), 1.0)
+        self.assertAlmostEqual(modele.rafraichir(graphe.reference + 10 * 86400), 0.5, places=6)
+        np.testing.assert_allclose(modele.sommes_lignes, sommes / 2, rtol=1e-6)
+        # Les transitions ne bougent pas : seules les sommes brutes vieillissent
+        np.testing.assert_allclose(modele.matrice_transition.toarray(), matrice.toarray())
+
+        # Même résultat qu'une reconstruction dix jours plus tard avec une nouvelle co-occurrence (3, 4)
+        with unittest.mock.patch('sadia_site.src.modele.time.time', return_value=graphe.reference + 10 * 86400):
+            modele.appliquer_cooccurrences([3, 4], [4, 3])
+        attendu = ConstructionGraphe(evaluations, demi_vie_jours=10,
+                                     reference=graphe.reference + 10 * 86400).construire_cooccurrences().toarray()
+        attendu[3, 4] += 1
+        attendu[4, 3] += 1
+        obtenu = modele.transition_effective().multiply(modele.sommes_lignes[:, None]).toarray()
+        np.testing.assert_allclose(obtenu, attendu, atol=1e-5)
+
+        # Un nouveau vieillissement s'applique aussi aux ajouts de la surcouche
+        modele.rafraichir(graphe.reference + 20 * 86400)
+        obtenu = modele.transition_effective().multiply(modele.sommes_lignes[:, None]).toarray()
+        np.testing.assert_allclose(obtenu, attendu / 2, atol=1e-5)
+
+
+class JeuSynthetiqueTests(TestCase):
+    def test_forme_movielens(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            nb = generer_movielens(dossier, 2000)
+            evaluations = pd.read_csv(os.path.join(dossier, 'ratings.csv'))
+            films = pd.read_csv(os.path.join(dossier, 'movies.csv'))
+
+        self.assertEqual(len(evaluations), nb)
+        self.assertTrue(0 < nb <= 2000)
+        self.assertEqual(list(evaluations.columns), ['userId', 'movieId', 'rating', 'timestamp'])
+        self.assertFalse(evaluations.duplicated(['userId', 'movieId']).any())
+        self.assertTrue(evaluations['movieId'].isin(films['movieId']).all())
+        self.assertTrue(evaluations['rating'].between(0.5, 5.0).all())
+
+
+class ChargementDonneesTests(TestCase):
+    def test_dossier_alternatif_par_blocs_et_cache(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_movielens(dossier, 3000, graine=1)
+            brutes = pd.read_csv(os.path.join(dossier, 'ratings.csv'))
+            attendues = brutes[brutes['rating'] >= 4.0]
+
+            chargement = ChargementDonnees(taille_bloc=500)
+            self.assertTrue(chargement.charger_movielens(dossier))
+            self.assertTrue(os.path.isdir(os.path.join(dossier, '.cache')))
+
+            depuis_cache = ChargementDonnees()
+            with unittest.mock.patch('pandas.read_csv', wraps=pd.read_csv) as lecture:
+                self.assertTrue(depuis_cache.charger_movielens(dossier))
+            # Seul movies.csv est relu
+            self.assertEqual(lecture.call_count, 1)
+
+        for evaluations in (chargement.evaluations, depuis_cache.evaluations):
+            self.assertEqual(evaluations['movieId'].dtype, np.int32)
+            self.assertEqual(evaluations['movieId'].tolist(), attendues['movieId'].tolist())
+            self.assertEqual(evaluations['rating'].tolist(), attendues['rating'].tolist())
+            np.testing.assert_array_equal(evaluations['id_film'], pd.Categorical(attendues['movieId']).codes)
+
+    def test_dossier_absent(self):
+        with self.assertLogs('sadia_site.src.recommendation', 'WARNING'):
+            self.assertFalse(ChargementDonnees().charger_movielens('/nulle/part'))
+
+
+class IndexVoisinsTests(TestCase):
+    def test_mesures(self):
+        graphe = ConstructionGraphe(_evaluations_test())
+        # Films 0 et 1 : aimés par 2 et 3 utilisateurs, ensemble par 2, sur 4 utilisateurs
+        attendus = {'cosinus': 2 / np.sqrt(6), 'jaccard': 2 / 3, 'lift': 2 * 4 / 6}
+        for mesure, attendu in attendus.items():
+            index = IndexVoisins.construire(graphe, k=2, mesure=mesure)
+            voisins, scores = index.similaires(0)
+            self.assertEqual(voisins[0], 1, mesure)
+            self.assertAlmostEqual(float(scores[0]), attendu, places=5)
+            self.assertTrue(np.all(np.diff(scores) <= 0))
+
+        with self.assertRaises(ValueError):
+            IndexVoisins.construire(graphe, mesure='euclide')
+
+    def test_sauvegarde_avec_le_modele(self):
+        modele = _modele_test()
+        modele.construire_voisins(k=3, mesure='jaccard')
+        with tempfile.TemporaryDirectory() as racine:
+            modele.sauvegarder(racine)
+            charge = ModeleRecommandation.charger(racine)
+            self.assertEqual((charge.voisins.k, charge.voisins.mesure), (3, 'jaccard'))
+            np.testing.assert_array_equal(charge.voisins.indices, modele.voisins.indices)
+        # Film 41 n'a aucun voisin : ligne bourrée de -1
+        self.assertEqual(len(modele.films_similaires(41)[0]), 0)
+
+    def test_endpoint_similaires(self):
+        modele = _modele_test()
+        with unittest.mock.patch('core.views.get_recommender',
+                                 return_value=ServiceRecommandation(chargeur=lambda: modele)):
+            reponse = self.client.get('/films/1/similar/', {'k': 2})
+            self.assertEqual(reponse.status_code, 200)
+            donnees = reponse.json()
+            self.assertEqual(donnees['title'], 'Toy Story (1995)')
+            self.assertEqual([f['movieId'] for f in donnees['similar']], [11, 21])
+            self.assertEqual(self.client.get('/films/999999/similar/').status_code, 404)
+
+
+@override_settings(NOTES_INTERVALLE=0)
+class CacheRecommandationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.modele = _modele_test()
+        self.notes = np.array([[1, 5], [21, 4]])
+
+    def test_cle_et_invalidation(self):
+        appels = []
+        calculer = lambda: appels.append(1) or ['liste']
+
+        self.assertEqual(recommandations_en_cache('u1', self.notes, self.modele, calculer), ['liste'])
+        recommandations_en_cache('u1', self.notes[::-1], self.modele, calculer)
+        self.assertEqual(len(appels), 1)
+        self.assertEqual(empreinte(self.notes), empreinte(self.notes[::-1]))
+
+        invalider('u1')
+        recommandations_en_cache('u1', self.notes, self.modele, calculer)
+        self.assertEqual(len(appels), 2)
+
+        # Une mise à jour du graphe change la révision du modèle
+        self.modele.revision += 1
+        recommandations_en_cache('u1', self.notes, self.modele, calculer)
+        self.assertEqual(len(appels), 3)
+
+    def test_un_seul_calcul_en_rafale(self):
+        appels = []
+        demarre = threading.Event()
+
+        def calculer():
+            appels.append(1)
+            demarre.set()
+            time.sleep(0.2)
+            return ['liste']
+
+        resultats = []
+        threads = [threading.Thread(target=lambda: resultats.append(
+            recommandations_en_cache('u2', self.notes, self.modele, calculer))) for _ in range(5)]
+        threads[0].start()
+        demarre.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(appels), 1)
+        self.assertEqual(resultats, [['liste']] * 5)
+
+    def test_rate_invalide_la_liste(self):
+        service = ServiceRecommandation(chargeur=lambda: self.modele)
+        with unittest.mock.patch('core.views.get_recommender', return_value=service):
+            self.client.post('/rate/', {'movie_id': 1, 'rating': 5})
+            premiere = self.client.get('/recommendations/').context['films_recommandes']
+            self.client.post('/rate/', {'movie_id': 21, 'rating': 5})
+            seconde = self.client.get('/recommendations/').context['films_recommandes']
+            # Un autre visiteur ne reçoit rien des notes du premier
+            autre = self.client_class().get('/recommendations/').context['films_recommandes']
+
+        self.assertNotIn(21, [f['movieId'] for f in seconde])
+        self.assertIn(21, [f['movieId'] for f in premiere])
+        self.assertEqual(autre, [])
+
+    def test_graines_lues_par_l_index_du_profil(self):
+        alice = User.objects.create(username='alice')
+        Rating.objects.bulk_create([Rating(movie_id=m, rating=4, session_key=f's{m}') for m in range(50)])
+        Rating.objects.create(movie_id=1, rating=5, user=alice)
+        with self.assertNumQueries(1):
+            notes = Profil(alice.pk, None).notes()
+        self.assertEqual(notes.tolist(), [[1, 5]])
+        with connection.cursor() as curseur:
+            curseur.execute('EXPLAIN QUERY PLAN ' + str(Rating.objects.filter(user_id=alice.pk)
+                                                        .values_list('movie_id', 'rating').query))
+            plan = ' '.join(str(ligne) for ligne in curseur.fetchall())
+        self.assertIn('SEARCH', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+class EvaluationHorsLigneTests(TestCase):
+    def test_metriques_en_lot(self):
+        recommandations = np.array([[3, 1, 2], [0, -1, -1]])
+        verite = sp.csr_matrix(np.array([[0, 1, 0, 1, 0], [0, 0, 0, 0, 1]], dtype=np.float32))
+        metriques = MetriquesEvaluation(None)
+        resultats = metriques.evaluer_lot(recommandations, verite, 3)
+
+        np.testing.assert_allclose(resultats['precision'], [2 / 3, 0])
+        np.testing.assert_allclose(resultats['recall'], [1, 0])
+        np.testing.assert_allclose(resultats['ndcg'], [1, 0])
+        np.testing.assert_allclose(resultats['ap'], [1, 0])
+        self.assertEqual(metriques.precision_k([3, 1, 2], [1, 3], 3), resultats['precision'][0])
+        self.assertEqual(metriques.couverture(recommandations, 5), 0.8)
+
+        # Un succès au deuxième rang seulement
+        resultats = metriques.evaluer_lot(np.array([[2, 3, 0]]), verite[:1], 3)
+        self.assertAlmostEqual(resultats['ndcg'][0], (1 / np.log2(3)) / (1 + 1 / np.log2(3)))
+        self.assertAlmostEqual(resultats['ap'][0], 0.25)
+
+    def test_decoupage_et_execution(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_movielens(dossier, 4000, graine=3)
+            evaluation = EvaluationHorsLigne(dossier, k=5, iterations=10, taille_lot=16)
+            evaluations = evaluation.charger()
+            apprentissage, test = decouper_par_date(evaluations, 0.25)
+            self.assertLessEqual(apprentissage['timestamp'].max(), test['timestamp'].min())
+            self.assertAlmostEqual(len(test) / len(evaluations), 0.25, places=2)
+
+            resultats = evaluation.executer(evaluations)
+        self.assertGreater(resultats['nb_utilisateurs_test'], 0)
+        for cle in ('precision@5', 'recall@5', 'ndcg@5', 'map', 'couverture'):
+            self.assertTrue(0 <= resultats[cle] <= 1, cle)
+        self.assertGreater(resultats['latence_par_utilisateur_ms']['moyenne'], 0)
+
+
+class MetriquesTests(ServeurTmdbMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        REGISTRE.reinitialiser()
+
+    def test_exposition_prometheus(self):
+        registre = Registre()
+        registre.observer('latence_seconds', 0.003, "Latence", vue='home')
+        registre.observer('latence_seconds', 20.0, "Latence", vue='home')
+        registre.incrementer('appels_total', 2, "Appels", statut=200)
+        texte = registre.exporter()
+
+        self.assertIn('# TYPE latence_seconds histogram', texte)
+        self.assertIn('latence_seconds_bucket{vue="home",le="0.0025"} 0', texte)
+        self.assertIn('latence_seconds_bucket{vue="home",le="0.005"} 1', texte)
+        self.assertIn('latence_seconds_bucket{vue="home",le="+Inf"} 2', texte)
+        self.assertIn('latence_seconds_count{vue="home"} 2', texte)
+        self.assertIn('appels_total{statut="200"} 2', texte)
+
+    def test_requete_instrumentee(self):
+        with override_settings(TMDB_API_KEY='cle', TMDB_API_URL=self.url_tmdb, METRIQUES_SERVER_TIMING=True):
+            response = self.client.get('/?page_size=2')
+            self.client.get('/?page_size=2')
+
+        en_tete = response['Server-Timing']
+        for etape in ('total;dur=', 'db;desc=', 'catalogue;dur=', 'stats;dur=', 'posters;dur='):
+            self.assertIn(etape, en_tete)
+        self.assertEqual(REGISTRE.valeur('bobetteflix_requete_seconds', vue='home', methode='GET'), 2)
+        self.assertGreater(REGISTRE.valeur('bobetteflix_requetes_sql_total', vue='home'), 0)
+        self.assertEqual(REGISTRE.valeur('bobetteflix_tmdb_appels_total', statut=200), 2)
+        # Second passage : les posters viennent de la table
+        self.assertEqual(REGISTRE.valeur('bobetteflix_cache_total', cache='posters', resultat='hit'), 2)
+
+        texte = self.client.get('/metrics').content.decode()
+        self.assertIn('bobetteflix_requetes_total{statut="200",vue="home"} 2', texte)
+        self.assertIn('bobetteflix_span_seconds_count{span="posters"} 2', texte)
+
+    def test_span_decorateur(self):
+        @span('essai')
+        def calcul():
+            return 42
+
+        self.assertEqual(calcul(), 42)
+        self.assertEqual(calcul(), 42)
+        self.assertEqual(REGISTRE.valeur('bobetteflix_span_seconds', span='essai'), 2)
+
+
+@override_settings(NOTES_INTERVALLE=0)
+class RechercheTitresTests(TestCase):
+    def setUp(self):
+        titres = ['Matrix, The (1999)', 'Matrix Reloaded, The (2003)', 'Heat (1995)', 'Heat (1986)',
+                  "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)", 'Toy Story (1995)']
+        self.catalogue = Catalogue(Path('films.csv'), None, np.arange(1, len(titres) + 1, dtype=np.int32),
+                                   titres, [''] * len(titres))
+        self.index = IndexTitres(self.catalogue)
+
+    def _titres(self, requete, limite=10):
+        return [self.catalogue.titres[p] for p, _ in self.index.rechercher(requete, limite)]
+
+    def test_variantes_normalisees(self):
+        self.assertEqual(variantes('Matrix, The (1999)'), ['the matrix'])
+        self.assertEqual(variantes("Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)"),
+                         ['amelie', 'le fabuleux destin d amelie poulain'])
+
+    def test_prefixe_annee_et_flou(self):
+        self.assertEqual(self._titres('matr')[:2], ['Matrix, The (1999)', 'Matrix Reloaded, The (2003)'])
+        self.assertEqual(self._titres('reloaded')[0], 'Matrix Reloaded, The (2003)')
+        self.assertEqual(self._titres('fabuleux destin')[0], "Amelie (Fabuleux destin d'Amélie Poulain, Le) (2001)")
+        # L'année départage deux homonymes, entre parenthèses ou non
+        self.assertEqual(self._titres('Heat (1986)')[0], 'Heat (1986)')
+        self.assertEqual(self._titres('heat 1995')[0], 'Heat (1995)')
+        # Faute de frappe : correspondance approchée par trigrammes
+        self.assertEqual(self._titres('toy strory')[0], 'Toy Story (1995)')
+        self.assertEqual(self.index.resoudre('the matrix'), 1)
+        self.assertIsNone(self.index.resoudre('zzz'))
+
+    def test_endpoint_et_notation_par_titre(self):
+        with unittest.mock.patch('core.recherche.get_catalogue', return_value=self.catalogue), \
+                unittest.mock.patch('core.views.get_catalogue', return_value=self.catalogue):
+            resultats = self.client.get('/search/', {'q': 'toy sto'}).json()['results']
+            self.assertEqual(resultats[0], {'movieId': 6, 'title': 'Toy Story (1995)', 'year': 1995,
+                                            'score': resultats[0]['score']})
+
+            self.client.post('/rate/', {'title': 'matrix 1999', 'rating': 3})
+            self.client.post('/rate/', {'title': 'zzz', 'rating': 3})
+        self.assertEqual(list(Rating.objects.values_list('movie_id', 'title')), [(1, 'Matrix, The (1999)')])
+
+
+class ContenuHybrideTests(TestCase):
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        dossier = Path(self.dossier.name)
+        # 51 n'a aucune note dans le graphe : seul son contenu le relie aux autres
+        pd.DataFrame({
+            'movieId': [1, 11, 21, 31, 41, 51],
+            'title': [f'Film {i}' for i in range(6)],
+            'genres': ['Comedy', 'Drama', 'Comedy|Romance', 'Drama', 'Horror', 'Horror|Thriller'],
+        }).to_csv(dossier / 'movies.csv', index=False)
+        pd.DataFrame({
+            'userId': [1, 2, 3, 1], 'movieId': [41, 51, 51, 1],
+            'tag': ['gore', 'Gore ', 'gore', 'funny'], 'timestamp': [0, 0, 0, 0],
+        }).to_csv(dossier / 'tags.csv', index=False)
+        self.contenu = CaracteristiquesContenu.construire(dossier)
+
+    def tearDown(self):
+        self.dossier.cleanup()
+
+    def test_matrice_tfidf_et_genres(self):
+        self.assertEqual(self.contenu.matrice.shape, (6, 7))  # 5 genres, 2 tags
+        np.testing.assert_allclose(np.linalg.norm(self.contenu.matrice.toarray(), axis=1), 1, rtol=1e-6)
+        comedie, romance = GENRES.index('Comedy'), GENRES.index('Romance')
+        self.assertEqual(self.contenu.genres[2], (1 << comedie) | (1 << romance))
+        np.testing.assert_array_equal(self.contenu.positions([51, 2, 1]), [5, -1, 0])
+
+        scores = self.contenu.scores([4], [1.0])
+        self.assertAlmostEqual(float(scores[4]), 1.0, places=5)
+        self.assertEqual(int(np.argsort(-scores)[1]), 5)  # même genre, même tag
+
+    def test_melange_et_demarrage_a_froid(self):
+        modele = _modele_test()
+        modele.contenu = self.contenu
+
+        # Poids nul : marche aléatoire seule, comme sans contenu
+        movie_ids, _ = modele.recommander([1, 21], [5, 4], n=3, poids_contenu=0)
+        self.assertEqual(movie_ids.tolist(), [11, 31])
+
+        # 41 n'a aucun voisin dans le graphe : le contenu propose 51, absent du graphe
+        movie_ids, scores = modele.recommander([41], [5], n=3, poids_contenu=0.5)
+        self.assertEqual(movie_ids[0], 51)
+        self.assertNotIn(41, movie_ids)
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+        # Une graine hors du graphe suffit
+        self.assertEqual(modele.recommander([51], [5], n=1, poids_contenu=0.5)[0].tolist(), [41])
+
+    def test_filtre_genres(self):
+        modele = _modele_test()
+        modele._films = pd.read_csv(Path(self.dossier.name) / 'movies.csv')
+        # Sans contenu : masques tirés de movies.csv, alignés sur les id_film
+        self.assertEqual(sorted(modele.recommander([1], [5], n=5)[0].tolist()), [11, 21])
+        self.assertEqual(modele.recommander([1], [5], n=5, genres=masque_filtre('Comedy'))[0].tolist(), [21])
+        self.assertEqual(len(modele.recommander([1], [5], n=5, genres=masque_filtre('Horror'))[0]), 0)
+
+        films = modele.films
+        modele = _modele_test()
+        modele._films, modele.contenu = films, self.contenu
+        movie_ids, _ = modele.recommander([1, 41], [5, 5], n=5, poids_contenu=0.5,
+                                          genres=masque_filtre('Horror,Thriller'))
+        self.assertEqual(movie_ids.tolist(), [51])
+
+        # La vue passe ?genres= au modèle et le cache distingue les filtres
+        cache.clear()
+        with unittest.mock.patch('core.views.get_recommender',
+                                 return_value=ServiceRecommandation(chargeur=lambda: modele)), \
+                override_settings(NOTES_INTERVALLE=0):
+            # Graines du profil du visiteur (session ouverte par /rate/)
+            self.client.post('/rate/', {'movie_id': 1, 'rating': 5})
+            self.client.post('/rate/', {'movie_id': 41, 'rating': 5})
+            reponse = self.client.get('/recommendations/', {'genres': 'Horror'})
+            self.assertEqual([f['movieId'] for f in reponse.context['films_recommandes']], [51])
+            tous = self.client.get('/recommendations/').context['films_recommandes']
+            self.assertIn(11, [f['movieId'] for f in tous])
+
+    def test_artefact(self):
+        modele = _modele_test()
+        modele.contenu = self.contenu
+        with tempfile.TemporaryDirectory() as racine:
+            modele.sauvegarder(racine)
+            charge = ModeleRecommandation.charger(racine)
+            np.testing.assert_allclose(charge.contenu.matrice.toarray(), self.contenu.matrice.toarray())
+            np.testing.assert_array_equal(charge.contenu.genres, self.contenu.genres)
+            self.assertEqual(charge.recommander([41], [5], n=1, poids_contenu=0.5)[0].tolist(), [51])
+
+
+@override_settings(NOTES_INTERVALLE=0)
+class CacheHttpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_accueil_revalide_en_304(self):
+        self.client.get('/')  # pose le cookie CSRF, qui fait partie de l'ETag
+        premiere = self.client.get('/?page_size=3')
+        etag = premiere['ETag']
+        self.assertIn('private', premiere['Cache-Control'])
+
+        with self.assertNumQueries(1):  # seulement la dernière note, ni agrégat ni rendu
+            revalidee = self.client.get('/?page_size=3', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidee.status_code, 304)
+        # Autre page : autre ETag
+        self.assertNotEqual(self.client.get('/?page_size=4')['ETag'], etag)
+
+        self.client.post('/rate/', {'movie_id': 1, 'title': 'Toy Story (1995)', 'rating': 3})
+        apres_note = self.client.get('/?page_size=3', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(apres_note.status_code, 200)
+        self.assertNotEqual(apres_note['ETag'], etag)
+
+        # Une note remplacée garde sa ligne (et son pk) mais change l'ETag
+        time.sleep(0.01)
+        self.client.post('/rate/', {'movie_id': 1, 'title': 'Toy Story (1995)', 'rating': 4})
+        self.assertEqual(self.client.get('/?page_size=3', HTTP_IF_NONE_MATCH=apres_note['ETag']).status_code, 200)
+
+    def test_fragments_des_cartes(self):
+        from django.core.cache.utils import make_template_fragment_key
+
+        film = get_catalogue().film(0)
+        cle = make_template_fragment_key('carte_film', [film['movieId'], None, 0, None])
+        self.assertIsNone(cache.get(cle))
+        self.client.get('/?page_size=1')
+        self.assertIn(film['title'], cache.get(cle))
+
+    def test_films_similaires_cache_public(self):
+        modele = _modele_test()
+        with unittest.mock.patch('core.views.get_recommender',
+                                 return_value=ServiceRecommandation(chargeur=lambda: modele)):
+            reponse = self.client.get('/films/1/similar/')
+            self.assertIn('public', reponse['Cache-Control'])
+            self.assertEqual(self.client.get('/films/1/similar/', HTTP_IF_NONE_MATCH=reponse['ETag']).status_code,
+                             304)
+            modele.revision += 1
+            self.assertEqual(self.client.get('/films/1/similar/', HTTP_IF_NONE_MATCH=reponse['ETag']).status_code,
+                             200)
+
+
+class LectureDeSesVotesTests(TestCase):
+    """Intervalle d'écriture par défaut : la note reste en tampon après ``/rate/``."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_redirection_apres_vote_voit_la_note(self):
+        self.assertGreater(settings.NOTES_INTERVALLE, 0)
+        self.client.get('/')  # pose le cookie CSRF, qui fait partie de l'ETag
+        etag = self.client.get('/?page_size=3')['ETag']
+        # Sans thread de fond : la note attend dans le tampon jusqu'à la page suivante
+        with unittest.mock.patch.object(IngestionNotes, '_demarrer'):
+            self.client.post('/rate/', {'movie_id': 1, 'title': 'Toy Story (1995)', 'rating': 4})
+            self.assertEqual(len(get_ingestion()), 1)
+            reponse = self.client.get('/?page_size=3', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(get_ingestion()), 0)
+        self.assertEqual(stats_pour([1]), {1: {'avg': 4.0, 'count': 1}})
+
+
+class FactorisationALSTests(TestCase):
+    def test_gradient_conjugue_egale_la_resolution_exacte(self):
+        rng = np.random.default_rng(0)
+        preferences = sp.random(30, 12, density=0.3, format='csr', random_state=1, dtype=np.float32)
+        fixes = rng.normal(size=(12, 4)).astype(np.float32)
+        resultat = resoudre_cg(preferences, fixes, np.zeros((30, 4), dtype=np.float32), 0.1, 5.0, iterations=10)
+
+        for u in (0, 7, 29):
+            ligne = preferences[u]
+            y = fixes[ligne.indices]
+            matrice = fixes.T @ fixes + 0.1 * np.eye(4) + (y.T * 5.0 * ligne.data) @ y
+            attendu = np.linalg.solve(matrice, (1 + 5.0 * ligne.data) @ y)
+            np.testing.assert_allclose(resultat[u], attendu, rtol=1e-3, atol=1e-4)
+
+    def test_modele_als_et_artefact(self):
+        evaluations = _evaluations_test()
+        graphe = ConstructionGraphe(evaluations)
+        als = FactorisationALS.entrainer(graphe.matrice_incidence(), nb_facteurs=4, iterations=15)
+        colonnes = {nom: evaluations[nom].to_numpy() for nom in evaluations.columns}
+        modele = ModeleRecommandation(colonnes, np.array([1, 11, 21, 31, 41], dtype=np.int32), None, 'v1',
+                                      recommandeur=als)
+        self.assertEqual(modele.backend, 'als')
+
+        # Comme la marche : 11 est le film le plus lié à 1 et 21
+        movie_ids, _ = modele.recommander([1, 21], [5, 4], n=1)
+        self.assertEqual(movie_ids.tolist(), [11])
+        lots = als.scores_par_lots(sp.csr_matrix(np.array([[1, 0, 1, 0, 0]], dtype=np.float32).T))
+        np.testing.assert_allclose(lots[:, 0], als.scores(np.array([0, 2]), np.ones(2)), rtol=1e-3, atol=1e-4)
+
+        with tempfile.TemporaryDirectory() as racine:
+            modele.sauvegarder(racine)
+            charge = ModeleRecommandation.charger(racine)
+            self.assertIsNone(charge.matrice_transition)
+            self.assertEqual(charge.backend, 'als')
+            self.assertEqual(charge.recommander([1, 21], [5, 4], n=1)[0].tolist(), [11])
+
+    def test_backend_choisi_par_reglage(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            generer_movielens(dossier, 2000, graine=1)
+            with override_settings(RECO_BACKEND='als', RECO_ALS_FACTEURS=8, RECO_ALS_ITERATIONS=3):
+                modele = ModeleRecommandation.construire(dossier)
+        self.assertEqual(modele.backend, 'als')
+        self.assertEqual(modele.recommandeur.facteurs_films.shape, (modele.nb_films, 8))
+        self.assertEqual(modele.recommandeur.facteurs_films.dtype, np.float32)
+
+
+@override_settings(NOTES_INTERVALLE=0)
+class ApiAsynchroneTests(ServeurTmdbMixin, TestCase):
+    async def test_films_et_posters_concurrents(self):
+        _TmdbFactice.delai = 0.3
+        with override_settings(TMDB_API_KEY='cle', TMDB_API_URL=self.url_tmdb, TMDB_DELAI_TOTAL=5):
+            debut = time.perf_counter()
+            response = await self.async_client.get('/api/films/?page_size=4')
+            duree = time.perf_counter() - debut
+
+        donnees = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(len(donnees['films']), 4)
+        self.assertTrue(donnees['has_more'])
+        self.assertTrue(donnees['films'][0]['poster_url'].endswith('/862.jpg'))
+        # Quatre appels de 0,3 s en parallèle, pas à la suite
+        self.assertEqual(len(_TmdbFactice.appels), 4)
+        self.assertLess(duree, 1.0)
+        self.assertEqual(await Poster.objects.acount(), 4)
+
+    async def test_tmdb_lent_borne_dans_le_temps(self):
+        _TmdbFactice.delai = 1.5
+        with override_settings(TMDB_API_KEY='cle', TMDB_API_URL=self.url_tmdb, TMDB_DELAI_TOTAL=0.2):
+            debut = time.perf_counter()
+            response = await self.async_client.get('/api/films/?page_size=3')
+            duree = time.perf_counter() - debut
+
+        self.assertLess(duree, 1.0)
+        self.assertEqual([f['poster_url'] for f in response.json()['films']], [None] * 3)
+        # Abandons non mis en cache : la prochaine requête réessaiera
+        self.assertEqual(await Poster.objects.acount(), 0)
+
+    async def test_recommandations(self):
+        cache.clear()
+        service = ServiceRecommandation(chargeur=_modele_test)
+        with unittest.mock.patch('core.api.get_recommender', return_value=service):
+            await self.async_client.post('/rate/', {'movie_id': 1, 'rating': 5})
+            response = await self.async_client.get('/api/recommendations/')
+        self.assertEqual(response.status_code, 200)
+        ids = [f['movieId'] for f in response.json()['recommendations']]
+        self.assertEqual(ids[0], 11)
+        self.assertNotIn(1, ids)
+
+        indisponible = ServiceRecommandation(chargeur=lambda: None)
+        with unittest.mock.patch('core.api.get_recommender', return_value=indisponible):
+            response = await self.async_client.get('/api/recommendations/')
+        self.assertEqual(response.status_code, 503)
+
+    async def test_genre_inconnu_refuse(self):
+        for url in ('/api/films/', '/api/recommendations/'):
+            response = await self.async_client.get(url, {'genres': 'Comedie'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('comedie', response.json()['error'])
+        response = await self.async_client.get('/api/films/', {'genres': 'Comedy', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
@@ -1,9 +1,14 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('rate/', views.rate, name='rate'),
     path('recommendations/', views.recommander_films, name='recommendations'),
-    path("about/", views.about, name="about")
+    path('films/<int:movie_id>/similar/', views.films_similaires, name='films_similaires'),
+    path('search/', views.recherche, name='recherche'),
+    path("about/", views.about, name="about"),
+    path('api/films/', api.films, name='api_films'),
+    path('api/recommendations/', api.recommandations, name='api_recommandations'),
+    path('metrics', views.metriques, name='metriques'),
 ]
@@ -1,232 +1,238 @@
-from django.conf import settings
+import functools
+
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
-from pathlib import Path
-import csv
-import os
-import requests
-from django.db.models import Avg, Count
+import numpy as np
+from django.conf import settings
 from django.middleware.csrf import get_token
-
-from .models import Rating
-from sadia_site.src.recommendation import ChargementDonnees, ConstructionGraphe
-
-TMDB_API_KEY = os.environ.get("TMDB_API_KEY")
-TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/movie"
-TMDB_TRENDING_URL = "https://api.themoviedb.org/3/trending/movie/day"
-TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w500"
-_poster_cache = {}
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .cache_http import derniere_note_profil, etag_accueil, etag_modele, modification_accueil
+from .cache_reco import recommandations_en_cache
+from .catalogue import get_catalogue
+from .ingestion import get_ingestion
+from .posters import _extract_year, posters_pour_films
+from .profils import profil_de
+from .recherche import get_index_titres
+from .stats import stats_pour
+from sadia_site.src.contenu import GENRES, masque_filtre
+from sadia_site.src.metriques import REGISTRE, span
+from sadia_site.src.service import get_recommender
+
+NB_RECOMMANDATIONS = 20
+# Taille de page maximale du catalogue (accueil et /api/films/)
+PAGE_TAILLE_MAX = 100
 
 def about(request):
     return render(request, "html/about.html")
 
-def _clean_title(title):
-    """Supprime l’année entre parenthèses à la fin du titre (sans regex)."""
-    if not title:
-        return title
-
-    pos = title.rfind('(')
-    if pos != -1 and title.endswith(')'):
-        inside = title[pos+1:-1]
-        # Vérifie si c’est bien une année (ex: '1999')
-        if len(inside) == 4 and inside.isdigit():
-            return title[:pos].strip()
-    return title.strip()
-
-
-def _extract_year(title):
-    """Retourne l’année si elle est présente à la fin du titre."""
-    if not title:
-        return None
-    pos = title.rfind('(')
-    if pos != -1 and title.endswith(')'):
-        inside = title[pos+1:-1]
-        if len(inside) == 4 and inside.isdigit():
-            return int(inside)
-    return None
-
-def _get_poster_from_tmdb(title):
-    """Recherche un film par titre sur TMDB et retourne l’URL du poster s’il existe, avec cache."""
-    if not TMDB_API_KEY:
-        return None
-
-    clean_title = _clean_title(title)
-    year = _extract_year(title)
-    cache_key = clean_title + (f" ({year})" if year else "")
-
-    # 🔹 Vérifie si on a déjà ce film en cache
-    if cache_key in _poster_cache:
-        return _poster_cache[cache_key]
-
-    params = {
-        "api_key": TMDB_API_KEY,
-        "query": clean_title,
-        "language": "fr-FR",
-    }
-    if year:
-        params["year"] = year
-
+def _parametre_entier(request, nom, defaut, minimum=0):
     try:
-        response = requests.get(TMDB_SEARCH_URL, params=params, timeout=5)
-        if response.status_code != 200:
-            _poster_cache[cache_key] = None
-            return None
-        data = response.json()
-        results = data.get("results") or []
-        if not results:
-            _poster_cache[cache_key] = None
-            return None
-        poster_path = results[0].get("poster_path")
-        if poster_path:
-            poster_url = TMDB_IMAGE_BASE + poster_path
-            _poster_cache[cache_key] = poster_url
-            return poster_url
-        _poster_cache[cache_key] = None
-    except Exception as e:
-        print("Erreur TMDB pour", title, ":", e)
-        _poster_cache[cache_key] = None
-
-    return None
-
-
-def _dedupe_recommendations_list(recs, keys=('movieId', 'movie_id', 'id_film', 'id')):
-    """Déduplique une liste de dictionnaires en préservant l'ordre.
-    Cherche l'identifiant du film dans les clés fournies.
-    Retourne la liste dédupliquée.
-    """
-    seen = set()
-    deduped = []
-    for r in recs:
-        if not isinstance(r, dict):
-            # si l'élément n'est pas un dict, on l'inclut tel quel
-            deduped.append(r)
-            continue
-        # chercher une clé id utilisable
-        film_id = None
-        for k in keys:
-            if k in r and r[k] is not None:
-                film_id = r[k]
-                break
-        # normaliser les types (numpy types -> int)
-        try:
-            if film_id is not None:
-                film_id = int(film_id)
-        except Exception:
-            pass
-        if film_id is None:
-            # pas d'identifiant, inclure une seule fois en se basant sur l'objet dict string
-            key = tuple(sorted(r.items()))
-            if key not in seen:
-                seen.add(key)
-                deduped.append(r)
-        else:
-            if film_id not in seen:
-                seen.add(film_id)
-                deduped.append(r)
-    return deduped
+        valeur = int(request.GET.get(nom, defaut))
+    except ValueError:
+        return defaut
+    return valeur if valeur >= minimum else defaut
 
-def _lire_films():
-    movies_path = Path(settings.BASE_DIR) / 'data' / 'ml-latest-small' / 'movies.csv'
-    films = []
-    if movies_path.exists():
-        with movies_path.open(encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # movieId from dataset can be large; we'll keep original id as int
-                try:
-                    movieId = int(row.get('movieId') or row.get('movieId'))
-                except Exception:
-                    movieId = None
-                films.append({'movieId': movieId, 'title': row.get('title', 'Untitled')})
-    else:
-        # fallback: quelques films fictifs
-        films = [
-            {'movieId': 1, 'title': 'The Shawshank Redemption'},
-            {'movieId': 2, 'title': 'The Godfather'},
-            {'movieId': 3, 'title': 'The Dark Knight'},
-        ]
-    return films
 
+def _filtre_genres(request):
+    """Masque des genres de ``?genres=`` (0 : pas de filtre, y compris pour un genre inconnu)."""
+    try:
+        return masque_filtre(request.GET.get('genres', ''))
+    except ValueError:
+        return 0
 
-def home(request):
-    films = _lire_films()
 
-    # Ensure CSRF token exists (forces cookie generation)
-    get_token(request)
+def _page_catalogue(request, catalogue):
+    """(films de la page avec moyenne et votes, total filtré, fin de page, taille de page) d'après ``request.GET``."""
+    page_size = min(_parametre_entier(request, 'page_size', 12, minimum=1), PAGE_TAILLE_MAX)
+    # Films des genres demandés (?genres=Comedy,Romance), par masque de bits sur tout le catalogue
+    selection = catalogue.selection(_filtre_genres(request))
+    # Pagination par décalage (?offset=) ou par curseur (?apres=<movieId>)
+    if 'apres' in request.GET:
+        start = catalogue.position_apres(_parametre_entier(request, 'apres', -1), selection)
+    else:
+        start = _parametre_entier(request, 'offset', 0)
 
-    # Utiliser annotate correctement pour obtenir la moyenne et le nombre de votes par movie_id
-    annotated = Rating.objects.values('movie_id').annotate(avg=Avg('rating'), count=Count('rating'))
-    stats = {item['movie_id']: {'avg': round(item['avg'], 2) if item['avg'] is not None else None, 'count': item['count']} for item in annotated}
+    total = len(catalogue) if selection is None else len(selection)
+    page_films = catalogue.page(start, page_size, selection)
 
-    for f in films:
+    # Statistiques dénormalisées, lues pour les seuls films de la page
+    with span('stats'):
+        stats = stats_pour(f['movieId'] for f in page_films)
+    for f in page_films:
         mid = f['movieId']
-        if mid in stats and stats[mid]['count'] > 0:
+        if mid in stats:
             f['avg'] = stats[mid]['avg']
             f['count'] = stats[mid]['count']
         else:
             f['avg'] = None
             f['count'] = 0
+    return page_films, total, start + page_size, page_size
 
-    try:
-        page_size = int(request.GET.get('page_size', 12))
-        if page_size <= 0:
-            page_size = 12
-    except ValueError:
-        page_size = 12
 
-    for i in range (0, page_size):
-        films[i]['poster_url'] = _get_poster_from_tmdb(_clean_title(films[i]['title']))
+def _ses_notes_ecrites(vue):
+    """Écrit les notes du visiteur encore en tampon avant la vue et le calcul de son ETag.
 
-    start = 0
-    end = start + page_size
+    Sans cela, la redirection qui suit ``/rate/`` serait revalidée en 304 (ou
+    rendue) sans le vote que le visiteur vient d'envoyer.
+    """
+    @functools.wraps(vue)
+    def enveloppe(request, *args, **kwargs):
+        get_ingestion().vider_profil(profil_de(request))
+        return vue(request, *args, **kwargs)
+    return enveloppe
 
-    total = len(films)
-    page_films = films[start:end]
+
+# Les pages embarquent le jeton CSRF : revalidation par le navigateur, jamais de cache partagé
+@_ses_notes_ecrites
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@condition(etag_func=etag_accueil, last_modified_func=modification_accueil)
+def home(request):
+    with span('catalogue'):
+        catalogue = get_catalogue()
+
+    # Ensure CSRF token exists (forces cookie generation)
+    get_token(request)
+
+    page_films, total, end, page_size = _page_catalogue(request, catalogue)
+    with span('posters'):
+        posters = posters_pour_films(page_films)
+    for f in page_films:
+        f['poster_url'] = posters.get(f['movieId'])
 
     has_more = end < total
     context = {
         'films': page_films,
         'page_size': page_size,
         'has_more': has_more,
+        'next_offset': end,
+        'next_cursor': page_films[-1]['movieId'] if page_films else None,
         'total_films': total,
+        'cartes_ttl': settings.CARTES_CACHE_TTL,
+        'genres': request.GET.get('genres', ''),
+        'genres_disponibles': GENRES,
     }
     return render(request, 'html/home.html', context)
 
 
+def _resoudre_film(movie_id, title):
+    """(movieId, titre) : le movieId posté, sinon celui du titre saisi d'après l'index de recherche."""
+    if movie_id:
+        return int(movie_id), title
+    movie_id = get_index_titres().resoudre(title)
+    if movie_id is None:
+        raise ValueError('film inconnu')
+    return movie_id, get_catalogue().film_par_id(movie_id)['title']
+
+
 def rate(request):
     if request.method != 'POST':
         return redirect('home')
     try:
-        movie_id = int(request.POST.get('movie_id'))
-        title = request.POST.get('title', '')[:200]
+        movie_id, title = _resoudre_film(request.POST.get('movie_id'), request.POST.get('title', ''))
+        title = title[:200]
         rating_value = int(request.POST.get('rating'))
         if rating_value < 1 or rating_value > 5:
             raise ValueError('rating out of range')
     except Exception:
         return redirect('home')
 
-    Rating.objects.create(movie_id=movie_id, title=title, rating=rating_value)
+    # Écriture différée : la note rejoint le prochain lot (stats, cache et graphe suivent)
+    get_ingestion().ajouter(movie_id, title, rating_value, profil_de(request, creer=True))
     return redirect('home')
 
+def _calculer_recommandations(modele, notes, genres=0):
+    movie_ids, _ = modele.recommander(notes[:, 0], notes[:, 1], n=NB_RECOMMANDATIONS, genres=genres)
+    films = modele.films_par_id
+    movie_ids = movie_ids[np.isin(movie_ids, films.index)]
+    return films.loc[movie_ids].to_dict('records')
+
+
+def _recommandations_du_profil(modele, profil, notes, genres=0):
+    """Films recommandés à ``profil`` d'après ses notes ``(movie_id, note)`` (aucun sans profil)."""
+    if profil is None:
+        return []
+    return recommandations_en_cache(
+        profil.portee, notes, modele, lambda: _calculer_recommandations(modele, notes, genres), variante=genres
+    )
+
+
+def _derniere_note_du_visiteur(request):
+    return derniere_note_profil(request, profil_de(request))
+
+
+def _etag_recommandations(request):
+    return etag_modele(get_recommender().modele, *_derniere_note_du_visiteur(request), _filtre_genres(request))
+
+
+@_ses_notes_ecrites
+@cache_control(private=True, max_age=0, must_revalidate=True)
+@condition(etag_func=_etag_recommandations, last_modified_func=lambda request: _derniere_note_du_visiteur(request)[1])
 def recommander_films(request):
-    # Charger les données
-    chargement = ChargementDonnees()
-    chemin_donnees = "data/ml-latest-small"
-    if not chargement.charger_movielens(chemin_donnees):
+    modele = get_recommender().modele
+    if modele is None:
         return render(request, 'html/home.html', {'error': 'Impossible de charger les données'})
 
-    # Construire la matrice de transition
-    graphe = ConstructionGraphe(chargement.evaluations)
-    graphe.construire_matrice_transition()
-
-    # Recommander des films basés sur les évaluations existantes
-    films_recommandes = []
-    for rating in Rating.objects.all():
-        id_film = chargement.evaluations[chargement.evaluations['movieId'] == rating.movie_id]['id_film'].values
-        if len(id_film) > 0:
-            id_film = id_film[0]
-            scores = graphe.matrice_transition[id_film]
-            indices_recommandes = scores.argsort()[-5:][::-1]  # Top 5 recommandations
-            films_recommandes.extend(chargement.films.iloc[indices_recommandes].to_dict('records'))
-
-    films_recommandes = _dedupe_recommendations_list(films_recommandes)
-    return render(request, 'html/recommendations.html', {'films_recommandes': films_recommandes})
+    # Recommander des films d'après les notes du visiteur (utilisateur connecté ou session)
+    profil = profil_de(request)
+    notes = profil.notes() if profil else None
+    films_recommandes = _recommandations_du_profil(modele, profil, notes, _filtre_genres(request))
+    return render(request, 'html/recommendations.html', {
+        'films_recommandes': films_recommandes,
+        'genres': request.GET.get('genres', ''),
+        'genres_disponibles': GENRES,
+    })
+
+
+def _etag_similaires(request, movie_id):
+    return etag_modele(get_recommender().modele, movie_id, request.GET.get('k', ''))
+
+
+@cache_control(public=True, max_age=300)
+@condition(etag_func=_etag_similaires)
+def films_similaires(request, movie_id):
+    """JSON des films les plus proches de ``movie_id`` (index de voisins précalculé)."""
+    modele = get_recommender().modele
+    if modele is None:
+        return JsonResponse({'error': 'Modèle indisponible'}, status=503)
+
+    k = _parametre_entier(request, 'k', 10, minimum=1)
+    movie_ids, scores = modele.films_similaires(movie_id, k)
+    catalogue = get_catalogue()
+    film = catalogue.film_par_id(movie_id)
+    if film is None and len(movie_ids) == 0:
+        return JsonResponse({'error': 'Film inconnu'}, status=404)
+
+    similaires = []
+    for mid, score in zip(movie_ids.tolist(), scores.tolist()):
+        voisin = catalogue.film_par_id(mid) or {'movieId': mid, 'title': None}
+        similaires.append({'movieId': mid, 'title': voisin['title'], 'score': round(score, 4)})
+    return JsonResponse({
+        'movieId': movie_id,
+        'title': film['title'] if film else None,
+        'similarite': modele.voisins.mesure,
+        'similar': similaires,
+    })
+
+
+@cache_control(public=True, max_age=300)
+def recherche(request):
+    """JSON des films dont le titre correspond à ``?q=`` (préfixe ou approché)."""
+    requete = request.GET.get('q', '')[:200]
+    limite = min(_parametre_entier(request, 'limit', 10, minimum=1), 50)
+    with span('recherche'):
+        index = get_index_titres()
+        resultats = index.rechercher(requete, limite)
+
+    films = []
+    for position, score in resultats:
+        film = index.catalogue.film(position)
+        films.append({'movieId': film['movieId'], 'title': film['title'],
+                      'year': _extract_year(film['title']), 'score': round(score, 4)})
+    return JsonResponse({'query': requete, 'results': films})
+
+
+def metriques(request):
+    """Métriques du processus au format texte Prometheus."""
+    return HttpResponse(REGISTRE.exporter(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'core',  # added core app
 ]
 MIDDLEWARE = [
+    'core.middleware.MetriquesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,8 +60,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Connexions persistantes ; attente du verrou d'écriture plutôt qu'une erreur immédiate
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'timeout': 20},
     }
 }
+# Cache : mémoire locale en développement, fichiers partagés entre workers si DJANGO_CACHE_DIR est défini
+if os.environ.get('DJANGO_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['DJANGO_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/\#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,3 +113,66 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Recommandation : artefact du modèle produit par `manage.py build_reco_model`
+RECO_MODELE_DIR = BASE_DIR / 'data' / 'modele'
+# Export hors ligne du top-K de chaque utilisateur (`manage.py precompute_reco`), hors de l'artefact publié
+RECO_PRECALCULS_DIR = BASE_DIR / 'data' / 'precalculs'
+# Charger le modèle au démarrage du processus plutôt qu'à la première requête
+RECO_PRECHAUFFAGE = os.environ.get('RECO_PRECHAUFFAGE', '') == '1'
+# Nouvelles notes appliquées au graphe par lots : toutes les N secondes ou dès N paires en attente.
+# Mise à jour propre à chaque processus : sous N workers, seul celui qui a reçu le vote en tient
+# compte ; les autres le voient à la reconstruction suivante (build_reco_model relit les notes).
+RECO_MAJ_INTERVALLE = 5.0
+RECO_MAJ_TAILLE_MAX = 500
+# Index des films similaires construit à la volée quand l'artefact n'en contient pas
+RECO_VOISINS_K = 20
+RECO_SIMILARITE = 'cosinus'
+# Listes de recommandations en cache (secondes) et attente maximale du calcul d'un autre worker
+RECO_CACHE_TTL = 600
+RECO_CACHE_ATTENTE = 2.0
+# Moteur construit par build_reco_model : 'marche' (co-occurrences) ou 'als' (facteurs latents)
+RECO_BACKEND = os.environ.get('RECO_BACKEND', 'marche')
+RECO_ALS_FACTEURS = 64
+RECO_ALS_ITERATIONS = 10
+RECO_ALS_REGULARISATION = 0.1
+RECO_ALS_ALPHA = 10.0
+# Part du score de contenu (genres, tags) mêlée à celui de la marche aléatoire, entre 0 et 1
+RECO_POIDS_CONTENU = 0.2
+# Pondération temporelle des co-occurrences (moteur 'marche') : demi-vie et fenêtre glissante en jours (None : désactivée)
+RECO_DEMI_VIE_JOURS = None
+RECO_FENETRE_JOURS = None
+
+# API JSON asynchrone : threads réservés au calcul des recommandations
+API_THREADS = 4
+
+# Notes écrites en base par lots : toutes les N secondes ou dès N notes en attente (0 : écriture immédiate)
+NOTES_INTERVALLE = 0.5
+NOTES_TAILLE_MAX = 200
+
+# TMDB : posters des films, mis en cache dans la table core_poster
+TMDB_API_KEY = os.environ.get('TMDB_API_KEY')
+TMDB_API_URL = os.environ.get('TMDB_API_URL', 'https://api.themoviedb.org/3')
+TMDB_TIMEOUT = 5
+TMDB_WORKERS = 8
+# API asynchrone : délai global de résolution des posters d'une réponse (secondes)
+TMDB_DELAI_TOTAL = 2.0
+POSTER_TTL = 30 * 24 * 3600
+POSTER_TTL_NEGATIF = 24 * 3600
+
+# Fragments de gabarit des cartes de films (secondes) ; la clé inclut moyenne, votes et poster
+CARTES_CACHE_TTL = 600
+
+# Journaux des erreurs en arrière-plan (écriture des notes, mise à jour du graphe, TMDB) sur la sortie d'erreur
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'WARNING'},
+        'sadia_site': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+# Métriques : exposées sur /metrics ; l'en-tête Server-Timing détaille les étapes de chaque requête
+METRIQUES_SERVER_TIMING = os.environ.get('METRIQUES_SERVER_TIMING', '') == '1'
@@ -0,0 +1,152 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+# --------------------------------------------
+# Caractéristiques de contenu (genres et tags)
+# --------------------------------------------
+#
+# Les films sans note >= 4 n'ont aucune arête dans le graphe de co-occurrences :
+# leur profil de contenu (genres de movies.csv, tags de tags.csv) leur donne
+# malgré tout des voisins.
+
+# Genres MovieLens, dans l'ordre des bits du masque de genres (uint32)
+GENRES = ('Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Fantasy', 'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller',
+          'War', 'Western', 'IMAX')
+
+
+def normaliser_l2(matrice):
+    """Divise chaque ligne d'une matrice CSR par sa norme (les lignes nulles restent nulles)."""
+    normes = np.sqrt(np.asarray(matrice.multiply(matrice).sum(axis=1)).ravel())
+    normes[normes == 0] = 1.0
+    return sp.csr_matrix(sp.diags((1.0 / normes).astype(np.float32)) @ matrice)
+
+
+def masques_genres(colonne_genres):
+    """Masque de bits (uint32) des genres de chaque film, d'après la colonne ``genres`` (« A|B|C »)."""
+    bits = {genre: np.uint32(1 << i) for i, genre in enumerate(GENRES)}
+    masques = np.zeros(len(colonne_genres), dtype=np.uint32)
+    for i, genres in enumerate(colonne_genres):
+        for genre in str(genres).split('|'):
+            masques[i] |= bits.get(genre, np.uint32(0))
+    return masques
+
+
+def masque_filtre(texte):
+    """Masque des genres demandés (« Comedy,Romance », casse indifférente) ; 0 si ``texte`` est vide.
+
+    Lève ValueError si un nom n'est pas un genre MovieLens.
+    """
+    bits = {genre.lower(): 1 << i for i, genre in enumerate(GENRES)}
+    masque = 0
+    for nom in str(texte or '').replace('|', ',').split(','):
+        nom = nom.strip().lower()
+        if not nom:
+            continue
+        if nom not in bits:
+            raise ValueError(f'genre inconnu : {nom}')
+        masque |= bits[nom]
+    return masque
+
+
+def avec_genres(masques, filtre):
+    """Films (booléens) ayant tous les genres de ``filtre`` : un ET bit à bit sur tout le tableau."""
+    filtre = np.uint32(filtre)
+    return (masques & filtre) == filtre
+
+
+class CaracteristiquesContenu:
+    """Matrice creuse films × termes (TF-IDF), lignes normalisées.
+
+    Les termes sont les genres et les tags (en minuscules). Le poids d'un tag
+    croît avec le nombre d'utilisateurs l'ayant posé (1 + log tf) ; l'idf
+    atténue les termes répandus (« Drama »). ``ids`` (movieId triés) couvre tout
+    le catalogue, y compris les films absents du graphe.
+
+    Aucune matrice de similarité films × films n'est construite : le score d'un
+    profil contre tous les films est un produit matrice creuse · vecteur.
+    """
+
+    def __init__(self, ids, matrice, genres):
+        self.ids = ids
+        self.matrice = matrice
+        self.genres = genres
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def construire(cls, chemin_donnees, films=None):
+        """Lit movies.csv (sauf si ``films`` est fourni) et tags.csv s'il existe."""
+        dossier = Path(chemin_donnees)
+        if films is None:
+            films = pd.read_csv(dossier / 'movies.csv')
+        films = films.drop_duplicates('movieId').sort_values('movieId')
+        ids = films['movieId'].to_numpy(dtype=np.int32)
+        genres = masques_genres(films['genres'].fillna('').to_numpy())
+
+        termes = films[['movieId']].assign(terme=films['genres'].fillna('').str.split('|')).explode('terme')
+        termes = termes[termes['terme'].isin(GENRES)]
+        termes = termes.assign(terme='genre:' + termes['terme'], tf=1.0)
+
+        chemin_tags = dossier / 'tags.csv'
+        if chemin_tags.exists():
+            tags = pd.read_csv(chemin_tags, usecols=['movieId', 'tag'], dtype={'movieId': np.int32, 'tag': str})
+            tags = tags.assign(tag=tags['tag'].str.strip().str.lower()).dropna()
+            tags = tags[(tags['tag'] != '') & np.isin(tags['movieId'].to_numpy(), ids)]
+            tags = tags.groupby(['movieId', 'tag']).size().reset_index(name='tf')
+            tags = tags.assign(terme='tag:' + tags['tag'], tf=1.0 + np.log(tags['tf'].to_numpy(dtype=np.float64)))
+            termes = pd.concat([termes, tags[['movieId', 'terme', 'tf']]], ignore_index=True)
+
+        lignes = np.searchsorted(ids, termes['movieId'].to_numpy())
+        _, colonnes = np.unique(termes['terme'].to_numpy(dtype=str), return_inverse=True)
+        nb_termes = int(colonnes.max()) + 1 if len(colonnes) else 0
+        frequences = np.bincount(colonnes, minlength=nb_termes)
+        idf = np.log((1.0 + len(ids)) / (1.0 + frequences)) + 1.0
+        valeurs = (termes['tf'].to_numpy() * idf[colonnes]).astype(np.float32)
+
+        matrice = sp.csr_matrix((valeurs, (lignes, colonnes)), shape=(len(ids), nb_termes), dtype=np.float32)
+        return cls(ids, normaliser_l2(matrice), genres)
+
+    def positions(self, movie_ids):
+        """Position de chaque movieId dans ``ids`` (-1 pour les films inconnus)."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(movie_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, movie_ids), len(self.ids) - 1)
+        return np.where(self.ids[positions] == movie_ids, positions, -1)
+
+    def scores(self, positions, poids):
+        """Similarité cosinus du profil (somme pondérée des films ``positions``) avec chaque film."""
+        profil = np.asarray(self.matrice[positions].T @ np.asarray(poids, dtype=np.float32)).ravel()
+        norme = np.linalg.norm(profil)
+        if norme == 0:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        return np.asarray(self.matrice @ (profil / norme), dtype=np.float32).ravel()
+
+    def sauvegarder(self, dossier):
+        dossier = Path(dossier)
+        np.save(dossier / 'contenu_ids.npy', self.ids)
+        np.save(dossier / 'contenu_genres.npy', self.genres)
+        np.save(dossier / 'contenu_data.npy', self.matrice.data.astype(np.float32))
+        np.save(dossier / 'contenu_indices.npy', self.matrice.indices.astype(np.int32))
+        np.save(dossier / 'contenu_indptr.npy', self.matrice.indptr.astype(np.int32))
+        return self.matrice.shape[1]
+
+    @classmethod
+    def charger(cls, dossier, nb_termes, mmap_mode='r'):
+        dossier = Path(dossier)
+        if not (dossier / 'contenu_ids.npy').exists():
+            return None
+
+        def ouvrir(nom):
+            return np.load(dossier / f'contenu_{nom}.npy', mmap_mode=mmap_mode)
+
+        ids = ouvrir('ids')
+        matrice = sp.csr_matrix((ouvrir('data'), ouvrir('indices'), ouvrir('indptr')),
+                                shape=(len(ids), nb_termes), copy=False)
+        return cls(ids, matrice, ouvrir('genres'))
@@ -0,0 +1,156 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from sadia_site.src.factorisation import FactorisationALS
+from sadia_site.src.recommendation import (ChargementDonnees, ConstructionGraphe, MetriquesEvaluation,
+                                           RecommandationMarcheAleatoire, top_k_colonnes)
+
+
+# --------------------------------------------
+# Évaluation hors ligne (découpage temporel)
+# --------------------------------------------
+
+TYPES_EVALUATIONS = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32, 'timestamp': np.int64}
+
+
+def decouper_par_date(evaluations, proportion_test=0.2):
+    """Sépare les notes à une date de coupure : les plus récentes forment le jeu de test."""
+    coupure = np.quantile(evaluations['timestamp'].to_numpy(), 1 - proportion_test)
+    test = evaluations['timestamp'].to_numpy() >= coupure
+    return evaluations[~test].reset_index(drop=True), evaluations[test].reset_index(drop=True)
+
+
+def _moyenne(valeurs):
+    return float(np.mean(valeurs)) if len(valeurs) else 0.0
+
+
+# Moteur du processus fils (transmis une fois par processus)
+_recommandeur = None
+
+
+def _initialiser_processus(recommandeur):
+    global _recommandeur
+    _recommandeur = recommandeur
+
+
+def _recommander_lot(graines, k, alpha, iterations):
+    """Top-k de chaque colonne de ``graines`` ; retourne (utilisateurs × k, durée en secondes)."""
+    debut = time.perf_counter()
+    scores = _recommandeur.scores_par_lots(graines, alpha=alpha, iterations_max=iterations)
+    indices, valeurs = top_k_colonnes(scores, k, exclure=graines)
+    recommandations = np.where(np.isfinite(valeurs) & (valeurs > 0), indices, -1).T
+    return recommandations.astype(np.int32), time.perf_counter() - debut
+
+
+class EvaluationHorsLigne:
+    """Entraîne le graphe sur le passé et mesure la qualité sur les notes futures.
+
+    Chaque utilisateur du jeu de test ayant au moins un film aimé dans le passé
+    reçoit un top-K en lots (PageRank personnalisé, ou projection sur les
+    facteurs avec ``backend='als'``) ; les films aimés (>= 4) après la coupure
+    servent de vérité terrain.
+    """
+
+    def __init__(self, chemin_donnees="data/ml-latest-small", proportion_test=0.2, k=10, alpha=0.15,
+                 iterations=30, top_k=None, taille_lot=256, nb_processus=1, backend='marche', options_als=None):
+        self.chemin_donnees = chemin_donnees
+        self.proportion_test = proportion_test
+        self.k = k
+        self.alpha = alpha
+        self.iterations = iterations
+        self.top_k = top_k
+        self.taille_lot = taille_lot
+        self.nb_processus = nb_processus
+        self.backend = backend
+        self.options_als = options_als or {}
+
+    def charger(self):
+        chemin = ChargementDonnees.resoudre_chemin(self.chemin_donnees) / 'ratings.csv'
+        return pd.read_csv(chemin, usecols=list(TYPES_EVALUATIONS), dtype=TYPES_EVALUATIONS)
+
+    def executer(self, evaluations=None):
+        if evaluations is None:
+            evaluations = self.charger()
+        apprentissage, test = decouper_par_date(evaluations, self.proportion_test)
+
+        debut = time.perf_counter()
+        chargement = ChargementDonnees()
+        chargement.evaluations = apprentissage
+        chargement._nettoyer_donnees()
+        graphe = ConstructionGraphe(chargement.evaluations, top_k=self.top_k)
+        if self.backend == 'als':
+            recommandeur = FactorisationALS.entrainer(graphe.matrice_incidence(), **self.options_als)
+        else:
+            recommandeur = RecommandationMarcheAleatoire(graphe.construire_matrice_transition())
+        duree_construction = time.perf_counter() - debut
+
+        incidence, verite = self._graines_et_verite(chargement.evaluations, test, graphe)
+        recommandations, latences = self._recommander(recommandeur, incidence)
+
+        metriques = MetriquesEvaluation(chargement.evaluations)
+        resultats = metriques.evaluer_lot(recommandations, verite, self.k)
+        latences = np.asarray(latences) * 1000
+        return {
+            'parametres': {
+                'backend': self.backend, 'proportion_test': self.proportion_test, 'k': self.k,
+                'alpha': self.alpha, 'iterations': self.iterations, 'top_k': self.top_k, **self.options_als,
+            },
+            'nb_utilisateurs_test': int(incidence.shape[0]),
+            f'precision@{self.k}': _moyenne(resultats['precision']),
+            f'recall@{self.k}': _moyenne(resultats['recall']),
+            f'ndcg@{self.k}': _moyenne(resultats['ndcg']),
+            'map': _moyenne(resultats['ap']),
+            'couverture': metriques.couverture(recommandations, graphe.nb_films),
+            'duree_construction_s': round(duree_construction, 4),
+            'latence_par_utilisateur_ms': {
+                'moyenne': _moyenne(latences) if len(latences) else None,
+                'p50': float(np.percentile(latences, 50)) if len(latences) else None,
+                'p95': float(np.percentile(latences, 95)) if len(latences) else None,
+            },
+        }
+
+    @staticmethod
+    def _graines_et_verite(apprentissage, test, graphe):
+        """Incidence passée et vérité terrain future, restreintes aux utilisateurs évaluables."""
+        ids_utilisateurs = np.unique(apprentissage['userId'].to_numpy())
+        ids_films = np.unique(apprentissage['movieId'].to_numpy())
+
+        aimes = test[test['rating'].to_numpy() >= ChargementDonnees.SEUIL_NOTE]
+        user_ids, movie_ids = aimes['userId'].to_numpy(), aimes['movieId'].to_numpy()
+        # Seuls les utilisateurs et films déjà présents dans le passé sont évaluables
+        connus = np.isin(user_ids, ids_utilisateurs) & np.isin(movie_ids, ids_films)
+        utilisateurs = np.searchsorted(ids_utilisateurs, user_ids[connus])
+        films = np.searchsorted(ids_films, movie_ids[connus])
+
+        incidence = graphe.matrice_incidence()
+        verite = sp.csr_matrix((np.ones(len(utilisateurs), dtype=np.float32), (utilisateurs, films)),
+                               shape=incidence.shape)
+        verite.data[:] = 1.0
+        # Une note future sur un film déjà aimé avant la coupure ne compte pas
+        verite = verite - verite.multiply(incidence)
+        verite.eliminate_zeros()
+
+        evaluables = np.flatnonzero(np.diff(verite.indptr) > 0)
+        return incidence[evaluables], verite[evaluables]
+
+    def _recommander(self, recommandeur, incidence):
+        lots = [incidence[d:d + self.taille_lot].T.tocsr() for d in range(0, incidence.shape[0], self.taille_lot)]
+        recommander = partial(_recommander_lot, k=self.k, alpha=self.alpha, iterations=self.iterations)
+        if self.nb_processus > 1:
+            with ProcessPoolExecutor(self.nb_processus, initializer=_initialiser_processus,
+                                     initargs=(recommandeur,)) as executeur:
+                sorties = list(executeur.map(recommander, lots))
+        else:
+            _initialiser_processus(recommandeur)
+            sorties = [recommander(lot) for lot in lots]
+
+        if not sorties:
+            return np.empty((0, self.k), dtype=np.int32), []
+        recommandations = np.vstack([r for r, _ in sorties])
+        latences = [duree / lot.shape[1] for (_, duree), lot in zip(sorties, lots) for _ in range(lot.shape[1])]
+        return recommandations, latences
@@ -0,0 +1,140 @@
+import numpy as np
+import scipy.sparse as sp
+
+from sadia_site.src.metriques import span
+from sadia_site.src.recommendation import Recommandeur
+
+
+# --------------------------------------------
+# Factorisation matricielle implicite (ALS)
+# --------------------------------------------
+#
+# Hu, Koren & Volinsky : chaque film aimé p_ui = 1 est vu avec une confiance
+# c_ui = 1 + alpha·poids. Les facteurs utilisateurs X et films Y (rang k)
+# minimisent Σ c_ui (p_ui - x_u·y_i)² + λ(‖X‖² + ‖Y‖²) en alternant : à Y fixé,
+# chaque x_u résout
+#
+#     (YᵀY + λI + Σ_i (c_ui - 1)·y_i y_iᵀ) x_u = Σ_i c_ui·y_i
+#
+# Les systèmes de toutes les lignes sont résolus ensemble par gradient conjugué :
+# un produit A·P ne coûte que O(nnz·k), sans jamais former les matrices k × k.
+
+# Nombre de notes traitées par bloc (la mémoire de travail est nnz × k float32)
+TAILLE_BLOC_CG = 1 << 18
+
+
+def _blocs(indptr, taille_bloc):
+    """Bornes de lignes consécutives regroupant au plus ``taille_bloc`` notes (sauf ligne plus longue)."""
+    nb_lignes = len(indptr) - 1
+    debut = 0
+    while debut < nb_lignes:
+        fin = int(np.searchsorted(indptr, indptr[debut] + taille_bloc, side='right')) - 1
+        fin = min(max(fin, debut + 1), nb_lignes)
+        yield debut, fin
+        debut = fin
+
+
+def resoudre_cg(preferences, fixes, courants, regularisation, alpha, iterations=3, gramien=None):
+    """Met à jour les facteurs de chaque ligne de ``preferences`` (CSR, poids des films aimés).
+
+    ``fixes`` sont les facteurs de l'autre côté ; ``courants`` sert de point de
+    départ (quelques itérations suffisent d'une alternance à la suivante).
+    """
+    if gramien is None:
+        gramien = fixes.T @ fixes + regularisation * np.eye(fixes.shape[1], dtype=np.float32)
+    resultat = np.array(courants, dtype=np.float32, copy=True)
+
+    for debut, fin in _blocs(preferences.indptr, TAILLE_BLOC_CG):
+        bloc = preferences[debut:fin]
+        lignes = np.repeat(np.arange(fin - debut), np.diff(bloc.indptr))
+        vecteurs = fixes[bloc.indices]
+        surplus = (alpha * bloc.data).astype(np.float32)  # c - 1
+
+        def produit(p):
+            d = np.einsum('ij,ij->i', vecteurs, p[lignes]) * surplus
+            return p @ gramien + sp.csr_matrix((d, bloc.indices, bloc.indptr), shape=bloc.shape) @ fixes
+
+        cible = sp.csr_matrix((1 + surplus, bloc.indices, bloc.indptr), shape=bloc.shape) @ fixes
+        x = resultat[debut:fin]
+        r = cible - produit(x)
+        p = r.copy()
+        rs = np.einsum('ij,ij->i', r, r)
+        for _ in range(iterations):
+            ap = produit(p)
+            pap = np.einsum('ij,ij->i', p, ap)
+            pas = np.divide(rs, pap, out=np.zeros_like(rs), where=pap > 0)
+            x += pas[:, None] * p
+            r -= pas[:, None] * ap
+            rs_nouveau = np.einsum('ij,ij->i', r, r)
+            if rs_nouveau.max(initial=0) < 1e-10:
+                break
+            p = r + np.divide(rs_nouveau, rs, out=np.zeros_like(rs), where=rs > 0)[:, None] * p
+            rs = rs_nouveau
+        resultat[debut:fin] = x
+    return resultat
+
+
+class FactorisationALS(Recommandeur):
+    """Moteur à facteurs latents : seuls les facteurs films (films × k, float32) sont conservés.
+
+    Un utilisateur (ensemble de films notés) est projeté à la volée par un
+    système k × k, puis noter tout le catalogue coûte un produit (k × films).
+    """
+
+    nom = 'als'
+
+    def __init__(self, facteurs_films, regularisation=0.1, alpha=10.0):
+        self.facteurs_films = facteurs_films
+        self.regularisation = regularisation
+        self.alpha = alpha
+        self.nb_films = facteurs_films.shape[0]
+        self._gramien = None
+
+    @property
+    def nb_facteurs(self):
+        return self.facteurs_films.shape[1]
+
+    @property
+    def gramien(self):
+        """YᵀY + λI, commun à tous les utilisateurs."""
+        if self._gramien is None:
+            y = np.asarray(self.facteurs_films, dtype=np.float32)
+            self._gramien = y.T @ y + self.regularisation * np.eye(self.nb_facteurs, dtype=np.float32)
+        return self._gramien
+
+    @classmethod
+    @span('reco.entrainement_als')
+    def entrainer(cls, preferences, nb_facteurs=64, iterations=10, regularisation=0.1, alpha=10.0,
+                  iterations_cg=3, graine=0):
+        """Entraîne sur une matrice utilisateur × film (CSR) dont les valeurs sont les poids des films aimés."""
+        preferences = sp.csr_matrix(preferences, dtype=np.float32)
+        transposee = preferences.T.tocsr()
+        rng = np.random.default_rng(graine)
+        facteurs_films = rng.normal(0, 0.01, (preferences.shape[1], nb_facteurs)).astype(np.float32)
+        facteurs_utilisateurs = np.zeros((preferences.shape[0], nb_facteurs), dtype=np.float32)
+
+        for _ in range(iterations):
+            facteurs_utilisateurs = resoudre_cg(preferences, facteurs_films, facteurs_utilisateurs,
+                                                regularisation, alpha, iterations_cg)
+            facteurs_films = resoudre_cg(transposee, facteurs_utilisateurs, facteurs_films,
+                                         regularisation, alpha, iterations_cg)
+        return cls(facteurs_films, regularisation, alpha)
+
+    def facteurs_utilisateur(self, graines, poids):
+        """Projette un ensemble de films notés (id_film, poids) sur les facteurs : système k × k exact."""
+        y = np.asarray(self.facteurs_films[graines], dtype=np.float32)
+        surplus = self.alpha * np.asarray(poids, dtype=np.float32)
+        matrice = self.gramien + (y.T * surplus) @ y
+        return np.linalg.solve(matrice, (1 + surplus) @ y)
+
+    def scores(self, graines, poids):
+        return np.asarray(self.facteurs_films @ self.facteurs_utilisateur(graines, poids), dtype=np.float32)
+
+    def scores_par_lots(self, graines, iterations_cg=None, **options):
+        """Projette chaque colonne de ``graines`` (films × colonnes) par gradient conjugué, puis note."""
+        preferences = sp.csr_matrix(graines.T if sp.issparse(graines) else np.asarray(graines).T,
+                                    dtype=np.float32)
+        departs = np.zeros((preferences.shape[0], self.nb_facteurs), dtype=np.float32)
+        facteurs = resoudre_cg(preferences, np.asarray(self.facteurs_films), departs, self.regularisation,
+                               self.alpha, iterations_cg or self.nb_facteurs, gramien=self.gramien)
+        return np.asarray(self.facteurs_films @ facteurs.T, dtype=np.float32)
@@ -0,0 +1,159 @@
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# --------------------------------------------
+# Métriques du processus (format texte Prometheus)
+# --------------------------------------------
+#
+# Chaque processus tient son propre registre : derrière plusieurs workers,
+# Prometheus interroge chacun d'eux (ou agrège côté collecte).
+
+SEUILS_SECONDES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registre:
+    """Compteurs et histogrammes étiquetés, protégés par un verrou."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._aides = {}
+        self._compteurs = {}
+        self._histogrammes = {}
+
+    @staticmethod
+    def _cle(nom, etiquettes):
+        return nom, tuple(sorted(etiquettes.items()))
+
+    def incrementer(self, nom, valeur=1, aide='', **etiquettes):
+        cle = self._cle(nom, etiquettes)
+        with self._verrou:
+            self._aides.setdefault(nom, ('counter', aide))
+            self._compteurs[cle] = self._compteurs.get(cle, 0) + valeur
+
+    def observer(self, nom, valeur, aide='', **etiquettes):
+        cle = self._cle(nom, etiquettes)
+        with self._verrou:
+            self._aides.setdefault(nom, ('histogram', aide))
+            histogramme = self._histogrammes.get(cle)
+            if histogramme is None:
+                histogramme = self._histogrammes[cle] = [[0] * len(SEUILS_SECONDES), 0.0, 0]
+            position = bisect_left(SEUILS_SECONDES, valeur)
+            if position < len(SEUILS_SECONDES):
+                histogramme[0][position] += 1
+            histogramme[1] += valeur
+            histogramme[2] += 1
+
+    def valeur(self, nom, **etiquettes):
+        """Valeur d'un compteur (ou nombre d'observations d'un histogramme), 0 si absent."""
+        cle = self._cle(nom, etiquettes)
+        with self._verrou:
+            if cle in self._compteurs:
+                return self._compteurs[cle]
+            histogramme = self._histogrammes.get(cle)
+            return histogramme[2] if histogramme else 0
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._aides.clear()
+            self._compteurs.clear()
+            self._histogrammes.clear()
+
+    def exporter(self):
+        """Texte d'exposition Prometheus (version 0.0.4)."""
+        with self._verrou:
+            aides = dict(self._aides)
+            compteurs = dict(self._compteurs)
+            histogrammes = {cle: ([*h[0]], h[1], h[2]) for cle, h in self._histogrammes.items()}
+
+        lignes = []
+        for nom in sorted(aides):
+            type_metrique, aide = aides[nom]
+            lignes.append(f'# HELP {nom} {aide}')
+            lignes.append(f'# TYPE {nom} {type_metrique}')
+            if type_metrique == 'counter':
+                for (n, etiquettes), valeur in sorted(compteurs.items()):
+                    if n == nom:
+                        lignes.append(f'{nom}{_etiquettes(etiquettes)} {_nombre(valeur)}')
+                continue
+            for (n, etiquettes), (seaux, somme, nombre) in sorted(histogrammes.items()):
+                if n != nom:
+                    continue
+                cumul = 0
+                for seuil, compte in zip(SEUILS_SECONDES, seaux):
+                    cumul += compte
+                    lignes.append(f'{nom}_bucket{_etiquettes(etiquettes + (("le", _nombre(seuil)),))} {cumul}')
+                lignes.append(f'{nom}_bucket{_etiquettes(etiquettes + (("le", "+Inf"),))} {nombre}')
+                lignes.append(f'{nom}_sum{_etiquettes(etiquettes)} {_nombre(somme)}')
+                lignes.append(f'{nom}_count{_etiquettes(etiquettes)} {nombre}')
+        return '\n'.join(lignes) + '\n'
+
+
+def _etiquettes(etiquettes):
+    if not etiquettes:
+        return ''
+    contenu = ','.join(
+        '{}="{}"'.format(cle, str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for cle, valeur in etiquettes
+    )
+    return '{' + contenu + '}'
+
+
+def _nombre(valeur):
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+REGISTRE = Registre()
+
+# Durées des spans de la requête en cours (pour l'en-tête Server-Timing)
+_spans_requete = contextvars.ContextVar('spans_requete', default=None)
+
+
+def debuter_requete():
+    """Ouvre la collecte des spans de la requête ; retourne (jeton, liste des spans)."""
+    spans = []
+    return _spans_requete.set(spans), spans
+
+
+def terminer_requete(jeton):
+    _spans_requete.reset(jeton)
+
+
+@contextmanager
+def span(nom):
+    """Chronomètre un bloc (utilisable aussi comme décorateur).
+
+    La durée alimente l'histogramme ``bobetteflix_span_seconds{span=nom}`` et,
+    pendant une requête, l'en-tête ``Server-Timing``.
+    """
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        REGISTRE.observer('bobetteflix_span_seconds', duree, "Durée des étapes instrumentées", span=nom)
+        spans = _spans_requete.get()
+        if spans is not None:
+            spans.append((nom, duree))
+
+
+def compter_cache(cache, succes, nombre=1):
+    """Compte les succès/échecs d'un cache (le ratio se calcule côté Prometheus)."""
+    if nombre:
+        REGISTRE.incrementer('bobetteflix_cache_total', nombre, "Accès aux caches par résultat",
+                             cache=cache, resultat='hit' if succes else 'miss')
+
+
+def server_timing(spans, total, nb_requetes_sql):
+    """Valeur d'en-tête Server-Timing : total, SQL (si compté) puis chaque span (durées en ms)."""
+    entrees = [f'total;dur={total * 1000:.1f}']
+    if nb_requetes_sql is not None:
+        entrees.append(f'db;desc="{nb_requetes_sql} requêtes SQL"')
+    for nom, duree in spans:
+        jeton = re.sub(r'[^A-Za-z0-9_.-]', '-', nom)
+        entrees.append(f'{jeton};dur={duree * 1000:.1f}')
+    return ', '.join(entrees)
@@ -0,0 +1,117 @@
+import logging
+import threading
+
+import numpy as np
+
+from sadia_site.src.metriques import REGISTRE
+
+logger = logging.getLogger(__name__)
+
+# Même seuil que ChargementDonnees._nettoyer_donnees
+NOTE_MINIMALE = 4
+
+
+# --------------------------------------------
+# Mise à jour incrémentale du graphe
+# --------------------------------------------
+
+class MiseAJourIncrementale:
+    """File des nouvelles notes élevées, appliquées au graphe par lots.
+
+    Une note >= 4 sur le film ``f`` par un utilisateur qui aimait déjà les films
+    ``L`` ajoute les co-occurrences (f, g) et (g, f) pour chaque g de L. Les
+    paires s'accumulent dans une file ; un thread de fond la vide toutes les
+    ``intervalle`` secondes (ou plus tôt si ``taille_max`` paires attendent) et
+    seules les lignes touchées de la matrice sont renormalisées.
+
+    Ces co-occurrences ne vivent que dans la mémoire du processus (surcouche du
+    modèle) : elles ne sont pas persistées, et sous plusieurs workers seul celui
+    qui a reçu le vote en tient compte. Elles rejoignent le graphe à la
+    construction suivante, ``build_reco_model`` relisant les notes des profils
+    en base (``core.profils.evaluations_des_profils``).
+    """
+
+    def __init__(self, service, intervalle=5.0, taille_max=500):
+        self.service = service
+        self.intervalle = intervalle
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._reveil = threading.Event()
+        self._paires = []
+        self._thread = None
+
+    def __len__(self):
+        return len(self._paires)
+
+    def ajouter(self, movie_id, note, films_deja_aimes):
+        """Met en file une nouvelle note ; ``films_deja_aimes`` sont les movieId déjà notés >= 4."""
+        if note < NOTE_MINIMALE:
+            return
+        films_deja_aimes = [m for m in films_deja_aimes if m != movie_id]
+        if not films_deja_aimes:
+            return
+
+        pret = self.service.is_ready
+        with self._verrou:
+            self._paires.extend((movie_id, autre) for autre in films_deja_aimes)
+            ignorees = 0 if pret else len(self._paires) - self.taille_max
+            if ignorees > 0:
+                # Modèle jamais chargé dans ce processus (worker qui ne sert pas les
+                # recommandations) : file bornée, la reconstruction relira ces notes
+                del self._paires[self.taille_max:]
+            plein = pret and len(self._paires) >= self.taille_max
+        if ignorees > 0:
+            REGISTRE.incrementer('bobetteflix_graphe_paires_ignorees_total', ignorees,
+                                 "Paires de co-occurrence écartées, modèle non chargé")
+        self._demarrer()
+        if plein:
+            self._reveil.set()
+
+    def vider(self):
+        """Applique toutes les paires en attente ; retourne le nombre de paires appliquées.
+
+        Tant que le modèle n'est pas chargé, les paires restent en file (au plus
+        ``taille_max``) : la mise à jour ne déclenche jamais elle-même le chargement.
+        """
+        if not self.service.is_ready:
+            return 0
+        modele = self.service.modele
+        if modele is None or modele.sommes_lignes is None:
+            with self._verrou:
+                self._paires = []
+            return 0
+
+        with self._verrou:
+            paires, self._paires = self._paires, []
+        if not paires:
+            return 0
+
+        paires = np.array(paires, dtype=np.int64)
+        gauche = modele.ids_internes(paires[:, 0])
+        droite = modele.ids_internes(paires[:, 1])
+        # Les films absents du graphe sont ignorés jusqu'à la prochaine reconstruction
+        connues = (gauche >= 0) & (droite >= 0)
+        gauche, droite = gauche[connues], droite[connues]
+        if len(gauche) == 0:
+            return 0
+
+        modele.appliquer_cooccurrences(np.concatenate([gauche, droite]), np.concatenate([droite, gauche]))
+        return len(gauche)
+
+    def _demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._verrou:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._boucle, name='reco-mise-a-jour', daemon=True)
+                self._thread.start()
+
+    def _boucle(self):
+        while True:
+            self._reveil.wait(self.intervalle)
+            self._reveil.clear()
+            try:
+                self.vider()
+            except Exception:
+                REGISTRE.incrementer('bobetteflix_graphe_erreurs_total', 1, "Échecs de mise à jour du graphe")
+                logger.exception("Erreur lors de la mise à jour du graphe")
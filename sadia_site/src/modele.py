@@ -0,0 +1,483 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+
+from sadia_site.src.contenu import CaracteristiquesContenu, avec_genres, masques_genres
+from sadia_site.src.factorisation import FactorisationALS
+from sadia_site.src.metriques import span
+from sadia_site.src.recommendation import (SECONDES_PAR_JOUR, ChargementDonnees, ConstructionGraphe,
+                                           RecommandationMarcheAleatoire, appliquer_deltas, top_k_colonnes)
+from sadia_site.src.voisins import IndexVoisins
+
+
+# --------------------------------------------
+# Artefact du modèle de recommandation
+# --------------------------------------------
+#
+# Un artefact est un dossier versionné contenant uniquement des fichiers .npy,
+# ouverts avec np.load(mmap_mode='r') : les workers partagent alors les mêmes
+# pages via le cache du système au lieu de reconstruire le graphe chacun.
+#
+#   <racine>/COURANT                 -> nom de la version active
+#   <racine>/<version>/manifeste.json
+#   <racine>/<version>/evaluations_<colonne>.npy
+#   <racine>/<version>/ids_films.npy          (id_film -> movieId)
+#   <racine>/<version>/transition_{data,indices,indptr}.npy  (moteur 'marche')
+#   <racine>/<version>/transition_sommes.npy  (somme brute des co-occurrences par ligne)
+#   <racine>/<version>/als_facteurs.npy       (facteurs films × k, moteur 'als')
+#   <racine>/<version>/voisins_{indices,scores}.npy  (films similaires, facultatif)
+#   <racine>/<version>/contenu_{ids,genres,data,indices,indptr}.npy  (genres et tags, facultatif)
+
+FORMAT_ARTEFACT = 1
+FICHIER_COURANT = 'COURANT'
+COLONNES_EVALUATIONS = ('userId', 'movieId', 'rating', 'id_utilisateur', 'id_film')
+BACKENDS = ('marche', 'als')
+
+
+def dossier_modele_par_defaut():
+    return Path(getattr(settings, 'RECO_MODELE_DIR', Path(settings.BASE_DIR) / 'data' / 'modele'))
+
+
+def _ramener_a_un(scores):
+    """Divise par le maximum pour que des scores d'échelles différentes soient comparables."""
+    maximum = scores.max() if len(scores) else 0
+    return scores / maximum if maximum > 0 else scores
+
+
+class ModeleRecommandation:
+    """Évaluations nettoyées, correspondances d'identifiants et moteur de recommandation.
+
+    Le moteur est la marche aléatoire sur ``matrice_transition`` ou, si
+    ``recommandeur`` est fourni (facteurs ALS), ce dernier ; la matrice de
+    transition vaut alors None.
+    """
+
+    def __init__(self, colonnes, ids_films, matrice_transition, version, films=None, meta=None, dossier=None,
+                 sommes_lignes=None, voisins=None, contenu=None, recommandeur=None):
+        self.colonnes = colonnes
+        self.ids_films = ids_films
+        self.matrice_transition = matrice_transition
+        self.sommes_lignes = sommes_lignes
+        # Co-occurrences ajoutées en ligne depuis la construction (None : aucune)
+        self.surcouche = None
+        self.version = version
+        # Incrémentée à chaque mise à jour en ligne de la matrice
+        self.revision = 0
+        self.meta = meta or {}
+        self.dossier = dossier
+        self._films = films
+        self._films_par_id = None
+        self._evaluations = None
+        self._index_films = None
+        self._voisins = voisins
+        # Caractéristiques de contenu (None : recommandation par la seule marche aléatoire)
+        self.contenu = contenu
+        self._positions_contenu = None
+        self._masques_genres = None
+        self._recommandeur = recommandeur
+
+    @property
+    def nb_films(self):
+        return len(self.ids_films)
+
+    @property
+    def backend(self):
+        return self.recommandeur.nom
+
+    @property
+    def recommandeur(self):
+        """Moteur de scoring ; la marche suit la surcouche courante (remplacée par les mises à jour en ligne)."""
+        recommandeur = self._recommandeur
+        if recommandeur is None or (recommandeur.nom == 'marche'
+                                    and (recommandeur.matrice_transition is not self.matrice_transition
+                                         or recommandeur.surcouche is not self.surcouche)):
+            recommandeur = RecommandationMarcheAleatoire(self.matrice_transition, self.surcouche)
+            self._recommandeur = recommandeur
+        return recommandeur
+
+    @property
+    def evaluations(self):
+        """DataFrame des évaluations (construit à la demande depuis les colonnes)."""
+        if self._evaluations is None:
+            self._evaluations = pd.DataFrame({nom: self.colonnes[nom] for nom in COLONNES_EVALUATIONS})
+        return self._evaluations
+
+    @property
+    def films(self):
+        """Catalogue movies.csv, lu à la première utilisation."""
+        if self._films is None:
+            chemin = Path(settings.BASE_DIR) / self.meta.get('chemin_donnees', 'data/ml-latest-small') / 'movies.csv'
+            self._films = pd.read_csv(chemin)
+        return self._films
+
+    @property
+    def films_par_id(self):
+        """Catalogue indexé par movieId (pour retrouver les titres des films recommandés)."""
+        if self._films_par_id is None:
+            self._films_par_id = self.films.set_index('movieId', drop=False)
+        return self._films_par_id
+
+    @property
+    def index_films(self):
+        """Tableau movieId -> id_film (-1 si le film n'est pas dans le graphe)."""
+        if self._index_films is None:
+            taille = int(self.ids_films.max()) + 1 if len(self.ids_films) else 0
+            index = np.full(taille, -1, dtype=np.int32)
+            index[self.ids_films] = np.arange(len(self.ids_films), dtype=np.int32)
+            self._index_films = index
+        return self._index_films
+
+    def ids_internes(self, movie_ids):
+        """Convertit des movieId en id_film (-1 pour les films inconnus du graphe)."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        index = self.index_films
+        connus = (movie_ids >= 0) & (movie_ids < len(index))
+        ids = np.full(len(movie_ids), -1, dtype=np.int32)
+        ids[connus] = index[movie_ids[connus]]
+        return ids
+
+    @property
+    def positions_contenu(self):
+        """Position de chaque id_film dans les caractéristiques de contenu (-1 si absent)."""
+        if self._positions_contenu is None:
+            self._positions_contenu = self.contenu.positions(self.ids_films)
+        return self._positions_contenu
+
+    @property
+    def masques_genres(self):
+        """Masque de genres (uint32) de chaque id_film, repris du contenu ou, à défaut, de movies.csv."""
+        if self._masques_genres is None:
+            if self.contenu is not None:
+                positions = self.positions_contenu
+                masques = np.where(positions >= 0, np.asarray(self.contenu.genres)[positions], 0)
+            else:
+                films = self.films_par_id.reindex(self.ids_films)
+                masques = masques_genres(films['genres'].fillna('').to_numpy())
+            self._masques_genres = masques.astype(np.uint32)
+        return self._masques_genres
+
+    @property
+    def voisins(self):
+        """Index des films similaires ; construit à la demande s'il n'est pas dans l'artefact."""
+        if self._voisins is None:
+            self.construire_voisins()
+        return self._voisins
+
+    def construire_voisins(self, k=None, mesure=None):
+        k = k or getattr(settings, 'RECO_VOISINS_K', 20)
+        mesure = mesure or getattr(settings, 'RECO_SIMILARITE', 'cosinus')
+        self._voisins = IndexVoisins.construire(ConstructionGraphe(self.evaluations), k=k, mesure=mesure)
+        return self._voisins
+
+    def films_similaires(self, movie_id, k=None):
+        """(movieId, scores) des films les plus proches de ``movie_id`` ; vide si inconnu."""
+        id_film = self.ids_internes([movie_id])[0]
+        if id_film < 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        voisins, scores = self.voisins.similaires(id_film, k)
+        return self.ids_films[voisins], scores
+
+    # ---------- Recommandation ----------
+
+    @span('reco.scoring')
+    def recommander(self, movie_ids, notes, n=20, poids_contenu=None, genres=0):
+        """Top-``n`` films à partir de notes (movieId, note) données.
+
+        Le moteur note tous les films d'un coup (marche : lignes de transition des
+        films notés, pondérées par la note puis sommées ; ALS : un produit avec les
+        facteurs films) ; les films déjà notés sont exclus avant une unique
+        sélection ``argpartition``.
+
+        Si le modèle a des caractéristiques de contenu et que ``poids_contenu``
+        (défaut : ``RECO_POIDS_CONTENU``) est non nul, les deux scores, ramenés
+        à [0, 1], sont mélangés : ``(1 - w)·moteur + w·contenu``. Les films hors
+        du graphe peuvent alors être recommandés, et servir de graines.
+
+        ``genres`` (masque, voir ``contenu.masque_filtre``) écarte les films qui
+        n'ont pas tous ces genres, dans le même masque que les films déjà notés.
+        Retourne ``(movie_ids, scores)`` triés par score décroissant.
+        """
+        if poids_contenu is None:
+            poids_contenu = getattr(settings, 'RECO_POIDS_CONTENU', 0.0)
+        notes = np.asarray(notes, dtype=np.float32)
+        graines, scores = self._scores_moteur(self.ids_internes(movie_ids), notes)
+        if self.contenu is not None and poids_contenu > 0:
+            return self._recommander_hybride(movie_ids, notes, graines, scores, n, poids_contenu, genres)
+        if scores is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        exclure = np.zeros(self.nb_films, dtype=bool) if not genres else ~avec_genres(self.masques_genres, genres)
+        exclure[graines] = True
+        indices, valeurs = top_k_colonnes(scores, n, exclure=exclure)
+        gardes = np.isfinite(valeurs) & (valeurs > 0)
+        return self.ids_films[indices[gardes]], valeurs[gardes]
+
+    def _scores_moteur(self, ids, notes):
+        """(films notés connus, scores par id_film) du moteur ; ``scores`` vaut None sans film aimé connu.
+
+        Seules les notes au moins égales au seuil d'appréciation servent de
+        graines, comme à l'entraînement : un film mal noté ne promeut pas ses
+        voisins, il est seulement exclu des résultats.
+        """
+        connus = ids >= 0
+        if not connus.any():
+            return np.empty(0, dtype=np.int32), None
+
+        # Un même film noté plusieurs fois : ses notes s'additionnent ; une note
+        # égale au seuil d'appréciation pèse 1, comme un film aimé à l'entraînement
+        notes_connues = notes[connus]
+        aimees = np.where(notes_connues >= ChargementDonnees.SEUIL_NOTE, notes_connues, 0)
+        notes_films, inverse = np.unique(ids[connus], return_inverse=True)
+        poids = np.bincount(inverse, weights=aimees) / ChargementDonnees.SEUIL_NOTE
+        graines = poids > 0
+        if not graines.any():
+            return notes_films, None
+        return notes_films, self.recommandeur.scores(notes_films[graines], poids[graines].astype(np.float32))
+
+    def _recommander_hybride(self, movie_ids, notes, graines, scores_moteur, n, poids_contenu, genres=0):
+        contenu = self.contenu
+        positions_graphe = self.positions_contenu
+
+        moteur = np.zeros(len(contenu), dtype=np.float32)
+        if scores_moteur is not None:
+            dans_catalogue = positions_graphe >= 0
+            moteur[positions_graphe[dans_catalogue]] = scores_moteur[dans_catalogue]
+
+        positions = contenu.positions(movie_ids)
+        connues = positions >= 0
+        # Profil de contenu des seuls films aimés, comme les graines du moteur
+        aimees = connues & (notes >= ChargementDonnees.SEUIL_NOTE)
+        similarites = contenu.scores(positions[aimees], notes[aimees]) if aimees.any() else moteur * 0
+        scores = (1 - poids_contenu) * _ramener_a_un(moteur) + poids_contenu * _ramener_a_un(similarites)
+
+        exclure = np.zeros(len(contenu), dtype=bool) if not genres else ~avec_genres(contenu.genres, genres)
+        exclure[positions[connues]] = True
+        exclure[positions_graphe[graines][positions_graphe[graines] >= 0]] = True
+        indices, valeurs = top_k_colonnes(scores, n, exclure=exclure)
+        gardes = np.isfinite(valeurs) & (valeurs > 0)
+        return contenu.ids[indices[gardes]], valeurs[gardes]
+
+    def transition_effective(self):
+        """Matrice de transition avec les ajouts en ligne (la matrice de base s'il n'y en a pas)."""
+        if self.surcouche is None:
+            return self.matrice_transition
+        return self.surcouche.appliquer(self.matrice_transition)
+
+    def rafraichir(self, maintenant=None):
+        """Vieillit les co-occurrences jusqu'à ``maintenant`` (secondes Unix) sans réécrire la matrice.
+
+        Avec une demi-vie, les poids sont exprimés à la date ``meta['reference']``.
+        Les vieillir de Δ jours les multiplie tous par 2^(-Δ/h) : les lignes de
+        transition, normalisées, n'en dépendent pas, seules les sommes brutes des
+        lignes (et les comptes de la surcouche) sont mises à l'échelle. Une
+        co-occurrence ajoutée ensuite pèse 1.
+        Retourne le facteur appliqué (1 sans demi-vie).
+        """
+        demi_vie = self.meta.get('demi_vie_jours')
+        if demi_vie is None or self.sommes_lignes is None:
+            return 1.0
+        maintenant = int(time.time() if maintenant is None else maintenant)
+        ecart = (maintenant - self.meta['reference']) / SECONDES_PAR_JOUR
+        if ecart <= 0:
+            return 1.0
+        facteur = float(np.exp2(-ecart / demi_vie))
+        sommes = np.asarray(self.sommes_lignes, dtype=np.float32) * np.float32(facteur)
+        if self.surcouche is not None:
+            self.surcouche = self.surcouche.mise_a_l_echelle(facteur, sommes)
+        self.sommes_lignes = sommes
+        self.meta['reference'] = maintenant
+        return facteur
+
+    def appliquer_cooccurrences(self, lignes, colonnes, poids=None):
+        """Ajoute des co-occurrences (id_film, id_film) à la surcouche de la matrice de transition.
+
+        La matrice de base (mmap partagée) n'est pas modifiée : la nouvelle
+        surcouche est construite à part puis échangée d'un coup, et les requêtes
+        en cours gardent une surcouche cohérente. Elle ne vit que dans ce
+        processus ; ``build_reco_model`` intègre les notes du site au graphe
+        reconstruit, qui repart sans surcouche. Avec une demi-vie, les
+        poids existants sont d'abord vieillis jusqu'à maintenant (``rafraichir``) ;
+        une fenêtre glissante n'écarte en revanche les notes sorties de la
+        fenêtre qu'à la prochaine reconstruction.
+        """
+        if self.sommes_lignes is None:
+            raise ValueError("Artefact sans sommes de lignes : reconstruire le modèle")
+        self.rafraichir()
+        lignes = np.asarray(lignes, dtype=np.int64)
+        colonnes = np.asarray(colonnes, dtype=np.int64)
+        if poids is None:
+            poids = np.ones(len(lignes), dtype=np.float32)
+        deltas = sp.csr_matrix((np.asarray(poids, dtype=np.float32), (lignes, colonnes)),
+                               shape=self.matrice_transition.shape)
+        surcouche, sommes = appliquer_deltas(self.surcouche, self.sommes_lignes, deltas)
+        self.surcouche, self.sommes_lignes = surcouche, sommes
+        self.revision += 1
+
+    # ---------- Construction ----------
+
+    @classmethod
+    def construire(cls, chemin_donnees="data/ml-latest-small", top_k=None, nb_processus=1, backend=None,
+                   demi_vie_jours=None, fenetre_jours=None, evaluations_site=None):
+        """Charge les données puis construit le moteur ``backend`` (défaut : ``RECO_BACKEND``).
+
+        ``demi_vie_jours`` et ``fenetre_jours`` (défaut : ``RECO_DEMI_VIE_JOURS``,
+        ``RECO_FENETRE_JOURS``) pondèrent les co-occurrences de la marche par
+        l'âge des notes ; le moteur ALS n'en tient pas compte.
+        ``evaluations_site`` (colonnes de ratings.csv, un ``userId`` par profil)
+        s'ajoute aux évaluations du dossier : les notes reçues par le site,
+        appliquées en ligne depuis la dernière construction, entrent ainsi
+        dans le graphe reconstruit.
+        """
+        backend = backend or getattr(settings, 'RECO_BACKEND', 'marche')
+        if backend not in BACKENDS:
+            raise ValueError(f"Moteur inconnu : {backend} (choisir parmi {', '.join(BACKENDS)})")
+        if demi_vie_jours is None:
+            demi_vie_jours = getattr(settings, 'RECO_DEMI_VIE_JOURS', None)
+        if fenetre_jours is None:
+            fenetre_jours = getattr(settings, 'RECO_FENETRE_JOURS', None)
+        temporel = backend == 'marche' and (demi_vie_jours is not None or fenetre_jours is not None)
+        chargement = ChargementDonnees(horodatage=temporel)
+        if not chargement.charger_movielens(chemin_donnees):
+            return None
+        if evaluations_site is not None and len(evaluations_site):
+            chargement.ajouter_evaluations(evaluations_site)
+
+        options_temps = {'demi_vie_jours': demi_vie_jours, 'fenetre_jours': fenetre_jours} if temporel else {}
+        graphe = ConstructionGraphe(chargement.evaluations, top_k=top_k, nb_processus=nb_processus, **options_temps)
+        recommandeur = None
+        if backend == 'als':
+            # Pas de co-occurrences : seule la matrice d'incidence est nécessaire
+            recommandeur = FactorisationALS.entrainer(
+                graphe.matrice_incidence(),
+                nb_facteurs=getattr(settings, 'RECO_ALS_FACTEURS', 64),
+                iterations=getattr(settings, 'RECO_ALS_ITERATIONS', 10),
+                regularisation=getattr(settings, 'RECO_ALS_REGULARISATION', 0.1),
+                alpha=getattr(settings, 'RECO_ALS_ALPHA', 10.0),
+            )
+        else:
+            graphe.construire_matrice_transition()
+        return cls.depuis_graphe(chargement, graphe, chemin_donnees, recommandeur=recommandeur)
+
+    @classmethod
+    def depuis_graphe(cls, chargement, graphe, chemin_donnees="data/ml-latest-small", recommandeur=None):
+        """Assemble le modèle à partir de données chargées et d'un graphe déjà construit."""
+        evaluations = chargement.evaluations
+        colonnes = {
+            'userId': evaluations['userId'].to_numpy(dtype=np.int32),
+            'movieId': evaluations['movieId'].to_numpy(dtype=np.int32),
+            'rating': evaluations['rating'].to_numpy(dtype=np.float32),
+            'id_utilisateur': evaluations['id_utilisateur'].to_numpy(dtype=np.int32),
+            'id_film': evaluations['id_film'].to_numpy(dtype=np.int32),
+        }
+        ids_films = np.asarray(pd.Categorical(evaluations['movieId']).categories, dtype=np.int32)
+        version = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        meta = {'chemin_donnees': chemin_donnees, 'top_k': graphe.top_k}
+        if graphe.temporel:
+            meta.update(demi_vie_jours=graphe.demi_vie_jours, fenetre_jours=graphe.fenetre_jours,
+                        reference=graphe.reference)
+        contenu = None
+        if chargement.films is not None:
+            contenu = CaracteristiquesContenu.construire(ChargementDonnees.resoudre_chemin(chemin_donnees),
+                                                         films=chargement.films)
+        return cls(colonnes, ids_films, graphe.matrice_transition, version, films=chargement.films, meta=meta,
+                   sommes_lignes=graphe.sommes_lignes, contenu=contenu, recommandeur=recommandeur)
+
+    # ---------- Sauvegarde / chargement ----------
+
+    def sauvegarder(self, racine=None):
+        """Écrit l'artefact dans un dossier temporaire puis le publie atomiquement."""
+        racine = Path(racine or dossier_modele_par_defaut())
+        racine.mkdir(parents=True, exist_ok=True)
+        destination = racine / self.version
+        temporaire = Path(tempfile.mkdtemp(prefix=f'.{self.version}-', dir=racine))
+
+        try:
+            for nom in COLONNES_EVALUATIONS:
+                np.save(temporaire / f'evaluations_{nom}.npy', self.colonnes[nom])
+            np.save(temporaire / 'ids_films.npy', self.ids_films)
+
+            manifeste = dict(self.meta, format=FORMAT_ARTEFACT, version=self.version,
+                             nb_films=int(self.nb_films), backend=self.backend)
+            if self.backend == 'als':
+                als = self.recommandeur
+                np.save(temporaire / 'als_facteurs.npy', np.asarray(als.facteurs_films, dtype=np.float32))
+                manifeste.update(als_regularisation=als.regularisation, als_alpha=als.alpha)
+            else:
+                matrice = self.transition_effective()
+                if not sp.issparse(matrice):
+                    matrice = sp.csr_matrix(matrice)
+                matrice = matrice.tocsr()
+                np.save(temporaire / 'transition_data.npy', matrice.data.astype(np.float32))
+                # Même type pour indices et indptr : scipy n'a pas à les recopier au chargement
+                type_index = np.int32 if matrice.nnz < np.iinfo(np.int32).max else np.int64
+                np.save(temporaire / 'transition_indices.npy', matrice.indices.astype(type_index))
+                np.save(temporaire / 'transition_indptr.npy', matrice.indptr.astype(type_index))
+                if self.sommes_lignes is not None:
+                    np.save(temporaire / 'transition_sommes.npy', np.asarray(self.sommes_lignes, dtype=np.float32))
+                manifeste['nnz'] = int(matrice.nnz)
+
+            if self._voisins is not None:
+                self._voisins.sauvegarder(temporaire)
+                manifeste.update(voisins_k=self._voisins.k, similarite=self._voisins.mesure)
+            if self.contenu is not None:
+                manifeste['contenu_termes'] = self.contenu.sauvegarder(temporaire)
+            (temporaire / 'manifeste.json').write_text(json.dumps(manifeste, indent=2))
+
+            if destination.exists():
+                shutil.rmtree(destination)
+            os.replace(temporaire, destination)
+            self.dossier = destination
+        except Exception:
+            shutil.rmtree(temporaire, ignore_errors=True)
+            raise
+
+        courant_tmp = racine / f'.{FICHIER_COURANT}.tmp'
+        courant_tmp.write_text(self.version)
+        os.replace(courant_tmp, racine / FICHIER_COURANT)
+        return destination
+
+    @classmethod
+    def charger(cls, racine=None, version=None, mmap_mode='r'):
+        """Ouvre la version demandée (ou la version courante) en mémoire partagée."""
+        racine = Path(racine or dossier_modele_par_defaut())
+        if version is None:
+            fichier_courant = racine / FICHIER_COURANT
+            if not fichier_courant.exists():
+                return None
+            version = fichier_courant.read_text().strip()
+
+        dossier = racine / version
+        manifeste = json.loads((dossier / 'manifeste.json').read_text())
+        if manifeste.get('format') != FORMAT_ARTEFACT:
+            raise ValueError(f"Format d'artefact non supporté : {manifeste.get('format')}")
+
+        def ouvrir(nom):
+            return np.load(dossier / f'{nom}.npy', mmap_mode=mmap_mode)
+
+        colonnes = {nom: ouvrir(f'evaluations_{nom}') for nom in COLONNES_EVALUATIONS}
+        nb_films = manifeste['nb_films']
+        matrice = sommes = recommandeur = None
+        if manifeste.get('backend', 'marche') == 'als':
+            recommandeur = FactorisationALS(ouvrir('als_facteurs'), manifeste['als_regularisation'],
+                                            manifeste['als_alpha'])
+        else:
+            matrice = sp.csr_matrix(
+                (ouvrir('transition_data'), ouvrir('transition_indices'), ouvrir('transition_indptr')),
+                shape=(nb_films, nb_films), copy=False,
+            )
+            sommes = ouvrir('transition_sommes') if (dossier / 'transition_sommes.npy').exists() else None
+        voisins = IndexVoisins.charger(dossier, manifeste.get('similarite'), mmap_mode=mmap_mode)
+        contenu = None
+        if 'contenu_termes' in manifeste:
+            contenu = CaracteristiquesContenu.charger(dossier, manifeste['contenu_termes'], mmap_mode=mmap_mode)
+        return cls(colonnes, ouvrir('ids_films'), matrice, manifeste['version'], meta=manifeste, dossier=dossier,
+                   sommes_lignes=sommes, voisins=voisins, contenu=contenu, recommandeur=recommandeur)
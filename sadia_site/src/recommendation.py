@@ -1,38 +1,136 @@
+import logging
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
 import numpy as np
 import pandas as pd
-from itertools import combinations
-from collections import Counter
+import scipy.sparse as sp
 from django.conf import settings
 from pathlib import Path
 
+from sadia_site.src.metriques import span
+
+logger = logging.getLogger(__name__)
+
+SECONDES_PAR_JOUR = 86400
+
 
 # --------------------------------------------
 # 1. Chargement et nettoyage des données
 # --------------------------------------------
 
 class ChargementDonnees:
-    def __init__(self):
+    """Charge ratings.csv et movies.csv d'un dossier MovieLens.
+
+    ratings.csv est lu par blocs avec des types compacts (identifiants int32,
+    notes float32) ; la colonne ``timestamp`` (uint32) n'est lue qu'avec
+    ``horodatage=True``, pour la pondération temporelle du graphe. Seules les
+    notes >= 4 sont gardées au fil de la lecture. Le résultat est mis en cache
+    en colonnes .npy (``.cache/`` dans le dossier des données), invalidé si le
+    CSV change : les démarrages suivants ne relisent plus le CSV.
+    """
+
+    SEUIL_NOTE = 4.0
+    TYPES_EVALUATIONS = {'userId': np.int32, 'movieId': np.int32, 'rating': np.float32}
+
+    def __init__(self, taille_bloc=1_000_000, cache=True, horodatage=False):
         self.evaluations = None
         self.films = None
+        self.taille_bloc = taille_bloc
+        self.cache = cache
+        self.horodatage = horodatage
+
+    @staticmethod
+    def resoudre_chemin(chemin_donnees):
+        chemin = Path(chemin_donnees)
+        return chemin if chemin.is_absolute() else Path(settings.BASE_DIR) / chemin
 
     def charger_movielens(self, chemin_donnees="data/ml-latest-small"):
+        dossier = self.resoudre_chemin(chemin_donnees)
         try:
-            self.evaluations = pd.read_csv(Path(settings.BASE_DIR) / 'data' / 'ml-latest-small' / 'ratings.csv')
-            self.films = pd.read_csv(Path(settings.BASE_DIR) / 'data' / 'ml-latest-small' / 'movies.csv')
+            self.evaluations = self._charger_evaluations(dossier / 'ratings.csv')
+            self.films = pd.read_csv(dossier / 'movies.csv')
             self._nettoyer_donnees()
         except FileNotFoundError:
-            print("Fichiers non trouvés")
+            logger.warning("Fichiers MovieLens non trouvés dans %s", dossier)
             return False
         return True
 
-    def _nettoyer_donnees(self):
-        self.evaluations = self.evaluations[self.evaluations['rating'] >= 4.0].copy()
-        self.evaluations['id_utilisateur'] = pd.Categorical(self.evaluations['userId']).codes
-        self.evaluations['id_film'] = pd.Categorical(self.evaluations['movieId']).codes
+    def ajouter_evaluations(self, evaluations):
+        """Ajoute des évaluations (colonnes de ratings.csv) à celles déjà chargées et recalcule les codes.
 
+        Les ``userId`` ajoutés sont décalés au-delà du plus grand ``userId``
+        chargé : ils ne se confondent jamais avec ceux de MovieLens.
+        """
+        colonnes = [c for c in self.evaluations.columns if c not in ('id_utilisateur', 'id_film')]
+        ajout = evaluations[colonnes].astype(self.evaluations[colonnes].dtypes.to_dict())
+        decalage = int(self.evaluations['userId'].max()) + 1 if len(self.evaluations) else 0
+        ajout['userId'] += np.int32(decalage)
+        self.evaluations = pd.concat([self.evaluations[colonnes], ajout], ignore_index=True)
+        self._nettoyer_donnees()
 
-chargement = ChargementDonnees()
-chargement.charger_movielens()
+    def _charger_evaluations(self, chemin):
+        stat = chemin.stat()
+        suffixe = '-t' if self.horodatage else ''
+        dossier_cache = (chemin.parent / '.cache'
+                         / f'ratings-{stat.st_size}-{stat.st_mtime_ns}-{self.SEUIL_NOTE}{suffixe}')
+        if self.cache and dossier_cache.is_dir():
+            colonnes = {
+                'userId': np.load(dossier_cache / 'userId.npy'),
+                'movieId': np.load(dossier_cache / 'movieId.npy'),
+                # Notes stockées en demi-étoiles sur un octet
+                'rating': np.load(dossier_cache / 'demi_etoiles.npy').astype(np.float32) / 2,
+            }
+            if self.horodatage:
+                colonnes['timestamp'] = np.load(dossier_cache / 'timestamp.npy')
+            return pd.DataFrame(colonnes)
+
+        types = dict(self.TYPES_EVALUATIONS)
+        if self.horodatage:
+            types['timestamp'] = np.uint32
+        blocs = []
+        for bloc in pd.read_csv(chemin, usecols=list(types), dtype=types, chunksize=self.taille_bloc):
+            blocs.append(bloc[bloc['rating'].to_numpy() >= self.SEUIL_NOTE])
+        evaluations = (pd.concat(blocs, ignore_index=True) if blocs
+                       else pd.DataFrame({c: pd.Series(dtype=t) for c, t in types.items()}))
+
+        if self.cache:
+            self._ecrire_cache(dossier_cache, evaluations)
+        return evaluations
+
+    @staticmethod
+    def _ecrire_cache(dossier_cache, evaluations):
+        temporaire = None
+        try:
+            dossier_cache.parent.mkdir(parents=True, exist_ok=True)
+            temporaire = Path(tempfile.mkdtemp(prefix=dossier_cache.name + '.', dir=dossier_cache.parent))
+            np.save(temporaire / 'userId.npy', evaluations['userId'].to_numpy(dtype=np.int32))
+            np.save(temporaire / 'movieId.npy', evaluations['movieId'].to_numpy(dtype=np.int32))
+            np.save(temporaire / 'demi_etoiles.npy', np.round(evaluations['rating'].to_numpy() * 2).astype(np.uint8))
+            if 'timestamp' in evaluations:
+                np.save(temporaire / 'timestamp.npy', evaluations['timestamp'].to_numpy(dtype=np.uint32))
+            os.replace(temporaire, dossier_cache)
+        except OSError as e:
+            # Cache facultatif : un dossier en lecture seule ne doit pas empêcher le chargement
+            logger.warning("Cache des évaluations non écrit : %s", e)
+            if temporaire is not None:
+                shutil.rmtree(temporaire, ignore_errors=True)
+
+    def _nettoyer_donnees(self):
+        evaluations = self.evaluations
+        garder = evaluations['rating'].to_numpy() >= self.SEUIL_NOTE
+        if not garder.all():
+            evaluations = evaluations[garder].reset_index(drop=True)
+        # Codes denses triés par identifiant (comme pd.Categorical), en int32
+        _, codes_utilisateurs = np.unique(evaluations['userId'].to_numpy(), return_inverse=True)
+        _, codes_films = np.unique(evaluations['movieId'].to_numpy(), return_inverse=True)
+        evaluations['id_utilisateur'] = codes_utilisateurs.astype(np.int32)
+        evaluations['id_film'] = codes_films.astype(np.int32)
+        self.evaluations = evaluations
 
 
 # --------------------------------------------
@@ -40,71 +138,428 @@ chargement.charger_movielens()
 # --------------------------------------------
 
 class ConstructionGraphe:
-    def __init__(self, evaluations):
+    """Construit la matrice de transition film -> film à partir des co-occurrences.
+
+    Par défaut la matrice est creuse (CSR) : les co-occurrences sont obtenues par
+    le produit ``Bᵀ·B`` de la matrice d'incidence utilisateur × film. ``top_k``
+    ne conserve que les K voisins les plus fréquents de chaque film, ce qui rend
+    la mémoire à peu près linéaire en la taille du catalogue.
+    Les lignes sans co-occurrence restent vides : la marche aléatoire répartit
+    leur masse uniformément, ce qui équivaut à la ligne ``1/nb_films`` dense.
+    Avec ``nb_processus`` > 1, les utilisateurs sont répartis entre plusieurs
+    processus qui calculent chacun une matrice partielle, ensuite sommée.
+
+    Pondération temporelle (colonne ``timestamp`` requise) : avec
+    ``demi_vie_jours`` h, une évaluation d'âge a jours pèse 2^(-a / 2h), de sorte
+    qu'une co-occurrence pèse 2^(-(a_i + a_j) / 2h) — la demi-vie s'applique à
+    l'âge moyen des deux notes et le produit ``Bᵀ·B`` reste valable. Avec
+    ``fenetre_jours``, les évaluations plus anciennes ne comptent pas. Les âges
+    sont mesurés depuis ``reference`` (défaut : la note la plus récente), date à
+    laquelle les poids sont exprimés.
+    """
+
+    def __init__(self, evaluations, creuse=True, top_k=None, nb_processus=1, demi_vie_jours=None,
+                 fenetre_jours=None, reference=None):
         self.evaluations = evaluations
         self.nb_utilisateurs = evaluations['id_utilisateur'].max() + 1
         self.nb_films = evaluations['id_film'].max() + 1
+        self.creuse = creuse
+        self.top_k = top_k
+        self.nb_processus = nb_processus
+        self.demi_vie_jours = demi_vie_jours
+        self.fenetre_jours = fenetre_jours
+        self.reference = reference
+        if self.temporel:
+            if 'timestamp' not in evaluations:
+                raise ValueError("Pondération temporelle : colonne timestamp absente des évaluations")
+            if self.reference is None:
+                self.reference = int(evaluations['timestamp'].max()) if len(evaluations) else 0
         self.matrice_transition = None
+        self.sommes_lignes = None
 
-    def construire_matrice_transition(self):
-        cooccurrences = Counter()
+    @property
+    def temporel(self):
+        return self.demi_vie_jours is not None or self.fenetre_jours is not None
 
-        for _, group in self.evaluations.groupby('id_utilisateur'):
-            films = group['id_film'].values
-            for i, j in combinations(films, 2):
-                cooccurrences[(i, j)] += 1
-                cooccurrences[(j, i)] += 1  # rendre symétrique
+    def poids_evaluations(self):
+        """Poids (float32) de chaque évaluation dans les co-occurrences ; None sans pondération temporelle."""
+        if not self.temporel:
+            return None
+        ages = (self.reference - self.evaluations['timestamp'].to_numpy(dtype=np.float64)) / SECONDES_PAR_JOUR
+        ages = np.maximum(ages, 0)
+        poids = np.ones(len(ages), dtype=np.float32)
+        if self.demi_vie_jours is not None:
+            poids = np.exp2(-ages / (2 * self.demi_vie_jours)).astype(np.float32)
+        if self.fenetre_jours is not None:
+            poids[ages > self.fenetre_jours] = 0
+        return poids
 
-        similarite_films = np.zeros((self.nb_films, self.nb_films), dtype=np.float32)
-        for (i, j), count in cooccurrences.items():
-            similarite_films[i, j] = count
+    def matrice_incidence(self):
+        """Matrice utilisateur × film (CSR) avec un 1 pour chaque film aimé."""
+        return _incidence(self.evaluations['id_utilisateur'].to_numpy(dtype=np.int32),
+                          self.evaluations['id_film'].to_numpy(dtype=np.int32),
+                          self.nb_utilisateurs, self.nb_films)
 
-        # Normalisation ligne par ligne
-        somme_lignes = similarite_films.sum(axis=1, keepdims=True)
-        with np.errstate(divide='ignore', invalid='ignore'):
-            self.matrice_transition = np.divide(similarite_films, somme_lignes, where=somme_lignes != 0)
-            self.matrice_transition[somme_lignes[:, 0] == 0] = 1.0 / self.nb_films
+    def construire_cooccurrences(self):
+        """Comptes (ou poids) de co-occurrence symétriques, diagonale exclue (CSR float32)."""
+        if self.nb_processus > 1:
+            cooccurrences = self._cooccurrences_paralleles()
+        else:
+            cooccurrences = _cooccurrences(_incidence(self.evaluations['id_utilisateur'].to_numpy(dtype=np.int32),
+                                                      self.evaluations['id_film'].to_numpy(dtype=np.int32),
+                                                      self.nb_utilisateurs, self.nb_films,
+                                                      self.poids_evaluations()))
+        if self.top_k is not None:
+            cooccurrences = elaguer_top_k(cooccurrences, self.top_k)
+        return cooccurrences
+
+    @span('reco.construction_graphe')
+    def construire_matrice_transition(self):
+        cooccurrences = self.construire_cooccurrences()
+        # Sommes brutes des lignes : permettent de renormaliser une ligne sans tout reconstruire
+        self.sommes_lignes = np.asarray(cooccurrences.sum(axis=1), dtype=np.float32).ravel()
+        transition = normaliser_lignes(cooccurrences)
+
+        if self.creuse:
+            self.matrice_transition = transition
+        else:
+            self.matrice_transition = transition.toarray()
+            lignes_vides = np.diff(transition.indptr) == 0
+            self.matrice_transition[lignes_vides] = 1.0 / self.nb_films
 
         return self.matrice_transition
 
+    def _cooccurrences_paralleles(self, lots_par_processus=2):
+        """Répartit les utilisateurs en lots de coût ~égal (Σ nᵤ²) entre plusieurs processus.
+
+        Les couples (utilisateur, film), triés par utilisateur, sont copiés une
+        fois dans une mémoire partagée (suivis de leurs poids s'il y a une
+        pondération temporelle) : chaque processus lit sa tranche sans que les
+        tableaux soient sérialisés, et ne renvoie que sa matrice partielle.
+        """
+        utilisateurs = self.evaluations['id_utilisateur'].to_numpy(dtype=np.int32)
+        ordre = np.argsort(utilisateurs, kind='stable')
+        nb_lignes = len(ordre)
+        poids = self.poids_evaluations()
+        ponderee = poids is not None
+
+        memoire = shared_memory.SharedMemory(create=True, size=max((3 if ponderee else 2) * nb_lignes * 4, 1))
+        try:
+            couples = np.ndarray((2, nb_lignes), dtype=np.int32, buffer=memoire.buf)
+            couples[0] = utilisateurs[ordre]
+            couples[1] = self.evaluations['id_film'].to_numpy(dtype=np.int32)[ordre]
+            if ponderee:
+                np.ndarray(nb_lignes, dtype=np.float32, buffer=memoire.buf, offset=2 * nb_lignes * 4)[:] = poids[ordre]
+
+            # Bornes des tranches : coupures aux frontières d'utilisateurs
+            nb_par_utilisateur = np.bincount(couples[0], minlength=self.nb_utilisateurs)
+            cout = np.cumsum(nb_par_utilisateur.astype(np.float64) ** 2)
+            nb_lots = self.nb_processus * lots_par_processus
+            coupures = np.searchsorted(cout, np.linspace(0, cout[-1], nb_lots + 1)[1:-1], side='right')
+            debuts_utilisateurs = np.concatenate(([0], np.cumsum(nb_par_utilisateur)))
+            bornes = np.unique(np.concatenate(([0], debuts_utilisateurs[coupures], [nb_lignes])))
+            del couples
+
+            with ProcessPoolExecutor(max_workers=self.nb_processus) as executeur:
+                taches = [
+                    executeur.submit(_cooccurrences_partielles, memoire.name, nb_lignes,
+                                     int(debut), int(fin), self.nb_films, ponderee)
+                    for debut, fin in zip(bornes[:-1], bornes[1:]) if fin > debut
+                ]
+                partielles = [tache.result().tocoo() for tache in as_completed(taches)]
+        finally:
+            memoire.close()
+            memoire.unlink()
+
+        # Réduction en une passe : les doublons (i, j) des matrices partielles sont sommés
+        return sp.csr_matrix(
+            (np.concatenate([p.data for p in partielles]),
+             (np.concatenate([p.row for p in partielles]), np.concatenate([p.col for p in partielles]))),
+            shape=(self.nb_films, self.nb_films), dtype=np.float32,
+        )
+
+
+def _incidence(utilisateurs, films, nb_utilisateurs, nb_films, poids=None):
+    if poids is None:
+        valeurs = np.ones(len(utilisateurs), dtype=np.float32)
+        incidence = sp.csr_matrix((valeurs, (utilisateurs, films)), shape=(nb_utilisateurs, nb_films))
+        # Un même couple (utilisateur, film) ne compte qu'une fois
+        incidence.data[:] = 1.0
+        return incidence
+
+    # Pondérée : hors fenêtre écartées, et pour un couple répété, seul le poids le plus récent (le plus fort)
+    gardes = poids > 0
+    utilisateurs, films, poids = utilisateurs[gardes], films[gardes], poids[gardes]
+    cles = utilisateurs.astype(np.int64) * nb_films + films
+    ordre = np.lexsort((-poids, cles))
+    premiers = ordre[np.concatenate(([True], cles[ordre][1:] != cles[ordre][:-1]))] if len(ordre) else ordre
+    return sp.csr_matrix((poids[premiers].astype(np.float32), (utilisateurs[premiers], films[premiers])),
+                         shape=(nb_utilisateurs, nb_films))
+
+
+def _cooccurrences(incidence):
+    cooccurrences = (incidence.T @ incidence).tocsr()
+    cooccurrences.setdiag(0)
+    cooccurrences.eliminate_zeros()
+    return cooccurrences
+
+
+def _cooccurrences_partielles(nom_memoire, nb_lignes, debut, fin, nb_films, ponderee=False):
+    """Exécuté dans un processus fils : co-occurrences des lignes ``[debut, fin)``."""
+    memoire = shared_memory.SharedMemory(name=nom_memoire)
+    try:
+        couples = np.ndarray((2, nb_lignes), dtype=np.int32, buffer=memoire.buf)
+        utilisateurs = couples[0, debut:fin] - couples[0, debut]
+        films = couples[1, debut:fin].copy()
+        del couples
+        poids = None
+        if ponderee:
+            poids = np.ndarray(nb_lignes, dtype=np.float32, buffer=memoire.buf, offset=2 * nb_lignes * 4)
+            poids = poids[debut:fin].copy()
+        return _cooccurrences(_incidence(utilisateurs, films, int(utilisateurs[-1]) + 1, nb_films, poids))
+    finally:
+        memoire.close()
+
+
+def elaguer_top_k(matrice, k):
+    """Ne garde que les ``k`` plus grandes valeurs de chaque ligne d'une matrice CSR."""
+    matrice = matrice.tocsr()
+    nb_par_ligne = np.diff(matrice.indptr)
+    if nb_par_ligne.max(initial=0) <= k:
+        return matrice
+
+    lignes = np.repeat(np.arange(matrice.shape[0], dtype=np.int64), nb_par_ligne)
+    # Tri par ligne puis par valeur décroissante, rang de chaque entrée dans sa ligne
+    ordre = np.lexsort((-matrice.data, lignes))
+    rangs = np.arange(len(ordre)) - np.repeat(matrice.indptr[:-1], nb_par_ligne)
+    gardes = np.sort(ordre[rangs < k])
+
+    elaguee = sp.csr_matrix(
+        (matrice.data[gardes], matrice.indices[gardes],
+         np.concatenate(([0], np.cumsum(np.minimum(nb_par_ligne, k))))),
+        shape=matrice.shape,
+    )
+    return elaguee
+
+
+def normaliser_lignes(matrice):
+    """Divise chaque ligne d'une matrice CSR par sa somme (lignes nulles laissées vides)."""
+    matrice = matrice.tocsr().astype(np.float32)
+    sommes = np.asarray(matrice.sum(axis=1), dtype=np.float32).ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverses = np.where(sommes != 0, 1.0 / sommes, 0.0).astype(np.float32)
+    matrice.data *= np.repeat(inverses, np.diff(matrice.indptr))
+    return matrice
+
+
+class SurcoucheTransition:
+    """Co-occurrences ajoutées en ligne, appliquées par-dessus une matrice de transition inchangée.
 
-# Construction du graphe
-if chargement.evaluations is not None:
-    construction = ConstructionGraphe(chargement.evaluations)
-    matrice_P = construction.construire_matrice_transition()
+    Avec ``s`` les sommes brutes des lignes (base + ajouts), ``D`` les comptes
+    ajoutés et ``d`` la somme de ses lignes, la matrice effective est
+
+        P' = diag(a)·P + diag(1/s)·D,   a = (s - d) / s
+
+    (``a`` vaut 1 sur les lignes non touchées). La matrice de base, souvent en
+    mémoire partagée (mmap) entre les workers, n'est jamais recopiée : la
+    marche l'applique telle quelle et ajoute la contribution de ``D``, qui ne
+    contient que les ajouts depuis la dernière reconstruction.
+    """
+
+    def __init__(self, deltas, sommes_lignes):
+        self.deltas = deltas.tocsr().astype(np.float32)
+        ajouts = np.asarray(self.deltas.sum(axis=1), dtype=np.float32).ravel()
+        self.lignes = np.flatnonzero(np.diff(self.deltas.indptr))
+        sommes = np.asarray(sommes_lignes, dtype=np.float32)[self.lignes]
+        self.echelle = np.ones(self.deltas.shape[0], dtype=np.float32)
+        self.echelle[self.lignes] = (sommes - ajouts[self.lignes]) / sommes
+        inverses = np.zeros(self.deltas.shape[0], dtype=np.float32)
+        inverses[self.lignes] = 1 / sommes
+        self.normalisee = (sp.diags(inverses) @ self.deltas).tocsr()
+
+    def mise_a_l_echelle(self, facteur, sommes_lignes):
+        """Même surcouche, comptes multipliés par ``facteur`` (vieillissement, voir ``rafraichir``)."""
+        return SurcoucheTransition(self.deltas * np.float32(facteur), sommes_lignes)
+
+    def appliquer(self, matrice_transition):
+        """Matrice effective P' en CSR (sauvegarde de l'artefact, tests) ; O(nnz)."""
+        effective = (sp.diags(self.echelle) @ matrice_transition).tocsr() + self.normalisee
+        effective = effective.tocsr().astype(np.float32)
+        effective.eliminate_zeros()
+        return effective
+
+
+def appliquer_deltas(surcouche, sommes_lignes, deltas):
+    """Ajoute des co-occurrences à la surcouche d'une matrice de transition déjà normalisée.
+
+    ``deltas`` est une matrice creuse (films × films) de comptes à ajouter ;
+    ``surcouche`` vaut None avant le premier ajout. Seules les sommes des
+    lignes et la surcouche sont recalculées : O(films + ajouts cumulés), sans
+    toucher la matrice de base.
+    Retourne ``(nouvelle_surcouche, nouvelles_sommes)`` sans modifier les entrées.
+    """
+    deltas = deltas.tocsr().astype(np.float32)
+    if deltas.nnz == 0:
+        return surcouche, sommes_lignes
+
+    sommes = np.array(sommes_lignes, dtype=np.float32)
+    sommes += np.asarray(deltas.sum(axis=1), dtype=np.float32).ravel()
+    if surcouche is not None:
+        deltas = surcouche.deltas + deltas
+    return SurcoucheTransition(deltas, sommes), sommes
 
 
 # --------------------------------------------
 # 3. Recommandation par marche aléatoire (optimisée)
 # --------------------------------------------
 
-class RecommandationMarcheAleatoire:
-    def __init__(self, matrice_transition):
+class Recommandeur(ABC):
+    """Interface commune des moteurs de recommandation, en identifiants internes (id_film).
+
+    ``RECO_BACKEND`` choisit le moteur à la construction du modèle : la marche
+    aléatoire (``'marche'``) ou la factorisation ALS (``'als'``).
+    """
+
+    nom = None
+
+    @abstractmethod
+    def scores(self, graines, poids):
+        """Score de chaque film pour un ensemble de films notés ``graines`` pondérés par ``poids``."""
+
+    @abstractmethod
+    def scores_par_lots(self, graines, **options):
+        """Scores (films × colonnes) pour une matrice de graines ; les options propres aux autres moteurs sont ignorées."""
+
+
+class RecommandationMarcheAleatoire(Recommandeur):
+    """Marche aléatoire sur ``matrice_transition``, corrigée par ``surcouche`` (ajouts en ligne) s'il y en a une."""
+
+    nom = 'marche'
+
+    def __init__(self, matrice_transition, surcouche=None):
         self.matrice_transition = matrice_transition
+        self.surcouche = surcouche
         self.nb_films = matrice_transition.shape[0]
+        # Lignes vides d'une matrice creuse : leur masse est redistribuée uniformément
+        if sp.issparse(matrice_transition):
+            self.lignes_vides = np.diff(matrice_transition.tocsr().indptr) == 0
+            if surcouche is not None:
+                self.lignes_vides[surcouche.lignes] = False
+        else:
+            self.lignes_vides = None
+
+    def _propager(self, scores):
+        """Un pas de marche : ``P'ᵀ·scores`` pour un vecteur ou une matrice (films × colonnes)."""
+        if self.surcouche is None:
+            nouveaux_scores = np.asarray(self.matrice_transition.T @ scores)  # Vectorisé
+        else:
+            echelle = self.surcouche.echelle if scores.ndim == 1 else self.surcouche.echelle[:, None]
+            nouveaux_scores = (np.asarray(self.matrice_transition.T @ (echelle * scores))
+                               + np.asarray(self.surcouche.normalisee.T @ scores))
+        if self.lignes_vides is not None and self.lignes_vides.any():
+            nouveaux_scores = nouveaux_scores + scores[self.lignes_vides].sum(axis=0) / self.nb_films
+        return nouveaux_scores.reshape(scores.shape)
+
+    def scores(self, graines, poids):
+        """Un pas de marche depuis les graines : somme des lignes de transition pondérées."""
+        poids = np.asarray(poids, dtype=np.float32)
+        if self.surcouche is None:
+            return np.asarray(poids @ self.matrice_transition[graines], dtype=np.float32).ravel()
+        scores = (poids * self.surcouche.echelle[graines]) @ self.matrice_transition[graines]
+        scores = scores + poids @ self.surcouche.normalisee[graines]
+        return np.asarray(scores, dtype=np.float32).ravel()
+
+    def scores_par_lots(self, graines, alpha=0.15, iterations_max=100, **options):
+        return self.marche_aleatoire_par_lots(graines, alpha=alpha, iterations_max=iterations_max)
 
     def marche_aleatoire_naive(self, films_depart, iterations_max=1000):
         scores = np.zeros(self.nb_films)
         for film in films_depart:
             scores[film] = 1 / len(films_depart)
 
-        for iteration in range(iterations_max):
-            nouveaux_scores = self.matrice_transition.T @ scores  # Vectorisé
+        for _ in range(iterations_max):
+            nouveaux_scores = self._propager(scores)
             changement = np.sum(np.abs(nouveaux_scores - scores))
             scores = nouveaux_scores
 
-            if iteration % 100 == 0:
-                top_films = np.argsort(scores)[-3:][::-1]
-
             if changement < 1e-8:
-                print(f"✓ Convergence à l'itération {iteration}")
                 break
 
         return scores
 
+    @span('reco.marche_par_lots')
+    def marche_aleatoire_par_lots(self, graines, alpha=0.15, iterations_max=100, tolerance=1e-6):
+        """PageRank personnalisé pour plusieurs ensembles de départ à la fois.
+
+        ``graines`` est une matrice (films × colonnes), dense ou creuse, dont chaque
+        colonne décrit un ensemble de départ (par exemple les films aimés d'un
+        utilisateur, éventuellement pondérés). À chaque pas, le marcheur revient à
+        sa distribution de départ avec la probabilité ``alpha`` :
+
+            S ← (1 - alpha)·Pᵀ·S + alpha·G
+
+        Toutes les colonnes avancent ensemble en un seul produit matrice-matrice ;
+        celles qui ont convergé (changement L1 < ``tolerance``) sortent du lot.
+        Retourne la matrice des scores (films × colonnes, float32).
+        """
+        if sp.issparse(graines):
+            graines = graines.toarray()
+        graines = np.asarray(graines, dtype=np.float32)
+        if graines.ndim == 1:
+            graines = graines[:, None]
+
+        sommes = graines.sum(axis=0, keepdims=True)
+        graines = np.divide(graines, sommes, out=np.zeros_like(graines), where=sommes != 0)
+
+        scores = graines.copy()
+        actives = np.flatnonzero(sommes[0] != 0)
+        for _ in range(iterations_max):
+            if len(actives) == 0:
+                break
+            courants = scores[:, actives]
+            nouveaux = (1 - alpha) * self._propager(courants) + alpha * graines[:, actives]
+            changements = np.abs(nouveaux - courants).sum(axis=0)
+            scores[:, actives] = nouveaux
+            actives = actives[changements >= tolerance]
+
+        return scores
+
+
+def top_k_colonnes(scores, k, exclure=None):
+    """Indices et valeurs des ``k`` meilleurs films de chaque colonne, triés par score décroissant.
+
+    ``exclure`` (même forme que ``scores``, booléen ou creux) masque les films à
+    ignorer, typiquement ceux déjà notés. Utilise ``argpartition`` plutôt qu'un tri complet.
+    """
+    scores = np.asarray(scores)
+    if scores.ndim == 1:
+        indices, valeurs = top_k_colonnes(scores[:, None], k,
+                                          None if exclure is None else _en_colonne(exclure))
+        return indices[:, 0], valeurs[:, 0]
+
+    if exclure is not None:
+        if sp.issparse(exclure):
+            exclure = exclure.toarray()
+        scores = np.where(np.asarray(exclure, dtype=bool), -np.inf, scores)
+
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return (np.empty((0, scores.shape[1]), dtype=np.int64),
+                np.empty((0, scores.shape[1]), dtype=scores.dtype))
+    partition = np.argpartition(-scores, k - 1, axis=0)[:k]
+    valeurs = np.take_along_axis(scores, partition, axis=0)
+    ordre = np.argsort(-valeurs, axis=0, kind='stable')
+    return np.take_along_axis(partition, ordre, axis=0), np.take_along_axis(valeurs, ordre, axis=0)
+
+
+def _en_colonne(tableau):
+    if sp.issparse(tableau):
+        tableau = tableau.toarray()
+    return np.asarray(tableau).reshape(-1, 1)
+
 
 # --------------------------------------------
-# 4. Métriques d’évaluation (inchangé)
+# 4. Métriques d’évaluation
 # --------------------------------------------
 
 class MetriquesEvaluation:
@@ -115,3 +570,51 @@ class MetriquesEvaluation:
         films_recommandes_k = films_recommandes[:k]
         bons_films = len(set(films_recommandes_k) & set(films_reels))
         return bons_films / k if k > 0 else 0
+
+    @staticmethod
+    def succes(recommandations, verite):
+        """Matrice booléenne (utilisateurs × K) : le film recommandé est-il dans la vérité terrain ?
+
+        ``recommandations`` contient des id_film (-1 pour une case vide) et
+        ``verite`` est une matrice creuse utilisateurs × films.
+        """
+        recommandations = np.asarray(recommandations)
+        nb_utilisateurs, k = recommandations.shape
+        valides = recommandations >= 0
+        lignes = np.repeat(np.arange(nb_utilisateurs), k)
+        colonnes = np.where(valides, recommandations, 0).ravel()
+        trouves = np.asarray(verite.tocsr()[lignes, colonnes]).reshape(nb_utilisateurs, k) > 0
+        return trouves & valides
+
+    def evaluer_lot(self, recommandations, verite, k):
+        """precision@K, recall@K, NDCG@K et AP@K de chaque utilisateur, calculés en bloc."""
+        recommandations = np.asarray(recommandations)[:, :k]
+        succes = self.succes(recommandations, verite).astype(np.float64)
+        nb_pertinents = np.diff(verite.tocsr().indptr).astype(np.float64)
+        k_effectif = recommandations.shape[1]
+
+        nb_succes = succes.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rappel = np.where(nb_pertinents > 0, nb_succes / nb_pertinents, 0.0)
+
+        remises = 1.0 / np.log2(np.arange(2, k_effectif + 2))
+        dcg = succes @ remises
+        idcg = np.concatenate(([0.0], np.cumsum(remises)))[np.minimum(nb_pertinents, k_effectif).astype(int)]
+        precision_rang = np.cumsum(succes, axis=1) / np.arange(1, k_effectif + 1)
+        denominateur = np.minimum(nb_pertinents, k_effectif)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ndcg = np.where(idcg > 0, dcg / idcg, 0.0)
+            ap = np.where(denominateur > 0, (precision_rang * succes).sum(axis=1) / denominateur, 0.0)
+
+        return {
+            'precision': nb_succes / k if k > 0 else np.zeros_like(nb_succes),
+            'recall': rappel,
+            'ndcg': ndcg,
+            'ap': ap,
+        }
+
+    @staticmethod
+    def couverture(recommandations, nb_films):
+        """Part du catalogue apparaissant dans au moins une liste recommandée."""
+        recommandations = np.asarray(recommandations)
+        return len(np.unique(recommandations[recommandations >= 0])) / nb_films if nb_films else 0.0
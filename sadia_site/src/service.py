@@ -0,0 +1,74 @@
+import threading
+
+from django.conf import settings
+
+from sadia_site.src.metriques import span
+from sadia_site.src.mise_a_jour import MiseAJourIncrementale
+from sadia_site.src.modele import ModeleRecommandation
+
+
+# --------------------------------------------
+# Service de recommandation partagé par le processus
+# --------------------------------------------
+
+class ServiceRecommandation:
+    """Donne accès au modèle, chargé paresseusement une seule fois par processus.
+
+    Le modèle est ouvert depuis l'artefact (``manage.py build_reco_model``) ou, à
+    défaut, construit en mémoire. Le chargement est protégé par un verrou pour
+    que des requêtes concurrentes ne le déclenchent qu'une fois.
+    """
+
+    def __init__(self, chargeur=None):
+        self._chargeur = chargeur or self._charger_modele
+        self._verrou = threading.Lock()
+        self._modele = None
+        self.mises_a_jour = MiseAJourIncrementale(
+            self,
+            intervalle=getattr(settings, 'RECO_MAJ_INTERVALLE', 5.0),
+            taille_max=getattr(settings, 'RECO_MAJ_TAILLE_MAX', 500),
+        )
+
+    @staticmethod
+    def _charger_modele():
+        return ModeleRecommandation.charger() or ModeleRecommandation.construire()
+
+    @property
+    def is_ready(self):
+        return self._modele is not None
+
+    @property
+    def modele(self):
+        modele = self._modele
+        if modele is None:
+            with self._verrou:
+                if self._modele is None:
+                    with span('reco.chargement_modele'):
+                        self._modele = self._chargeur()
+                modele = self._modele
+        return modele
+
+    def prechauffer(self):
+        """Charge le modèle tout de suite (à appeler avant de recevoir du trafic)."""
+        return self.modele is not None
+
+    def reload(self):
+        """Recharge le modèle (nouvelle version d'artefact) puis l'échange atomiquement."""
+        nouveau = self._chargeur()
+        with self._verrou:
+            self._modele = nouveau
+        return nouveau is not None
+
+
+_service = None
+_verrou_service = threading.Lock()
+
+
+def get_recommender():
+    """Retourne le service de recommandation unique du processus."""
+    global _service
+    if _service is None:
+        with _verrou_service:
+            if _service is None:
+                _service = ServiceRecommandation()
+    return _service
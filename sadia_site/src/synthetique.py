@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sadia_site.src.contenu import GENRES
+
+
+# --------------------------------------------
+# Jeux de données synthétiques au format MovieLens
+# --------------------------------------------
+
+
+def generer_movielens(dossier, nb_evaluations, graine=0):
+    """Écrit ratings.csv, movies.csv et links.csv de même forme que MovieLens.
+
+    Les proportions suivent ml-latest-small (~165 notes par utilisateur, ~10 par
+    film) et la popularité des films une loi de Zipf, pour que la structure du
+    graphe de co-occurrences ressemble à celle des vraies données.
+    """
+    rng = np.random.default_rng(graine)
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+
+    nb_utilisateurs = max(nb_evaluations // 165, 10)
+    nb_films = int(min(max(nb_evaluations // 10, 50), 60000))
+    movie_ids = np.sort(rng.choice(np.arange(1, nb_films * 3), size=nb_films, replace=False)).astype(np.int32)
+
+    # Popularité en loi de Zipf, activité des utilisateurs log-normale
+    popularite = 1.0 / np.arange(1, nb_films + 1) ** 0.9
+    popularite /= popularite.sum()
+    activite = rng.lognormal(mean=0.0, sigma=1.0, size=nb_utilisateurs)
+    activite /= activite.sum()
+
+    # Tirage en excès : les couples (utilisateur, film) en double sont retirés ensuite
+    nb_tirages = int(nb_evaluations * 1.5)
+    utilisateurs = rng.choice(nb_utilisateurs, size=nb_tirages, p=activite).astype(np.int32) + 1
+    films = movie_ids[rng.choice(nb_films, size=nb_tirages, p=popularite)]
+    evaluations = pd.DataFrame({
+        'userId': utilisateurs,
+        'movieId': films,
+        'rating': rng.integers(1, 11, size=nb_tirages) / 2.0,
+        'timestamp': rng.integers(828_000_000, 1_540_000_000, size=nb_tirages),
+    }).drop_duplicates(['userId', 'movieId']).iloc[:nb_evaluations]
+    evaluations.sort_values(['userId', 'movieId']).to_csv(dossier / 'ratings.csv', index=False)
+
+    nb_genres = rng.integers(1, 4, size=nb_films)
+    genres = ['|'.join(rng.choice(GENRES, size=n, replace=False)) for n in nb_genres]
+    annees = rng.integers(1920, 2019, size=nb_films)
+    pd.DataFrame({
+        'movieId': movie_ids,
+        'title': [f"Film {m} ({a})" for m, a in zip(movie_ids, annees)],
+        'genres': genres,
+    }).to_csv(dossier / 'movies.csv', index=False)
+
+    pd.DataFrame({
+        'movieId': movie_ids,
+        'imdbId': movie_ids + 100000,
+        'tmdbId': movie_ids + 200000,
+    }).to_csv(dossier / 'links.csv', index=False)
+
+    return len(evaluations)
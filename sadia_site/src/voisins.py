@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+from sadia_site.src.recommendation import elaguer_top_k
+
+
+# --------------------------------------------
+# Index des films similaires (top-K voisins par film)
+# --------------------------------------------
+
+MESURES = ('cosinus', 'jaccard', 'lift')
+
+
+def similarites(cooccurrences, frequences, nb_utilisateurs, mesure='cosinus'):
+    """Transforme des comptes de co-occurrence (CSR) en similarités, sans densifier.
+
+    ``frequences[i]`` est le nombre d'utilisateurs ayant aimé le film ``i`` :
+      - cosinus : c / √(fᵢ·fⱼ)
+      - jaccard : c / (fᵢ + fⱼ - c)
+      - lift    : c·N / (fᵢ·fⱼ)
+    """
+    if mesure not in MESURES:
+        raise ValueError(f"Mesure inconnue : {mesure} (choisir parmi {', '.join(MESURES)})")
+
+    cooccurrences = cooccurrences.tocsr()
+    frequences = np.asarray(frequences, dtype=np.float64)
+    lignes = np.repeat(np.arange(cooccurrences.shape[0]), np.diff(cooccurrences.indptr))
+    fi, fj = frequences[lignes], frequences[cooccurrences.indices]
+    c = cooccurrences.data.astype(np.float64)
+
+    if mesure == 'cosinus':
+        valeurs = c / np.sqrt(fi * fj)
+    elif mesure == 'jaccard':
+        valeurs = c / (fi + fj - c)
+    else:
+        valeurs = c * nb_utilisateurs / (fi * fj)
+
+    return sp.csr_matrix((valeurs.astype(np.float32), cooccurrences.indices.copy(), cooccurrences.indptr.copy()),
+                         shape=cooccurrences.shape)
+
+
+class IndexVoisins:
+    """Les ``k`` films les plus similaires à chaque film, en tableaux compacts.
+
+    ``indices`` (nb_films × k, int32, -1 en bourrage) et ``scores`` (float32)
+    sont triés par similarité décroissante : une requête coûte O(k).
+    """
+
+    def __init__(self, indices, scores, mesure):
+        self.indices = indices
+        self.scores = scores
+        self.mesure = mesure
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    @classmethod
+    def construire(cls, graphe, k=20, mesure='cosinus'):
+        """Construit l'index depuis un ``ConstructionGraphe`` (comptes non élagués)."""
+        incidence = graphe.matrice_incidence()
+        frequences = np.asarray(incidence.sum(axis=0)).ravel()
+        cooccurrences = (incidence.T @ incidence).tocsr()
+        cooccurrences.setdiag(0)
+        cooccurrences.eliminate_zeros()
+
+        matrice = elaguer_top_k(similarites(cooccurrences, frequences, graphe.nb_utilisateurs, mesure), k)
+        return cls.depuis_matrice(matrice, k, mesure)
+
+    @classmethod
+    def depuis_matrice(cls, matrice, k, mesure):
+        nb_films = matrice.shape[0]
+        nb_par_ligne = np.diff(matrice.indptr)
+        lignes = np.repeat(np.arange(nb_films), nb_par_ligne)
+        ordre = np.lexsort((-matrice.data, lignes))
+        rangs = np.arange(len(ordre)) - np.repeat(matrice.indptr[:-1], nb_par_ligne)
+
+        indices = np.full((nb_films, k), -1, dtype=np.int32)
+        scores = np.zeros((nb_films, k), dtype=np.float32)
+        indices[lignes[ordre], rangs] = matrice.indices[ordre]
+        scores[lignes[ordre], rangs] = matrice.data[ordre]
+        return cls(indices, scores, mesure)
+
+    def similaires(self, id_film, k=None):
+        """(id_film voisins, scores) du film, au plus ``k``."""
+        k = self.k if k is None else min(k, self.k)
+        voisins = self.indices[id_film, :k]
+        valides = voisins >= 0
+        return voisins[valides], self.scores[id_film, :k][valides]
+
+    def sauvegarder(self, dossier):
+        dossier = Path(dossier)
+        np.save(dossier / 'voisins_indices.npy', self.indices)
+        np.save(dossier / 'voisins_scores.npy', self.scores)
+
+    @classmethod
+    def charger(cls, dossier, mesure, mmap_mode='r'):
+        dossier = Path(dossier)
+        if not (dossier / 'voisins_indices.npy').exists():
+            return None
+        return cls(np.load(dossier / 'voisins_indices.npy', mmap_mode=mmap_mode),
+                   np.load(dossier / 'voisins_scores.npy', mmap_mode=mmap_mode), mesure)